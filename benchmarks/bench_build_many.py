@@ -0,0 +1,57 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+"""
+Benchmark: building the pharmacovigilance construct for a batch of case narratives.
+
+Compares one Weaver.build per narrative with a single Weaver.build_many over the batch.
+Narratives vary in length so that some items fit the budget and others drop components.
+
+Usage:
+    python benchmarks/bench_build_many.py [count]
+"""
+
+import sys
+import time
+
+from coreason_identity.models import UserContext
+
+from coreason_construct.data.library import AE_Examples
+from coreason_construct.primitives.extract import ExtractionPrimitive
+from coreason_construct.roles.library import SafetyScientist
+from coreason_construct.schemas.clinical import AdverseEvent
+from coreason_construct.weaver import Weaver
+
+
+def main(count: int = 2_000) -> None:
+    context = UserContext(user_id="bench", email="bench@coreason.ai", groups=[], scopes=[], claims={})
+    weaver = Weaver()
+    weaver.add(SafetyScientist, context=context)
+    weaver.add(AE_Examples, context=context)
+    weaver.add(ExtractionPrimitive(name="AE_Extractor", schema=AdverseEvent), context=context)
+
+    narratives = [f"Case {i}: patient reported nausea after dose. " * (1 + i % 40) for i in range(count)]
+    max_tokens = 400
+
+    start = time.perf_counter()
+    single = [weaver.build(narrative, max_tokens=max_tokens) for narrative in narratives]
+    single_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = list(weaver.build_many(narratives, max_tokens=max_tokens))
+    batch_elapsed = time.perf_counter() - start
+
+    assert batched == single
+    print(f"build x{count}:    {single_elapsed:.3f}s ({single_elapsed / count * 1e6:.1f} us/item)")
+    print(f"build_many x{count}: {batch_elapsed:.3f}s ({batch_elapsed / count * 1e6:.1f} us/item)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000)
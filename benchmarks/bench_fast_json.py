@@ -0,0 +1,106 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+"""
+Benchmark: the fast JSON path of /v1/compile against FastAPI's default request parsing and
+response encoding, on blueprints of about 1 KB, 100 KB and 5 MB (large few-shot banks).
+
+For each size, reports the JSON layer alone (parsing and validating the body, encoding the
+response) and whole requests through the ASGI app. Responses are not cached.
+
+Usage:
+    python benchmarks/bench_fast_json.py [sizes in KB...]
+"""
+
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from coreason_construct import server as server_module
+from coreason_construct.response_cache import ResponseCache
+from coreason_construct.server import BlueprintRequest, CompilationResponse, app, server
+
+EXAMPLE = (
+    "Narrative: Patient (65F) started {drug} 20 mg daily and reported dizziness and a rash on day {day}. "
+    'Extraction: {{"drug": "{drug}", "reactions": ["dizziness", "rash"], "onset_days": {day}, '
+    '"seriousness": "non-serious", "outcome": "recovering"}}\n'
+)
+
+
+def blueprint(size: int) -> Dict[str, Any]:
+    """A compile request of about `size` bytes: a role and few-shot examples, one component each."""
+    components: List[Dict[str, Any]] = [
+        {"name": "Role", "type": "ROLE", "content": "You extract adverse events about {{ drug }}.", "priority": 10}
+    ]
+    payload: Dict[str, Any] = {"user_input": "Case 1", "variables": {"drug": "ibuprofen"}, "components": components}
+    while len(json.dumps(payload)) < size:
+        n = len(components)
+        content = EXAMPLE.format(drug="ibuprofen", day=n)
+        components.append({"name": f"Example{n}", "type": "CONTEXT", "content": content, "priority": 2})
+    return payload
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> float:
+    """Milliseconds per call, best of three runs."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1000
+
+
+def bench(client: TestClient, size: int) -> None:
+    payload = blueprint(size * 1024)
+    body = json.dumps(payload).encode()
+    headers = {"Content-Type": "application/json"}
+    result = CompilationResponse.model_validate(client.post("/v1/compile", content=body, headers=headers).json())
+    repeat = max(1, 200 // size)
+
+    def default_json() -> bytes:
+        request = BlueprintRequest.model_validate(json.loads(body))
+        assert request.components
+        return JSONResponse(jsonable_encoder(CompilationResponse.model_validate(result.model_dump()))).body
+
+    def fast_json() -> bytes:
+        request = server_module._BLUEPRINT_REQUEST.validate_json(body)
+        assert request.components
+        return server_module._COMPILATION_RESPONSE.dump_json(result)
+
+    def compile_request() -> None:
+        client.post("/v1/compile", content=body, headers=headers).raise_for_status()
+
+    assert json.loads(default_json()) == json.loads(fast_json())
+    print(f"{len(body) / 1024:,.0f} KB ({len(payload['components'])} components)")
+    default, fast = timed(default_json, repeat), timed(fast_json, repeat)
+    print(f"  JSON layer  default: {default:9.2f} ms   fast: {fast:9.2f} ms")
+    elapsed = {}
+    for enabled in (False, True):
+        server.fast_json = enabled
+        elapsed[enabled] = timed(compile_request, repeat)
+    server.fast_json = False
+    print(f"  request     default: {elapsed[False]:9.2f} ms   fast: {elapsed[True]:9.2f} ms")
+
+
+def main(sizes: List[int]) -> None:
+    client = TestClient(app)
+    server.responses = ResponseCache(maxsize=0)
+    for size in sizes:
+        bench(client, size)
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [1, 100, 5 * 1024])
@@ -0,0 +1,65 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+"""
+Benchmark: building the pharmacovigilance construct for a batch of case narratives on a process pool.
+
+Compares a single-process CompiledConstruct.build_many with ParallelBuilder.build_many for an
+increasing number of workers. Narratives vary in length so that some items drop components.
+
+Usage:
+    python benchmarks/bench_parallel.py [count]
+"""
+
+import os
+import sys
+import time
+
+from coreason_identity.models import UserContext
+
+from coreason_construct.data.library import AE_Examples
+from coreason_construct.parallel import ParallelBuilder
+from coreason_construct.primitives.extract import ExtractionPrimitive
+from coreason_construct.roles.library import SafetyScientist
+from coreason_construct.schemas.clinical import AdverseEvent
+from coreason_construct.weaver import Weaver
+
+
+def main(count: int = 20_000) -> None:
+    context = UserContext(user_id="bench", email="bench@coreason.ai", groups=[], scopes=[], claims={})
+    weaver = Weaver()
+    weaver.add(SafetyScientist, context=context)
+    weaver.add(AE_Examples, context=context)
+    weaver.add(ExtractionPrimitive(name="AE_Extractor", schema=AdverseEvent), context=context)
+    compiled = weaver.compile()
+
+    narratives = [f"Case {i}: patient reported nausea after dose. " * (1 + i % 40) for i in range(count)]
+    max_tokens = 400
+
+    start = time.perf_counter()
+    serial = list(compiled.build_many(narratives, max_tokens=max_tokens))
+    serial_elapsed = time.perf_counter() - start
+    print(f"build_many x{count}: {serial_elapsed:.3f}s")
+
+    workers = 2
+    while workers <= (os.cpu_count() or 1):
+        with ParallelBuilder(compiled, max_workers=workers) as builder:
+            # Start the pool (and load the tokenizer in every worker) outside the timing
+            list(builder.build_many(narratives[: workers * 64], max_tokens=max_tokens))
+            start = time.perf_counter()
+            parallel = list(builder.build_many(narratives, max_tokens=max_tokens))
+            elapsed = time.perf_counter() - start
+        assert parallel == serial
+        print(f"ParallelBuilder x{count}, {workers} workers: {elapsed:.3f}s ({serial_elapsed / elapsed:.1f}x)")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
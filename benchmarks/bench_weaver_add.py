@@ -0,0 +1,52 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+"""
+Benchmark: assembling a construct of 10k components with Weaver.add.
+
+Every component depends on a dynamic family (PatientHistory), which exercises both the
+duplicate check and the dynamic-prefix dependency check on each add.
+
+Usage:
+    python benchmarks/bench_weaver_add.py [count]
+"""
+
+import sys
+import time
+from typing import Any, List
+
+from coreason_identity.models import UserContext
+
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.weaver import Weaver
+
+
+class DependentContext(PromptComponent):
+    dependencies: List[str] = ["PatientHistory", "HIPAA"]
+
+    def __init__(self, index: int, **data: Any) -> None:
+        super().__init__(name=f"Context_{index}", type=ComponentType.CONTEXT, content=f"Context {index}", **data)
+
+
+def main(count: int = 10_000) -> None:
+    context = UserContext(user_id="bench", email="bench@coreason.ai", groups=[], scopes=[], claims={})
+    components = [DependentContext(i) for i in range(count)]
+
+    weaver = Weaver(context_data={"patient_id": "P1"})
+    start = time.perf_counter()
+    for component in components:
+        weaver.add(component, context=context)
+    elapsed = time.perf_counter() - start
+
+    print(f"Added {len(weaver.components)} components in {elapsed:.3f}s ({elapsed / count * 1e6:.1f} us/add)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
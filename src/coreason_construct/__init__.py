@@ -16,18 +16,36 @@ __version__ = "0.4.0"
 __author__ = "Gowtham A Rao"
 __email__ = "gowtham.rao@coreason.ai"
 
+from .async_weaver import AsyncWeaver
+from .build_cache import BUILD_CACHE, BuildCache
+from .compiled import CompiledConstruct
+from .contexts.library import LazyContext
+from .contexts.providers import CONTEXT_PROVIDERS, ContextProvider, SQLiteContextProvider
 from .contexts.registry import CONTEXT_REGISTRY
+from .parallel import ParallelBuilder
 from .primitives.base import StructuredPrimitive
 from .roles.base import RoleDefinition
 from .schemas.base import ComponentType, PromptComponent, PromptConfiguration
+from .utils.timing import BuildTimings, LogSink
 from .weaver import Weaver
 
 __all__ = [
+    "AsyncWeaver",
+    "BUILD_CACHE",
+    "BuildCache",
+    "BuildTimings",
+    "CONTEXT_PROVIDERS",
     "CONTEXT_REGISTRY",
+    "CompiledConstruct",
     "ComponentType",
+    "ContextProvider",
+    "LazyContext",
+    "LogSink",
+    "ParallelBuilder",
     "PromptComponent",
     "PromptConfiguration",
     "RoleDefinition",
+    "SQLiteContextProvider",
     "StructuredPrimitive",
     "Weaver",
 ]
@@ -0,0 +1,207 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from coreason_identity.models import UserContext
+from loguru import logger
+
+from coreason_construct.build_cache import BuildCache
+from coreason_construct.compiled import CompiledConstruct
+from coreason_construct.optimization.estimation import TokenEstimator
+from coreason_construct.schemas.base import PromptComponent, PromptConfiguration
+from coreason_construct.utils.templates import TEMPLATE_CACHE
+from coreason_construct.utils.timing import TimingSink
+from coreason_construct.weaver import Weaver
+
+__all__ = ["AsyncWeaver"]
+
+
+class AsyncWeaver(Weaver):
+    """
+    A Weaver that loads dynamic context dependencies concurrently.
+
+    `aadd` and `acreate_construct` resolve dependencies like `add`, but every dynamic context
+    pending in a dependency walk is loaded at once through its `aload` classmethod, with
+    `asyncio.gather` and a timeout per dependency. Meanwhile the static components' templates
+    are compiled and rendered in a worker thread, so latency is bounded by the slowest fetch
+    rather than the sum of all fetches. Dependencies that fail or time out are skipped, like
+    dependencies that cannot be instantiated by `add`.
+
+    Components end up in the same order as with `add`, so the built configurations are the same.
+
+    Attributes:
+        dependency_timeout: Seconds allowed for loading each dynamic context, or None for no limit.
+    """
+
+    def __init__(
+        self,
+        context_data: Optional[Dict[str, Any]] = None,
+        known_variables: Optional[Iterable[str]] = None,
+        estimator: Optional[TokenEstimator] = None,
+        encoding: Optional[str] = None,
+        build_cache: Optional[BuildCache] = None,
+        dependency_timeout: Optional[float] = 5.0,
+        instrument: bool = False,
+        timing_sink: Optional[TimingSink] = None,
+    ) -> None:
+        """
+        Args:
+            context_data: Data used to instantiate dynamic context dependencies.
+            known_variables: Names of the variables that will be supplied at build time.
+            estimator: Cheap token bounds deciding when exact tokenization can be skipped.
+            encoding: Name of the tokenizer in TOKENIZER_REGISTRY used for exact token counts.
+            build_cache: Cache of built configurations used by `build` and `abuild`.
+            dependency_timeout: Seconds allowed for loading each dynamic context, or None for no limit.
+            instrument: Record the wall and CPU time of every phase of every build (see
+                `BuildTimings`) into `PromptConfiguration.timings`. Off by default.
+            timing_sink: Receives the timing record of every build. Setting it turns `instrument` on.
+
+        Raises:
+            ValueError: If `encoding` is not a known encoding.
+        """
+        super().__init__(context_data, known_variables, estimator, encoding, build_cache, instrument, timing_sink)
+        self.dependency_timeout = dependency_timeout
+
+    async def aadd(self, component: PromptComponent, context: Optional[UserContext] = None) -> "AsyncWeaver":
+        """
+        Add a component to the weaver, loading its dynamic context dependencies concurrently.
+        """
+        await self._aadd_all([component], context)
+        return self
+
+    async def acreate_construct(self, name: str, components: List[PromptComponent], context: UserContext) -> None:
+        """
+        Creates a new construct by adding components, loading the dynamic contexts they
+        require concurrently across all of them.
+        Identity-aware: Requires UserContext.
+        """
+        if not context:
+            raise ValueError("UserContext is required for create_construct")
+
+        logger.info(f"Creating construct '{name}'", user_id=context.user_id, name=name)
+        await self._aadd_all(components, context)
+
+    async def _aadd_all(self, components: Sequence[PromptComponent], context: Optional[UserContext]) -> None:
+        loaded: Dict[str, Optional[PromptComponent]] = {}
+        warm: Optional[asyncio.Future[None]] = None
+        while True:
+            count = len(self.components)
+            dynamic_names = set(self._dynamic_names)
+            response_model = self._response_model
+
+            pending: Dict[str, Type[PromptComponent]] = {}
+            with self._resolving():
+                for component in components:
+                    self._add(component, context, loaded, pending)
+            if not pending:
+                break
+
+            # Undo the walk; it is repeated once the pending dependencies are loaded, so that
+            # components keep the order `add` gives them. Loaded contexts may have dependencies
+            # of their own, which are then loaded in the next round.
+            if warm is None:
+                warm = asyncio.ensure_future(asyncio.to_thread(self._warm, self.components[count:]))
+            del self.components[count:]
+            self._dynamic_names = dynamic_names
+            self._response_model = response_model
+
+            names = list(pending)
+            results = await asyncio.gather(*(self._load(name, pending[name]) for name in names))
+            loaded.update(zip(names, results, strict=True))
+
+        if warm is not None:
+            await warm
+
+    async def _load(self, dep_name: str, component_class: Type[PromptComponent]) -> Optional[PromptComponent]:
+        """
+        Loads a dynamic context from context_data through its `aload`, within `dependency_timeout`.
+        """
+        kwargs = self._dependency_kwargs(dep_name, component_class)
+        if kwargs is None:
+            return None
+
+        try:
+            return await asyncio.wait_for(component_class.aload(**kwargs), self.dependency_timeout)
+        except TimeoutError:
+            logger.warning(f"Loading dependency '{dep_name}' timed out after {self.dependency_timeout}s")
+        except Exception as e:
+            logger.error(f"Failed to instantiate dependency '{dep_name}': {e}")
+        return None
+
+    @staticmethod
+    def _warm(components: Sequence[PromptComponent]) -> None:
+        # Compile the templates and render the variable-free ones into the shared caches,
+        # so that compiling the construct afterwards does not repeat the work. Template errors
+        # are left for the compilation to raise.
+        for component in components:
+            try:
+                template = TEMPLATE_CACHE.get(component.content)
+                if not template.variables:
+                    template.render()
+            except Exception:
+                continue
+
+    async def abuild(
+        self,
+        user_input: str,
+        variables: Optional[Dict[str, Any]] = None,
+        max_tokens: Optional[int] = None,
+        context: Optional[UserContext] = None,
+        optimization: str = "priority",
+        ordering: str = "priority",
+    ) -> PromptConfiguration:
+        """
+        Build the final prompt configuration without blocking the event loop.
+
+        The construct is compiled in a worker thread and built with `CompiledConstruct.abuild`
+        (through `build_cache` when one is set), which awaits the surviving lazy contexts
+        concurrently.
+
+        Args:
+            user_input: The input data from the user.
+            variables: Optional variables to render components.
+            max_tokens: Maximum allowed estimated tokens. If exceeded, low priority components are dropped.
+            context: Optional UserContext (though encouraged).
+            optimization: Component selection strategy when over budget, one of OPTIMIZATION_MODES.
+            ordering: Order of the system prompt, one of ORDERING_MODES.
+        """
+        recorder = self._recorder()
+        if recorder is None:
+            return (await self._abuild(user_input, variables, max_tokens, context, optimization, ordering))[1]
+        with recorder:
+            compiled, config = await self._abuild(user_input, variables, max_tokens, context, optimization, ordering)
+        return self._report(config, recorder, compiled)
+
+    async def _abuild(
+        self,
+        user_input: str,
+        variables: Optional[Dict[str, Any]],
+        max_tokens: Optional[int],
+        context: Optional[UserContext],
+        optimization: str,
+        ordering: str,
+    ) -> Tuple[CompiledConstruct, PromptConfiguration]:
+        compiled = await asyncio.to_thread(self.compile, ordering)
+        if self.build_cache is not None:
+            config = await self.build_cache.abuild(compiled, user_input, variables, max_tokens, context, optimization)
+        else:
+            config = await compiled.abuild(user_input, variables, max_tokens, context, optimization)
+        return compiled, config
+
+    async def aresolve_construct(
+        self, construct_id: str, variables: Dict[str, Any], context: UserContext
+    ) -> PromptConfiguration:
+        """
+        Resolves a construct (builds it) in a worker thread.
+        Identity-aware: Requires UserContext.
+        """
+        return await asyncio.to_thread(self.resolve_construct, construct_id, variables, context)
@@ -0,0 +1,249 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from coreason_identity.models import UserContext
+
+from coreason_construct.compiled import CompiledConstruct
+from coreason_construct.schemas.base import PromptConfiguration
+from coreason_construct.utils.fingerprint import canonical_json, digest
+
+__all__ = ["BUILD_CACHE", "BuildCache"]
+
+# Approximate per-entry overhead in bytes (key, metadata, model instances), on top of the message texts
+ENTRY_OVERHEAD = 1024
+
+# Variable value types with a canonical JSON form that renders the same whenever it is equal.
+# Exact types only: e.g. a str Enum member renders differently from its value.
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def _is_canonical(value: Any) -> bool:
+    if type(value) in _SCALAR_TYPES:
+        return True
+    if type(value) is list:
+        return all(_is_canonical(item) for item in value)
+    if type(value) is dict:
+        return all(type(key) is str and _is_canonical(item) for key, item in value.items())
+    return False
+
+
+def _entry_size(config: PromptConfiguration) -> int:
+    # Unjoined message parts are the segment texts and the user input, so count each string once
+    texts = chain(
+        config.message_parts("system_message"),
+        config.message_parts("user_message"),
+        (segment.text for segment in config.system_segments),
+    )
+    return ENTRY_OVERHEAD + sum(sys.getsizeof(text) for text in {id(text): text for text in texts}.values())
+
+
+class _Entry(NamedTuple):
+    config: PromptConfiguration
+    expires: float
+    size: int
+
+
+class BuildCache:
+    """
+    Thread-safe cache of built prompt configurations.
+
+    Entries are keyed by the construct fingerprint, the template variables the construct
+    references (as canonical JSON), a hash of the user input, the token budget and the
+    optimization mode, so equal keys always produce equal configurations. They are evicted
+    least recently used first, when older than `ttl`, or when the cache exceeds `max_bytes`.
+
+    Configurations are cached without the user-specific `owner_id`, which is attached to a
+    copy on every lookup, so one entry serves every user. Builds whose variables have no
+    canonical form (e.g. tuples, custom objects) bypass the cache.
+
+    Attributes:
+        maxsize: Maximum number of entries retained.
+        ttl: Seconds an entry stays valid, or None for no expiry.
+        max_bytes: Approximate upper bound on the memory held by the entries.
+        hits: Number of builds served from the cache.
+        misses: Number of cacheable builds that were computed.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = 600.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            maxsize: Maximum number of entries retained.
+            ttl: Seconds an entry stays valid, or None for no expiry.
+            max_bytes: Approximate upper bound on the memory held by the entries.
+            clock: Monotonic time source, in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        compiled: CompiledConstruct,
+        user_input: str,
+        variables: Optional[Dict[str, Any]] = None,
+        max_tokens: Optional[int] = None,
+        optimization: str = "priority",
+    ) -> Optional[str]:
+        """
+        Returns the cache key of a build, or None if the build cannot be cached.
+
+        Only the variables referenced by the construct's templates are part of the key, so
+        unrelated variables (e.g. `user_input` passed through `resolve_construct`) do not
+        split entries.
+        """
+        variables = variables or {}
+        referenced = {name: variables[name] for name in compiled.variables if name in variables}
+        if not _is_canonical(referenced):
+            return None
+        return digest(
+            "build",
+            compiled.fingerprint,
+            canonical_json(referenced),
+            digest(user_input),
+            str(max_tokens),
+            optimization,
+        )
+
+    def build(
+        self,
+        compiled: CompiledConstruct,
+        user_input: str,
+        variables: Optional[Dict[str, Any]] = None,
+        max_tokens: Optional[int] = None,
+        context: Optional[UserContext] = None,
+        optimization: str = "priority",
+    ) -> PromptConfiguration:
+        """
+        Returns the configuration `compiled.build` would return, from the cache when possible.
+
+        Args:
+            compiled: The construct to build.
+            user_input: The input data from the user.
+            variables: Optional variables to render components.
+            max_tokens: Maximum allowed estimated tokens.
+            context: Optional UserContext; its user id is attached after the lookup.
+            optimization: Component selection strategy when over budget, one of OPTIMIZATION_MODES.
+        """
+        key = self.key(compiled, user_input, variables, max_tokens, optimization)
+        if key is None:
+            return compiled.build(user_input, variables, max_tokens, context, optimization)
+
+        config = self._get(key)
+        if config is None:
+            # Built outside the lock; a concurrent miss for the same key stores an identical entry.
+            config = compiled.build(user_input, variables, max_tokens, None, optimization)
+            self._put(key, config)
+        return self._attach(config, context)
+
+    async def abuild(
+        self,
+        compiled: CompiledConstruct,
+        user_input: str,
+        variables: Optional[Dict[str, Any]] = None,
+        max_tokens: Optional[int] = None,
+        context: Optional[UserContext] = None,
+        optimization: str = "priority",
+    ) -> PromptConfiguration:
+        """Like `build`, building misses with `compiled.abuild`."""
+        key = self.key(compiled, user_input, variables, max_tokens, optimization)
+        if key is None:
+            return await compiled.abuild(user_input, variables, max_tokens, context, optimization)
+
+        config = self._get(key)
+        if config is None:
+            config = await compiled.abuild(user_input, variables, max_tokens, None, optimization)
+            self._put(key, config)
+        return self._attach(config, context)
+
+    def _get(self, key: str) -> Optional[PromptConfiguration]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= self._clock():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.config
+
+    def _put(self, key: str, config: PromptConfiguration) -> None:
+        size = _entry_size(config)
+        if size > self.max_bytes:
+            return
+        expires = self._clock() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(config, expires, size)
+            self._bytes += size
+            while len(self._entries) > self.maxsize or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        self._bytes -= self._entries.pop(key).size
+
+    @staticmethod
+    def _attach(config: PromptConfiguration, context: Optional[UserContext]) -> PromptConfiguration:
+        # Copy the mutable containers so callers cannot alter the cached entry
+        metadata = dict(config.provenance_metadata)
+        if context:
+            metadata["owner_id"] = context.user_id
+        return config.model_copy(
+            update={
+                "provenance_metadata": metadata,
+                "dropped_components": list(config.dropped_components),
+                "shrunk_components": list(config.shrunk_components),
+                "system_segments": list(config.system_segments),
+            }
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss counters, the current size and the approximate bytes held."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        """Empties the cache and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+BUILD_CACHE = BuildCache()
@@ -0,0 +1,213 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.context import BaseContext
+from typing import Any, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+__all__ = ["CompilePool", "LoopMonitor", "PoolSaturatedError"]
+
+T = TypeVar("T")
+
+# Event-loop lag samples kept for the percentiles reported by LoopMonitor
+LAG_SAMPLES = 1200
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised when a CompilePool already holds its maximum number of pending tasks."""
+
+
+class CompilePool:
+    """
+    Runs CPU-bound work (weaving, Jinja rendering, tokenization) off the asyncio event loop.
+
+    Work goes to a bounded pool of threads or, optionally, processes. Threads share the
+    process-wide template and tokenizer caches; processes also run in parallel, but only
+    module-level functions and picklable arguments can be sent to them, and tokenizers
+    registered at runtime must be registered in each worker too (via `initializer`).
+
+    The executor is created on first use. Not thread-safe: `run` is called from one event loop.
+
+    Attributes:
+        max_workers: Number of worker threads or processes.
+        processes: Whether the workers are processes.
+        max_pending: Maximum number of tasks submitted and not finished, or None for no limit.
+        completed: Number of tasks finished, successfully or not.
+        rejected: Number of tasks refused because the pool was saturated.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        processes: bool = False,
+        max_pending: Optional[int] = None,
+        mp_context: Optional[BaseContext] = None,
+        initializer: Optional[Callable[..., Any]] = None,
+        initargs: Tuple[Any, ...] = (),
+    ) -> None:
+        """
+        Args:
+            max_workers: Number of worker threads or processes (defaults to the CPU count).
+            processes: Run the work in worker processes instead of threads.
+            max_pending: Maximum number of tasks submitted and not finished; further tasks are
+                rejected with PoolSaturatedError. None for no limit.
+            mp_context: Multiprocessing context selecting the start method of worker processes.
+            initializer: Called in each worker when it starts.
+            initargs: Arguments for `initializer`.
+
+        Raises:
+            ValueError: If `max_workers` or `max_pending` is not positive.
+        """
+        if max_workers is not None and max_workers < 1:
+            raise ValueError(f"max_workers must be positive, got {max_workers}")
+        if max_pending is not None and max_pending < 1:
+            raise ValueError(f"max_pending must be positive, got {max_pending}")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.processes = processes
+        self.max_pending = max_pending
+        self.completed = 0
+        self.rejected = 0
+        self._mp_context = mp_context
+        self._initializer = initializer
+        self._initargs = initargs
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.processes:
+                self._executor = ProcessPoolExecutor(
+                    self.max_workers,
+                    mp_context=self._mp_context,
+                    initializer=self._initializer,
+                    initargs=self._initargs,
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers,
+                    thread_name_prefix="coreason-compile",
+                    initializer=self._initializer,
+                    initargs=self._initargs,
+                )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Runs `fn(*args)` on a worker and waits for its result without blocking the event loop.
+
+        Raises:
+            PoolSaturatedError: If `max_pending` tasks are already pending.
+            Exception: Whatever `fn` raised.
+        """
+        if self.max_pending is not None and self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PoolSaturatedError(f"Compile pool saturated ({self._pending} tasks pending)")
+        executor = self._get_executor()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        finally:
+            self._pending -= 1
+            self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the pool size and load. `queued` counts the pending tasks no worker has
+        started yet, assuming workers are busy whenever tasks are queued.
+        """
+        active = min(self._pending, self.max_workers)
+        return {
+            "kind": "process" if self.processes else "thread",
+            "workers": self.max_workers,
+            "active": active,
+            "queued": self._pending - active,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def close(self) -> None:
+        """Shuts the workers down after the tasks already submitted. The pool can be used again."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class LoopMonitor:
+    """
+    Measures event-loop latency: the delay between scheduling a callback on the loop from
+    another thread and the loop running it, sampled periodically by a daemon thread.
+
+    A loop blocked by synchronous work (e.g. a large compile run inline) shows up as lag.
+
+    Attributes:
+        interval: Seconds between samples.
+    """
+
+    def __init__(self, interval: float = 0.05) -> None:
+        self.interval = interval
+        self._samples: Deque[float] = deque(maxlen=LAG_SAMPLES)
+        self._max = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def ensure_running(self) -> None:
+        """Starts sampling the running event loop, unless already sampling it."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._loop = loop
+            if self._thread is None or not self._thread.is_alive():
+                self._stop = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._sample, args=(self._stop,), name="coreason-loop-monitor", daemon=True
+                )
+                self._thread.start()
+
+    def _sample(self, stop: threading.Event) -> None:
+        while not stop.wait(self.interval):
+            loop = self._loop
+            if loop is None or loop.is_closed():
+                continue
+            try:
+                loop.call_soon_threadsafe(self._record, time.perf_counter())
+            except RuntimeError:  # pragma: no cover - closed meanwhile
+                continue
+
+    def _record(self, scheduled: float) -> None:
+        lag = time.perf_counter() - scheduled
+        self._samples.append(lag)
+        self._max = max(self._max, lag)
+
+    def stop(self) -> None:
+        """Stops sampling."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the number of samples and the latest, 99th percentile and maximum lag, in milliseconds."""
+        samples = sorted(self._samples)
+        p99 = samples[min(len(samples) - 1, math.ceil(0.99 * len(samples)) - 1)] if samples else 0.0
+        return {
+            "lag_ms": (self._samples[-1] if self._samples else 0.0) * 1000,
+            "p99_lag_ms": p99 * 1000,
+            "max_lag_ms": self._max * 1000,
+            "samples": len(samples),
+        }
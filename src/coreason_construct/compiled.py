@@ -0,0 +1,1041 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import (
+    AbstractSet,
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+
+from coreason_identity.models import UserContext
+from loguru import logger
+from pydantic import BaseModel
+
+from coreason_construct import wire
+from coreason_construct.contexts.library import LazyContext
+from coreason_construct.optimization.estimation import TOKEN_ESTIMATOR, EstimationTier, ScriptRatios, TokenEstimator
+from coreason_construct.optimization.ledger import JUNCTION_WINDOW, TokenLedger, junction_tokens, junction_windows
+from coreason_construct.optimization.selection import select_components
+from coreason_construct.optimization.tokenizers import TOKENIZER_REGISTRY
+from coreason_construct.schemas.base import (
+    ComponentType,
+    PromptComponent,
+    PromptConfiguration,
+    PromptSegment,
+    SegmentKind,
+    TextWriter,
+)
+from coreason_construct.utils import timing
+from coreason_construct.utils.fingerprint import canonical_json, class_fingerprint, digest
+from coreason_construct.utils.templates import TEMPLATE_CACHE, CompiledTemplate
+
+USER_INPUT_SEPARATOR = "\n\nINPUT DATA:\n"
+SYSTEM_SEPARATOR = "\n\n"
+
+# "priority" drops the lowest priority component first; "optimal" keeps the set of
+# non-critical components with the highest total priority that fits the budget.
+OPTIMIZATION_MODES = ("priority", "optimal")
+
+# "priority" orders the prompt by priority; "cache" puts static text first and per-request
+# dynamic contexts last, so that requests share the longest possible prompt prefix.
+ORDERING_MODES = ("priority", "cache")
+
+# Position of each segment kind in "cache" ordering
+SEGMENT_ORDER = {SegmentKind.STATIC: 0, SegmentKind.VARIABLE: 1, SegmentKind.DYNAMIC: 2}
+
+# Upper bound on junction-window token counts memoized during one build_many batch
+WINDOW_MEMO_SIZE = 4096
+
+
+def prefix_hash(segments: Sequence[PromptSegment]) -> Optional[str]:
+    """
+    Returns the SHA-256 hex digest of the system message up to its last cache breakpoint,
+    or None when no segment can be cached.
+    """
+    breakpoints = [index for index, segment in enumerate(segments) if segment.cache_breakpoint]
+    if not breakpoints:
+        return None
+    digest = hashlib.sha256()
+    for segment in segments[: breakpoints[-1] + 1]:
+        digest.update(segment.text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def format_user_message(task_part: str, user_input: str) -> str:
+    """Formats the final user message from the task instructions and the user input."""
+    return f"{task_part}{USER_INPUT_SEPARATOR}{user_input}" if task_part else user_input
+
+
+def user_message_parts(task_part: str, user_input: str) -> Tuple[str, ...]:
+    """The parts `format_user_message` joins, so that the user input need not be copied."""
+    return (task_part, USER_INPUT_SEPARATOR, user_input) if task_part else (user_input,)
+
+
+class _StaticTokens(NamedTuple):
+    """Exact token costs of a construct's variable-free parts, computed on first exact build."""
+
+    costs: Dict[int, int]
+    junctions: Dict[Tuple[int, int], int]
+    separator: int
+    # Token cost of each truncated prefix of the shrinkable parts, by slot (see _shrink_points)
+    shrinks: Dict[int, Tuple[int, ...]]
+
+
+class _Plan(NamedTuple):
+    """What `_plan` decided for one build."""
+
+    tier: EstimationTier
+    dropped_slots: Set[int]
+    # Names of the dropped components, in drop order
+    dropped: List[str]
+    # Truncated texts, by slot
+    shrunk: Dict[int, str]
+
+
+class _Rendering:
+    """
+    The components of a CompiledConstruct rendered for one set of variables.
+
+    Shared by a single build or by all items of a batch. Exact token costs are only
+    computed when a build cannot be decided by the cheap estimate.
+
+    Lazy contexts start out `pending`: their texts are stubs, costed by their size hints. `fetch`
+    derives the rendering with some of them fetched; derived renderings and fetched texts are
+    shared by all the renderings derived from the same one, so a batch fetches each text once.
+    Contexts whose fetch raised are `failed`: they are left out of the build, with a warning.
+    """
+
+    def __init__(
+        self,
+        construct: "CompiledConstruct",
+        texts: List[str],
+        count: Callable[[str], int],
+        pending: FrozenSet[int] = frozenset(),
+        parent: Optional["_Rendering"] = None,
+    ) -> None:
+        self.construct = construct
+        self.texts = texts
+        self.count = count
+        self.pending = pending
+        self.task_text = next((texts[i] for i in construct._task_slots), "")
+        self.task_upper = (
+            construct.estimator.bounds(self.task_text + USER_INPUT_SEPARATOR).upper if self.task_text else 0
+        )
+        hints = {slot: hint for slot in pending if (hint := construct._lazy[slot].size_hint) is not None}
+        self.system_upper = construct.estimator.bounds(
+            SYSTEM_SEPARATOR.join("" if i in hints else texts[i] for i in construct._system_slots)
+        ).upper + sum(hints.values())
+        self._costs: Optional[List[Optional[int]]] = None
+        self._junctions: Optional[Dict[Tuple[int, int], int]] = None
+        self.hints = hints
+        self._parent = parent
+        self._fetched: Dict[int, str] = parent._fetched if parent is not None else {}
+        self._failures: Set[int] = parent._failures if parent is not None else set()
+        self._derived: Dict[FrozenSet[int], "_Rendering"] = parent._derived if parent is not None else {}
+
+    def costs(self) -> List[Optional[int]]:
+        """Token costs by slot. Task (primitive) costs stay None until needed."""
+        if self._costs is None:
+            parent = self._parent
+            if parent is not None and parent._costs is not None:
+                # Only the newly fetched texts need counting, unless they are the stubs counted before
+                costs = [
+                    None
+                    if slot in parent.pending
+                    and slot not in self.pending
+                    and (slot in parent.hints or self.texts[slot] != parent.texts[slot])
+                    else cost
+                    for slot, cost in enumerate(parent._costs)
+                ]
+            else:
+                static = self.construct._static_tokens()
+                costs = [static.costs.get(slot) for slot in range(len(self.texts))]
+                for slot, hint in self.hints.items():
+                    costs[slot] = hint
+            rendered = [slot for slot in self.construct._system_slots if costs[slot] is None]
+            if rendered:
+                counts = self.construct._count_batch([self.texts[slot] for slot in rendered])
+                for slot, cost in zip(rendered, counts, strict=True):
+                    costs[slot] = cost
+            self._costs = costs
+        return self._costs
+
+    @property
+    def failed(self) -> FrozenSet[int]:
+        """The slots of the lazy contexts fetched in this rendering whose fetch raised."""
+        return frozenset(self._failures - self.pending)
+
+    def junctions(self) -> Dict[Tuple[int, int], int]:
+        """Junction estimates between system parts, shared by every ledger over this rendering."""
+        if self._junctions is None:
+            self._junctions = dict(self.construct._static_tokens().junctions)
+        return self._junctions
+
+    def fetch(self, slots: Iterable[int]) -> "_Rendering":
+        """Returns this rendering with the lazy contexts in `slots` fetched, concurrently."""
+        pending = self.pending.difference(slots)
+        groups = self._unfetched(pending)
+        if groups:
+            with timing.phase("fetch"):
+                if len(groups) == 1:
+                    results = [self._fetch_group(groups[0])]
+                else:
+                    results = list(_fetch_executor().map(self._fetch_group, groups))
+            self._store(groups, results)
+        return self._derive(pending)
+
+    async def afetch(self, slots: Iterable[int]) -> "_Rendering":
+        """Like `fetch`, awaiting the lazy contexts' `afetch_many` instead."""
+        pending = self.pending.difference(slots)
+        groups = self._unfetched(pending)
+        if groups:
+            with timing.phase("fetch"):
+                results = await asyncio.gather(*(self._afetch_group(group) for group in groups))
+            self._store(groups, results)
+        return self._derive(pending)
+
+    def _unfetched(self, pending: FrozenSet[int]) -> List[List[int]]:
+        """
+        Groups the slots to fetch for `pending` that were not fetched yet: the slots of a batched
+        class share one group, any other slot is a group of its own.
+        """
+        lazy = self.construct._lazy
+        groups: Dict[Any, List[int]] = {}
+        for slot in sorted(self.pending - pending):
+            if slot not in self._fetched:
+                context = lazy[slot]
+                groups.setdefault(type(context) if context.batched else slot, []).append(slot)
+        return list(groups.values())
+
+    def _fetch_group(self, group: List[int]) -> Union[List[str], Exception]:
+        lazy = self.construct._lazy
+        try:
+            return type(lazy[group[0]]).fetch_many([lazy[slot] for slot in group])
+        except Exception as e:
+            return e
+
+    async def _afetch_group(self, group: List[int]) -> Union[List[str], Exception]:
+        lazy = self.construct._lazy
+        try:
+            return await type(lazy[group[0]]).afetch_many([lazy[slot] for slot in group])
+        except Exception as e:
+            return e
+
+    def _store(self, groups: List[List[int]], results: Sequence[Union[List[str], Exception]]) -> None:
+        for group, texts in zip(groups, results, strict=True):
+            timing.count("fetches", len(group))
+            if isinstance(texts, Exception):
+                names = [self.construct._components[slot].name for slot in group]
+                logger.warning(f"Failed to fetch {names}, skipping: {texts}")
+                self._failures.update(group)
+                texts = [""] * len(group)
+            self._fetched.update(zip(group, texts, strict=True))
+
+    def _derive(self, pending: FrozenSet[int]) -> "_Rendering":
+        derived = self._derived.get(pending)
+        if derived is None:
+            texts = list(self.texts)
+            for slot in self.pending - pending:
+                texts[slot] = self._fetched[slot]
+            derived = self._derived[pending] = _Rendering(self.construct, texts, self.count, pending, self)
+        return derived
+
+
+# Threads fetching the lazy contexts of one build concurrently, shared by all builds
+FETCH_WORKERS = 8
+_fetch_pool: Optional[ThreadPoolExecutor] = None
+_fetch_pool_lock = threading.Lock()
+
+
+def _fetch_executor() -> ThreadPoolExecutor:
+    global _fetch_pool
+    with _fetch_pool_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="construct-fetch")
+        return _fetch_pool
+
+
+class CompiledConstruct:
+    """
+    An immutable, precompiled construct produced by `Weaver.compile()`.
+
+    Holds the priority-sorted components with their compiled templates, the rendered text
+    of every variable-free component (and its token cost, computed on first exact build),
+    and the drop order. `build` only does the per-request work (rendering variable
+    components, estimating or tokenizing, optimizing), so one instance can be shared
+    across threads and requests.
+
+    Attributes:
+        response_model: The Pydantic model enforcing the output structure.
+        estimator: Decides which builds are clearly within budget without tokenizing.
+        encoding: Name of the TOKENIZER_REGISTRY encoding behind the token counts, if known.
+    """
+
+    __slots__ = (
+        "_components",
+        "_insertion_order",
+        "_templates",
+        "_variables",
+        "_kinds",
+        "_static_text",
+        "_static",
+        "_lazy",
+        "_shrink_points",
+        "_fingerprint",
+        "_wire",
+        "_system_slots",
+        "_task_slots",
+        "_ledger_index",
+        "_candidates",
+        "_count",
+        "_count_batch",
+        "response_model",
+        "estimator",
+        "encoding",
+    )
+
+    _components: Tuple[PromptComponent, ...]
+    _insertion_order: Tuple[int, ...]
+    _templates: Tuple[CompiledTemplate, ...]
+    _variables: FrozenSet[str]
+    _kinds: Tuple[SegmentKind, ...]
+    _static_text: Tuple[Optional[str], ...]
+    _static: Optional[_StaticTokens]
+    _lazy: Dict[int, LazyContext]
+    _shrink_points: Dict[int, Tuple[int, ...]]
+    _fingerprint: Optional[str]
+    _wire: Optional[bytes]
+    _system_slots: Tuple[int, ...]
+    _task_slots: Tuple[int, ...]
+    _ledger_index: Dict[int, int]
+    _candidates: Tuple[int, ...]
+    _count: Callable[[str], int]
+    _count_batch: Callable[[Sequence[str]], List[int]]
+    response_model: Optional[Type[BaseModel]]
+    estimator: TokenEstimator
+    encoding: Optional[str]
+
+    def __init__(
+        self,
+        components: Sequence[PromptComponent],
+        sorted_components: Sequence[PromptComponent],
+        response_model: Optional[Type[BaseModel]],
+        count_tokens: Callable[[str], int],
+        estimator: Optional[TokenEstimator] = None,
+        count_batch: Optional[Callable[[Sequence[str]], List[int]]] = None,
+        encoding: Optional[str] = None,
+        dynamic: AbstractSet[str] = frozenset(),
+    ) -> None:
+        """
+        Args:
+            components: The resolved components, in insertion order.
+            sorted_components: The same components in prompt (priority) order.
+            response_model: The Pydantic model enforcing the output structure.
+            count_tokens: Function returning the exact token count of a string.
+            estimator: Cheap token bounds; defaults to TOKEN_ESTIMATOR.
+            count_batch: Function returning the exact token counts of several strings at once, used
+                to tokenize the component texts (defaults to calling `count_tokens` on each).
+            encoding: Name of the TOKENIZER_REGISTRY encoding `count_tokens` counts with. Required
+                by `to_wire`, so that the construct counts the same way where it is loaded.
+            dynamic: Names of the per-request dynamic context components.
+        """
+        setattr_ = super().__setattr__
+        insertion = {id(c): i for i, c in enumerate(components)}
+        ordered = tuple(sorted_components)
+        templates = tuple(TEMPLATE_CACHE.get(c.content) for c in ordered)
+        system_slots = tuple(i for i, c in enumerate(ordered) if c.type != ComponentType.PRIMITIVE)
+
+        # Removal candidates: priority ascending, stable on insertion order. Priority 10 (Critical)
+        # components are never candidates, to ensure they are preserved.
+        candidates = tuple(
+            sorted(
+                (slot for slot, c in enumerate(ordered) if c.priority < 10),
+                key=lambda slot: (ordered[slot].priority, insertion[id(ordered[slot])]),
+            )
+        )
+
+        setattr_("_components", ordered)
+        setattr_("_insertion_order", tuple(sorted(range(len(ordered)), key=lambda slot: insertion[id(ordered[slot])])))
+        setattr_("_templates", templates)
+        setattr_("_variables", frozenset().union(*(t.variables for t in templates)))
+        setattr_(
+            "_kinds",
+            tuple(
+                SegmentKind.DYNAMIC
+                if c.name in dynamic
+                else SegmentKind.VARIABLE
+                if t.variables
+                else SegmentKind.STATIC
+                for c, t in zip(ordered, templates, strict=True)
+            ),
+        )
+        # Lazy contexts are fetched per build, after planning; their content is only a stub
+        lazy = {slot: c for slot, c in enumerate(ordered) if isinstance(c, LazyContext)}
+        # Variable-free components are rendered once, here
+        static_text = tuple(None if t.variables or slot in lazy else t.render() for slot, t in enumerate(templates))
+        setattr_("_static_text", static_text)
+        setattr_("_static", None)
+        setattr_("_lazy", lazy)
+        # Non-critical variable-free system parts that may be truncated, with their cut points. Only
+        # parts rendered verbatim from their content, so that the cut points apply to the text.
+        setattr_(
+            "_shrink_points",
+            {
+                slot: points
+                for slot in system_slots
+                if ordered[slot].priority < 10
+                and static_text[slot] == ordered[slot].content
+                and (points := ordered[slot].shrink_points())
+            },
+        )
+        setattr_("_fingerprint", None)
+        setattr_("_wire", None)
+        setattr_("_system_slots", system_slots)
+        setattr_("_task_slots", tuple(i for i, c in enumerate(ordered) if c.type == ComponentType.PRIMITIVE))
+        setattr_("_ledger_index", {slot: pos for pos, slot in enumerate(system_slots)})
+        setattr_("_candidates", candidates)
+        setattr_("_count", count_tokens)
+        setattr_("_count_batch", count_batch or (lambda texts: [count_tokens(text) for text in texts]))
+        setattr_("response_model", response_model)
+        setattr_("estimator", estimator or TOKEN_ESTIMATOR)
+        setattr_("encoding", encoding)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("CompiledConstruct is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("CompiledConstruct is immutable")
+
+    @property
+    def components(self) -> Tuple[PromptComponent, ...]:
+        """The components in prompt (priority) order."""
+        return self._components
+
+    def to_wire(self) -> bytes:
+        """
+        Serializes the construct into a compact, versioned wire format (compressed JSON).
+
+        Components are shipped with their fields and class import paths, and the response model
+        by import path, so the construct can be rebuilt in another process with `from_wire`.
+        Rendered texts and token counts are not shipped; the loading side recomputes them.
+
+        Raises:
+            ValueError: If the construct has no encoding, or its response model cannot be imported.
+        """
+        data = self._wire
+        if data is None:
+            data = self._dump_wire()
+            super().__setattr__("_wire", data)
+        return data
+
+    def _dump_wire(self) -> bytes:
+        if self.encoding is None:
+            raise ValueError("Only constructs compiled with a registry encoding can be serialized")
+        response_model = None
+        if self.response_model is not None:
+            response_model = wire.import_path(self.response_model)
+            if response_model is None:
+                raise ValueError(f"Response model {self.response_model.__qualname__} is not importable")
+        return wire.dumps(
+            {
+                "components": [wire.encode_component(c) for c in self._components],
+                "insertion_order": self._insertion_order,
+                "dynamic": [
+                    c.name for c, kind in zip(self._components, self._kinds, strict=True) if kind == SegmentKind.DYNAMIC
+                ],
+                "response_model": response_model,
+                "encoding": self.encoding,
+                "ratios": self.estimator.ratios,
+                "margin": self.estimator.margin,
+            }
+        )
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """
+        Pickles the construct in its wire format, e.g. to send it to a worker process. Unpickling
+        reuses an identical construct already unpickled in the receiving process, so its static
+        texts are only tokenized once per process.
+        """
+        return (_unpickle, (self.fingerprint, self.to_wire()))
+
+    @classmethod
+    def from_wire(cls, data: bytes) -> "CompiledConstruct":
+        """
+        Rebuilds a construct serialized with `to_wire`, counting tokens with the shared tokenizer
+        of its encoding (which must be available in TOKENIZER_REGISTRY of this process).
+        """
+        payload = wire.loads(data)
+        ordered = [wire.decode_component(encoded) for encoded in payload["components"]]
+        encoding: str = payload["encoding"]
+        return cls(
+            [ordered[slot] for slot in payload["insertion_order"]],
+            ordered,
+            wire.resolve_path(payload["response_model"]) if payload["response_model"] else None,
+            lambda text: TOKENIZER_REGISTRY.count(text, encoding),
+            estimator=TokenEstimator(ScriptRatios(*payload["ratios"]), payload["margin"]),
+            count_batch=lambda texts: TOKENIZER_REGISTRY.count_batch(texts, encoding),
+            encoding=encoding,
+            dynamic=frozenset(payload.get("dynamic", ())),
+        )
+
+    def _static_tokens(self) -> _StaticTokens:
+        """
+        Tokenizes the variable-free parts and the junctions between adjacent ones, once.
+
+        All distinct strings (parts, separator, junction windows, and the pieces between the cut
+        points of shrinkable parts with their junction windows) are counted in one batch.
+        Concurrent first calls may both compute the (identical) result; the last one is kept.
+        """
+        static = self._static
+        if static is None:
+            static_text = self._static_text
+            texts = {slot: text for slot, text in enumerate(static_text) if text is not None}
+            windows: Dict[Tuple[int, int], Tuple[str, str, str]] = {}
+            system_slots = self._system_slots
+            for pos, (left, right) in enumerate(zip(system_slots, system_slots[1:], strict=False)):
+                left_text, right_text = static_text[left], static_text[right]
+                if left_text is not None and right_text is not None:
+                    windows[(pos, pos + 1)] = junction_windows(left_text, SYSTEM_SEPARATOR, right_text)
+
+            pieces: Dict[int, List[str]] = {}
+            piece_windows: Dict[int, List[Tuple[str, str, str]]] = {}
+            for slot, points in self._shrink_points.items():
+                text = texts[slot]
+                bounds = (0, *points, len(text))
+                pieces[slot] = [text[start:end] for start, end in zip(bounds, bounds[1:], strict=False)]
+                piece_windows[slot] = [
+                    junction_windows(left_piece, "", right_piece)
+                    for left_piece, right_piece in zip(pieces[slot], pieces[slot][1:], strict=False)
+                ]
+
+            unique = list(
+                dict.fromkeys(
+                    chain(
+                        texts.values(),
+                        (SYSTEM_SEPARATOR,),
+                        *windows.values(),
+                        *pieces.values(),
+                        *(chain.from_iterable(w) for w in piece_windows.values()),
+                    )
+                )
+            )
+            counts = dict(zip(unique, self._count_batch(unique), strict=True))
+
+            shrinks: Dict[int, Tuple[int, ...]] = {}
+            for slot, slot_pieces in pieces.items():
+                prefix_costs = [counts[slot_pieces[0]]]
+                for piece, (joined, left_tail, right_head) in zip(slot_pieces[1:-1], piece_windows[slot], strict=False):
+                    junction = counts[joined] - counts[left_tail] - counts[right_head]
+                    prefix_costs.append(prefix_costs[-1] + junction + counts[piece])
+                shrinks[slot] = tuple(prefix_costs)
+            static = _StaticTokens(
+                costs={slot: counts[text] for slot, text in texts.items()},
+                junctions={
+                    key: counts[joined] - counts[left_tail] - counts[right_head]
+                    for key, (joined, left_tail, right_head) in windows.items()
+                },
+                separator=counts[SYSTEM_SEPARATOR],
+                shrinks=shrinks,
+            )
+            super().__setattr__("_static", static)
+        return static
+
+    def _render(self, variables: Optional[Dict[str, Any]], count: Callable[[str], int]) -> _Rendering:
+        variables = variables or {}
+        lazy = self._lazy
+        recorder = timing.active_recorder()
+        if recorder is None:
+            texts = [
+                text if text is not None else lazy[slot].content if slot in lazy else template.render(**variables)
+                for slot, (text, template) in enumerate(zip(self._static_text, self._templates, strict=True))
+            ]
+            return _Rendering(self, texts, count, frozenset(lazy))
+
+        # Instrumented: the same, timing each template render
+        with recorder.phase("render"):
+            texts = []
+            for slot, (text, template) in enumerate(zip(self._static_text, self._templates, strict=True)):
+                if text is None and slot in lazy:
+                    text = lazy[slot].content
+                elif text is None:
+                    start = time.perf_counter()
+                    text = template.render(**variables)
+                    recorder.component(self._components[slot].name, time.perf_counter() - start)
+                texts.append(text)
+            return _Rendering(self, texts, count, frozenset(lazy))
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        A Merkle-style content hash of everything that determines the construct's builds: the
+        component fingerprints in prompt order, their insertion order and segment kinds, the
+        response model, the encoding and the estimator settings. Computed once.
+        """
+        fingerprint = self._fingerprint
+        if fingerprint is None:
+            header = {
+                "insertion_order": self._insertion_order,
+                "kinds": self._kinds,
+                "encoding": self.encoding,
+                "ratios": self.estimator.ratios,
+                "margin": self.estimator.margin,
+            }
+            fingerprint = digest(
+                "construct",
+                canonical_json(header),
+                class_fingerprint(self.response_model) if self.response_model is not None else "",
+                *(c.fingerprint for c in self._components),
+            )
+            super().__setattr__("_fingerprint", fingerprint)
+        return fingerprint
+
+    @property
+    def variables(self) -> FrozenSet[str]:
+        """Names of the template variables referenced by any component."""
+        return self._variables
+
+    @property
+    def kinds(self) -> Tuple[SegmentKind, ...]:
+        """The segment kind of each component, in prompt order."""
+        return self._kinds
+
+    @staticmethod
+    def _check_mode(optimization: str) -> None:
+        if optimization not in OPTIMIZATION_MODES:
+            raise ValueError(f"Unknown optimization mode '{optimization}'. Expected one of {OPTIMIZATION_MODES}")
+
+    def build(
+        self,
+        user_input: str,
+        variables: Optional[Dict[str, Any]] = None,
+        max_tokens: Optional[int] = None,
+        context: Optional[UserContext] = None,
+        optimization: str = "priority",
+    ) -> PromptConfiguration:
+        """
+        Build the final prompt configuration for one request.
+
+        Args:
+            user_input: The input data from the user.
+            variables: Optional variables to render components.
+            max_tokens: Maximum allowed estimated tokens. If exceeded, low priority components are dropped.
+            context: Optional UserContext (though encouraged).
+            optimization: Component selection strategy when over budget, one of OPTIMIZATION_MODES.
+        """
+        self._check_mode(optimization)
+        rendering = self._render(variables, self._count)
+        return self._build_one(rendering, user_input, max_tokens, context, optimization)
+
+    async def abuild(
+        self,
+        user_input: str,
+        variables: Optional[Dict[str, Any]] = None,
+        max_tokens: Optional[int] = None,
+        context: Optional[UserContext] = None,
+        optimization: str = "priority",
+    ) -> PromptConfiguration:
+        """
+        Build the final prompt configuration for one request without blocking the event loop.
+
+        Like `build`, but the surviving lazy contexts are fetched by awaiting their `afetch_many`
+        concurrently; rendering, planning and assembly run in worker threads.
+
+        Args:
+            user_input: The input data from the user.
+            variables: Optional variables to render components.
+            max_tokens: Maximum allowed estimated tokens. If exceeded, low priority components are dropped.
+            context: Optional UserContext (though encouraged).
+            optimization: Component selection strategy when over budget, one of OPTIMIZATION_MODES.
+        """
+        self._check_mode(optimization)
+        rendering = await asyncio.to_thread(self._render, variables, self._count)
+        while True:
+            plan = await asyncio.to_thread(self._plan, rendering, user_input, max_tokens, optimization)
+            fetch = sorted(rendering.pending - plan.dropped_slots)
+            if not fetch:
+                break
+            planned, rendering = rendering, await rendering.afetch(fetch)
+            if await asyncio.to_thread(self._settled, plan.tier, planned, rendering, fetch):
+                break
+        return await asyncio.to_thread(self._assemble, rendering, user_input, context, plan)
+
+    def build_many(
+        self,
+        inputs: Iterable[str],
+        variables: Optional[Dict[str, Any]] = None,
+        max_tokens: Optional[int] = None,
+        context: Optional[UserContext] = None,
+        optimization: str = "priority",
+    ) -> Iterator[PromptConfiguration]:
+        """
+        Lazily build one prompt configuration per user input, sharing everything else.
+
+        Components are rendered and tokenized once for the whole batch, and junction estimates
+        are shared between items, so each item only tokenizes its own input. Dropping decisions
+        are still made per item, since inputs may differ in size.
+
+        Args:
+            inputs: The user inputs, one per configuration.
+            variables: Optional variables to render components, shared by all inputs.
+            max_tokens: Maximum allowed estimated tokens per configuration.
+            context: Optional UserContext (though encouraged).
+            optimization: Component selection strategy when over budget, one of OPTIMIZATION_MODES.
+        """
+        self._check_mode(optimization)
+        rendering = self._render(variables, self._window_counter())
+        return (self._build_one(rendering, user_input, max_tokens, context, optimization) for user_input in inputs)
+
+    def build_stream(
+        self,
+        writer: TextWriter,
+        user_input: str,
+        variables: Optional[Dict[str, Any]] = None,
+        max_tokens: Optional[int] = None,
+        context: Optional[UserContext] = None,
+        optimization: str = "priority",
+    ) -> PromptConfiguration:
+        """
+        Build a prompt configuration and write it to `writer` as JSON (see
+        `PromptConfiguration.write_json`), without ever joining its messages.
+
+        Args:
+            writer: The text stream to write to, e.g. an open file or `socket.makefile("w")`.
+            user_input: The input data from the user.
+            variables: Optional variables to render components.
+            max_tokens: Maximum allowed estimated tokens. If exceeded, low priority components are dropped.
+            context: Optional UserContext (though encouraged).
+            optimization: Component selection strategy when over budget, one of OPTIMIZATION_MODES.
+
+        Returns:
+            The configuration that was written.
+        """
+        config = self.build(user_input, variables, max_tokens, context, optimization)
+        config.write_json(writer)
+        return config
+
+    def _window_counter(self) -> Callable[[str], int]:
+        """
+        Returns a token counter memoizing junction-window sized strings.
+
+        Within a batch, the windows around the tails of the shared parts recur for every item.
+        """
+        count = self._count
+        memo: Dict[str, int] = {}
+        limit = 2 * JUNCTION_WINDOW + len(USER_INPUT_SEPARATOR)
+
+        def count_window(text: str) -> int:
+            if len(text) > limit:
+                return count(text)
+            cached = memo.get(text)
+            if cached is None:
+                if len(memo) >= WINDOW_MEMO_SIZE:
+                    memo.clear()
+                cached = memo[text] = count(text)
+            return cached
+
+        return count_window
+
+    def _build_one(
+        self,
+        rendering: _Rendering,
+        user_input: str,
+        max_tokens: Optional[int],
+        context: Optional[UserContext],
+        optimization: str,
+    ) -> PromptConfiguration:
+        while True:
+            plan = self._plan(rendering, user_input, max_tokens, optimization)
+            # Fetch the lazy contexts that survived planning. If they are not the size their
+            # hints said, plan again with the actual sizes (which may fetch dropped ones).
+            fetch = sorted(rendering.pending - plan.dropped_slots)
+            if not fetch:
+                break
+            planned, rendering = rendering, rendering.fetch(fetch)
+            if self._settled(plan.tier, planned, rendering, fetch):
+                break
+        return self._assemble(rendering, user_input, context, plan)
+
+    def _settled(self, tier: EstimationTier, planned: _Rendering, fetched: _Rendering, slots: List[int]) -> bool:
+        """Whether the contexts fetched in `slots` leave the plan made on `planned` unchanged."""
+        if fetched.failed:
+            return False
+        if all(slot not in planned.hints and fetched.texts[slot] == planned.texts[slot] for slot in slots) or (
+            tier == EstimationTier.EXACT and all(fetched.costs()[slot] == planned.costs()[slot] for slot in slots)
+        ):
+            return True
+        logger.debug(f"Re-planning after fetching {[self._components[slot].name for slot in slots]}")
+        return False
+
+    def _assemble(
+        self,
+        rendering: _Rendering,
+        user_input: str,
+        context: Optional[UserContext],
+        plan: _Plan,
+    ) -> PromptConfiguration:
+        components = self._components
+        tier, dropped_slots, dropped_components_list, shrunk = plan
+        with timing.phase("assemble"):
+            texts = rendering.texts
+            task_part = next((texts[i] for i in self._task_slots if i not in dropped_slots), "")
+            user_parts = user_message_parts(task_part, user_input)
+            if shrunk:
+                texts = list(texts)
+                for slot, text in shrunk.items():
+                    texts[slot] = text
+
+            # Final Build with active components
+            active_slots = [i for i in self._system_slots if i not in dropped_slots]
+            segments = self._segments(texts, active_slots)
+
+            # 3. Provenance Capture
+            active_components = [components[i] for i in self._insertion_order if i not in dropped_slots]
+            metadata = {
+                "role": next((c.name for c in active_components if c.type == ComponentType.ROLE), "None"),
+                "mode": next((c.name for c in active_components if c.type == ComponentType.MODE), "None"),
+                "schema": self.response_model.__name__ if self.response_model else "None",
+                "token_estimation": tier.value,
+            }
+
+            if context:
+                metadata["owner_id"] = context.user_id
+
+            return PromptConfiguration.from_parts(
+                [segment.text for segment in segments],
+                user_parts,
+                response_model=self.response_model,
+                provenance_metadata=metadata,
+                dropped_components=dropped_components_list,
+                shrunk_components=[components[slot].name for slot in shrunk],
+                system_segments=segments,
+                prefix_hash=prefix_hash(segments),
+            )
+
+    def _plan(self, rendering: _Rendering, user_input: str, max_tokens: Optional[int], optimization: str) -> _Plan:
+        """Decides the estimation tier and which components to drop or shrink to fit `max_tokens`."""
+        timing.count("plans")
+        # Tiered estimation: exact tokenization only runs when the cheap upper bound does not
+        # prove that the prompt fits. The user input is bounded on its own, without joining it.
+        with timing.phase("estimate"):
+            if max_tokens is None:
+                tier = EstimationTier.UNBOUNDED
+            elif self.estimator.fits(
+                rendering.system_upper + rendering.task_upper + self.estimator.bounds(user_input).upper, max_tokens
+            ):
+                tier = EstimationTier.ESTIMATE
+            else:
+                tier = EstimationTier.EXACT
+
+        # Contexts that failed to fetch are left out, whatever the budget
+        dropped_slots: Set[int] = set(rendering.failed)
+        dropped_components_list: List[str] = []
+        shrunk: Dict[int, str] = {}
+        if tier == EstimationTier.EXACT and max_tokens is not None:
+            with timing.phase("optimize"):
+                self._optimize(
+                    rendering, user_input, max_tokens, optimization, dropped_slots, dropped_components_list, shrunk
+                )
+        return _Plan(tier, dropped_slots, dropped_components_list, shrunk)
+
+    def _segments(self, texts: List[str], slots: List[int]) -> List[PromptSegment]:
+        """Groups consecutive system parts of the same kind into segments."""
+        components = self._components
+        kinds = self._kinds
+        groups: List[List[int]] = []
+        for slot in slots:
+            if groups and kinds[groups[-1][0]] == kinds[slot]:
+                groups[-1].append(slot)
+            else:
+                groups.append([slot])
+
+        segments: List[PromptSegment] = []
+        cacheable = True
+        for position, group in enumerate(groups):
+            kind = kinds[group[0]]
+            cacheable = cacheable and kind != SegmentKind.DYNAMIC
+            text = SYSTEM_SEPARATOR.join(texts[slot] for slot in group)
+            segments.append(
+                PromptSegment(
+                    text=text + SYSTEM_SEPARATOR if position < len(groups) - 1 else text,
+                    kind=kind,
+                    components=[components[slot].name for slot in group],
+                    cache_breakpoint=cacheable,
+                )
+            )
+        return segments
+
+    def _optimize(
+        self,
+        rendering: _Rendering,
+        user_input: str,
+        max_tokens: int,
+        optimization: str,
+        dropped_slots: Set[int],
+        dropped_components_list: List[str],
+        shrunk: Dict[int, str],
+    ) -> None:
+        """
+        Drops components until the exact token count fits `max_tokens`, recording what was dropped.
+
+        A shrinkable component (see `PromptComponent.shrink_points`) is first truncated to its
+        longest prefix that fits, and only dropped when even its shortest prefix does not. The
+        truncated texts are recorded in `shrunk`, by slot.
+
+        Every part is tokenized at most once; the loops below only update the token ledger incrementally.
+        """
+        components = self._components
+        system_slots = self._system_slots
+        task_slots = self._task_slots
+        ledger_index = self._ledger_index
+        count = rendering.count
+        texts = rendering.texts
+        costs = rendering.costs()
+
+        ledger = TokenLedger(
+            count,
+            [texts[i] for i in system_slots],
+            SYSTEM_SEPARATOR,
+            costs=[costs[i] for i in system_slots],
+            junction_cache=rendering.junctions(),
+        )
+        for slot in dropped_slots:
+            if slot in ledger_index:
+                ledger.drop(ledger_index[slot])
+
+        input_cost = count(user_input)
+
+        def next_task() -> None:
+            slot = next((i for i in task_slots if i not in dropped_slots), None)
+            if slot is None:
+                ledger.set_tail(user_input, input_cost)
+                return
+            task_cost = costs[slot]
+            if task_cost is None:
+                task_cost = costs[slot] = count(texts[slot])
+            cost = task_cost + input_cost + junction_tokens(count, texts[slot], USER_INPUT_SEPARATOR, user_input)
+            # The ledger only reads the head of the tail, for the junction with the system parts
+            ledger.set_tail(format_user_message(texts[slot], user_input[:JUNCTION_WINDOW]), cost)
+
+        # 2. Optimization Logic
+        # PRD: "truncates 'Low Priority' contexts".
+        next_task()
+
+        def shrink(slot: int, estimated_tokens: int) -> bool:
+            points = self._shrink_points.get(slot)
+            if points is None:
+                return False
+            index = ledger_index[slot]
+            prefix_costs = self._static_tokens().shrinks[slot]
+            text = texts[slot]
+            # Longest prefix first; the precomputed cost rules out prefixes without re-estimating junctions
+            for k in range(len(points) - 1, -1, -1):
+                if ledger.total - ledger.cost(index) + prefix_costs[k] > max_tokens:
+                    continue
+                ledger.replace(index, text[: points[k]], prefix_costs[k])
+                if ledger.total <= max_tokens:
+                    component = components[slot]
+                    logger.info(
+                        f"Token limit exceeded ({estimated_tokens} > {max_tokens}). "
+                        f"Shrinking component '{component.name}' (Priority: {component.priority}) "
+                        f"to {k + 1} of {len(points) + 1} parts."
+                    )
+                    shrunk[slot] = text[: points[k]]
+                    return True
+            return False
+
+        def drop(slot: int, estimated_tokens: int) -> None:
+            component = components[slot]
+            logger.info(
+                f"Token limit exceeded ({estimated_tokens} > {max_tokens}). "
+                f"Dropping component '{component.name}' (Priority: {component.priority})."
+            )
+            dropped_slots.add(slot)
+            dropped_components_list.append(component.name)
+
+            if slot in ledger_index:
+                ledger.drop(ledger_index[slot])
+            else:
+                next_task()
+
+        if optimization == "optimal" and ledger.total > max_tokens:
+            # Knapsack over the non-critical system components; the priority loop below
+            # still handles primitives and any residual overflow from junction estimates.
+            separator_cost = self._static_tokens().separator
+            optional = [slot for slot in system_slots if components[slot].priority < 10 and slot not in dropped_slots]
+            weights = [ledger.cost(ledger_index[slot]) + separator_cost for slot in optional]
+            keep = select_components(
+                weights, [components[slot].priority for slot in optional], max_tokens - ledger.total + sum(weights)
+            )
+            logger.info(f"Optimal selection: keeping {len(keep)} of {len(optional)} optional components")
+            unselected = {slot for k, slot in enumerate(optional) if k not in keep}
+            for slot in self._candidates:
+                if slot in unselected:
+                    drop(slot, ledger.total)
+
+        candidates = iter(self._candidates)
+        while ledger.total > max_tokens:
+            timing.count("optimize_iterations")
+            estimated_tokens = ledger.total
+            logger.info(f"Optimization loop: estimated={estimated_tokens}, limit={max_tokens}")
+
+            to_remove = next((slot for slot in candidates if slot not in dropped_slots), None)
+            if to_remove is None:
+                logger.warning(
+                    f"Token limit exceeded ({estimated_tokens} > {max_tokens}), "
+                    "but only Critical (Priority 10) components remain. Cannot truncate further."
+                )
+                break
+
+            # Shrink or remove the lowest priority one
+            if shrink(to_remove, estimated_tokens):
+                break
+            drop(to_remove, estimated_tokens)
+
+            if len(dropped_slots) == len(components):
+                break
+
+
+# Constructs unpickled in this process, by fingerprint (see CompiledConstruct.__reduce__)
+UNPICKLED_CONSTRUCTS = 256
+_unpickled: "OrderedDict[str, CompiledConstruct]" = OrderedDict()
+_unpickled_lock = threading.Lock()
+
+
+def _unpickle(fingerprint: str, data: bytes) -> CompiledConstruct:
+    with _unpickled_lock:
+        compiled = _unpickled.get(fingerprint)
+        if compiled is not None:
+            _unpickled.move_to_end(fingerprint)
+            return compiled
+    compiled = CompiledConstruct.from_wire(data)
+    with _unpickled_lock:
+        _unpickled[fingerprint] = compiled
+        while len(_unpickled) > UNPICKLED_CONSTRUCTS:
+            _unpickled.popitem(last=False)
+    return compiled
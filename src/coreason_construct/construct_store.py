@@ -0,0 +1,157 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from loguru import logger
+
+from coreason_construct.compiled import CompiledConstruct
+from coreason_construct.utils.fingerprint import digest
+
+__all__ = ["ConstructStore"]
+
+# Hex digits of the construct id
+CONSTRUCT_ID_LENGTH = 32
+
+
+class _Registered(NamedTuple):
+    owner: str
+    compiled: CompiledConstruct
+
+
+class ConstructStore:
+    """
+    Registered constructs, by id: kept compiled in a bounded LRU and persisted to SQLite.
+
+    Constructs are stored in their wire format (`CompiledConstruct.to_wire`), so a construct
+    evicted from memory, or registered before a restart, is rebuilt without weaving it again.
+    Every construct belongs to the user who registered it; other users can neither use nor
+    delete it. The id is derived from the owner and the construct fingerprint, so a user
+    registering identical constructs gets the same id. Lookups trust the memory tier: a
+    construct deleted by another process sharing the database stays usable here until it is
+    evicted. Thread-safe.
+
+    Attributes:
+        database: Path of the SQLite database file, or ":memory:".
+        maxsize: Maximum number of constructs kept compiled in memory.
+        hits: Number of lookups served from memory.
+        misses: Number of lookups that read the database.
+    """
+
+    def __init__(self, database: str = ":memory:", maxsize: int = 256) -> None:
+        """
+        Args:
+            database: Path of the SQLite database file (or a SQLite URI). The default in-memory
+                database does not survive restarts and is not shared between processes.
+            maxsize: Maximum number of constructs kept compiled in memory.
+        """
+        self.database = database
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._constructs: OrderedDict[str, _Registered] = OrderedDict()
+        self._lock = threading.Lock()
+        # One connection shared by all threads; queries are serialized by `_db_lock`
+        self._connection = sqlite3.connect(database, check_same_thread=False, uri=database.startswith("file:"))
+        self._db_lock = threading.Lock()
+        with self._db_lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS constructs "
+                "(id TEXT PRIMARY KEY, owner TEXT NOT NULL, fingerprint TEXT NOT NULL, wire BLOB NOT NULL, "
+                "created REAL NOT NULL)"
+            )
+
+    @property
+    def persistent(self) -> bool:
+        """Whether the constructs are stored in a database file, shared by processes and restarts."""
+        return self.database != ":memory:" and "mode=memory" not in self.database
+
+    def register(self, compiled: CompiledConstruct, owner: str) -> str:
+        """
+        Persists a construct on behalf of `owner` (a user id) and returns its id.
+
+        Raises:
+            ValueError: If the construct cannot be serialized (see `CompiledConstruct.to_wire`).
+        """
+        fingerprint = compiled.fingerprint
+        construct_id = digest(owner, fingerprint)[:CONSTRUCT_ID_LENGTH]
+        data = compiled.to_wire()
+        with self._db_lock, self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO constructs VALUES (?, ?, ?, ?, ?)",
+                (construct_id, owner, fingerprint, data, time.time()),
+            )
+        self._put(construct_id, _Registered(owner, compiled))
+        logger.info(f"Registered construct '{construct_id}'", construct_id=construct_id, user_id=owner)
+        return construct_id
+
+    def get(self, construct_id: str, owner: str) -> Optional[CompiledConstruct]:
+        """Returns the construct `owner` registered under `construct_id`, or None if there is none."""
+        with self._lock:
+            registered = self._constructs.get(construct_id)
+            if registered is not None:
+                self._constructs.move_to_end(construct_id)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if registered is None:
+            with self._db_lock:
+                row = self._connection.execute(
+                    "SELECT owner, wire FROM constructs WHERE id = ?", (construct_id,)
+                ).fetchone()
+            if row is None:
+                return None
+            registered = _Registered(row[0], CompiledConstruct.from_wire(row[1]))
+            self._put(construct_id, registered)
+        return registered.compiled if registered.owner == owner else None
+
+    def delete(self, construct_id: str, owner: str) -> bool:
+        """Deletes the construct `owner` registered under `construct_id`. Returns whether there was one."""
+        with self._db_lock, self._connection:
+            deleted = self._connection.execute(
+                "DELETE FROM constructs WHERE id = ? AND owner = ?", (construct_id, owner)
+            ).rowcount
+        if deleted:
+            with self._lock:
+                self._constructs.pop(construct_id, None)
+            logger.info(f"Deleted construct '{construct_id}'", construct_id=construct_id, user_id=owner)
+        return bool(deleted)
+
+    def _put(self, construct_id: str, registered: _Registered) -> None:
+        with self._lock:
+            self._constructs[construct_id] = registered
+            self._constructs.move_to_end(construct_id)
+            while len(self._constructs) > self.maxsize:
+                self._constructs.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._db_lock:
+            count: int = self._connection.execute("SELECT COUNT(*) FROM constructs").fetchone()[0]
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss counters, the number of constructs in memory and the number registered."""
+        registered = len(self)
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._constructs),
+                "maxsize": self.maxsize,
+                "registered": registered,
+            }
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self._connection.close()
@@ -8,44 +8,161 @@
 #
 # Source Code: https://github.com/CoReason-AI/coreason_construct
 
-from typing import Any
+import asyncio
+from abc import abstractmethod
+from typing import Any, ClassVar, List, Optional, Sequence, Tuple, cast
 
 from coreason_identity.models import UserContext
 from loguru import logger
+from pydantic import Field
 
+from coreason_construct.contexts.providers import CONTEXT_PROVIDERS
 from coreason_construct.schemas.base import ComponentType, PromptComponent
 
 
-class PatientHistory(PromptComponent):
+class LazyContext(PromptComponent):
     """
-    Dynamic Context: Injects patient history based on ID.
+    A dynamic context whose content is only fetched if it survives budget planning.
+
+    `content` is a cheap stub describing the context; the text that goes into the prompt is
+    returned by `fetch`, which a construct calls only for the lazy contexts it keeps after
+    planning against `max_tokens`, using `size_hint` as their cost. If a fetched text turns out
+    to have a different size, the build is planned again with the actual size. The fetched text
+    is used verbatim, not rendered as a template.
+
+    The contexts kept by a build are fetched concurrently. Those of a class with `batched` set
+    are fetched together, with one `fetch_many` call (e.g. one query for a whole cohort).
+
+    Attributes:
+        size_hint: Expected token count of the fetched text, or None for the token count of `content`.
+        batched: Whether the contexts of this class are fetched together by `fetch_many`.
     """
 
+    batched: ClassVar[bool] = False
+
     type: ComponentType = ComponentType.CONTEXT
+    size_hint: Optional[int] = Field(default=None, ge=0)
+
+    def fetch(self) -> str:
+        """
+        Returns the text to put in the prompt. Subclasses load it here (e.g. from a database);
+        the default returns `content`.
+        """
+        return self.content
+
+    @classmethod
+    def fetch_many(cls, contexts: Sequence["LazyContext"]) -> List[str]:
+        """
+        Returns the texts of several contexts of this class, in order. The default fetches them
+        one by one; batched subclasses load them at once.
+        """
+        return [context.fetch() for context in contexts]
+
+    @classmethod
+    async def afetch_many(cls, contexts: Sequence["LazyContext"]) -> List[str]:
+        """
+        Asynchronously returns the texts of several contexts of this class, in order.
+
+        Awaited by `CompiledConstruct.abuild`. The default runs `fetch_many` in a worker thread;
+        contexts with an async client override it to fetch without a thread.
+        """
+        return await asyncio.to_thread(cls.fetch_many, contexts)
+
+
+def _provided(family: str, record_id: str, heading: str) -> Optional[str]:
+    """Returns the text the provider of `family` holds for `record_id` under `heading`, if any."""
+    provider = CONTEXT_PROVIDERS.get(family)
+    if provider is None:
+        return None
+    text = provider.get(record_id)
+    if text is None:
+        logger.warning(f"No {family} data found for '{record_id}'")
+        return None
+    return f"{heading}\n{text}"
+
+
+class _ProvidedContext(LazyContext):
+    """
+    A lazy context whose text the provider of its family in CONTEXT_PROVIDERS holds by id.
+
+    Batched: the contexts of a build are loaded with one `prefetch` of their ids. Ids the
+    provider does not hold, or a family without a provider, fall back to `content`.
+    """
+
+    batched = True
+    family: ClassVar[str]
+
+    @abstractmethod
+    def record(self) -> Tuple[str, str]:
+        """Returns the id of the record and the heading put before its text."""
+
+    def fetch(self) -> str:
+        """Returns the text from the provider of the family, if one is set."""
+        return _provided(self.family, *self.record()) or self.content
 
-    def __init__(self, patient_id: str, priority: int = 7, **data: Any) -> None:
+    @classmethod
+    def fetch_many(cls, contexts: Sequence[LazyContext]) -> List[str]:
+        records = [cast(_ProvidedContext, context).record() for context in contexts]
+        provider = CONTEXT_PROVIDERS.get(cls.family)
+        if provider is not None:
+            provider.prefetch(record_id for record_id, _ in records)
+        return [
+            _provided(cls.family, *record) or context.content for record, context in zip(records, contexts, strict=True)
+        ]
+
+
+class PatientHistory(_ProvidedContext):
+    """
+    Dynamic Context: Injects patient history based on ID.
+    """
+
+    family = "PatientHistory"
+    patient_id: str = ""
+
+    def __init__(self, patient_id: str, priority: int = 7, size_hint: Optional[int] = None, **data: Any) -> None:
         if "content" not in data:
             data["content"] = (
                 f"Patient History for ID: {patient_id}.\n"
                 "[Dynamic patient history data would be injected here from the database]"
             )
-        super().__init__(name=f"PatientHistory_{patient_id}", priority=priority, type=ComponentType.CONTEXT, **data)
+        super().__init__(
+            name=f"PatientHistory_{patient_id}",
+            priority=priority,
+            type=ComponentType.CONTEXT,
+            patient_id=patient_id,
+            size_hint=size_hint,
+            **data,
+        )
+
+    def record(self) -> Tuple[str, str]:
+        return self.patient_id, f"Patient History for ID: {self.patient_id}."
 
 
-class StudyProtocol(PromptComponent):
+class StudyProtocol(_ProvidedContext):
     """
     Dynamic Context: Injects study protocol based on NCT ID.
     """
 
-    type: ComponentType = ComponentType.CONTEXT
+    family = "StudyProtocol"
+    nct_id: str = ""
 
-    def __init__(self, nct_id: str, priority: int = 7, **data: Any) -> None:
+    def __init__(self, nct_id: str, priority: int = 7, size_hint: Optional[int] = None, **data: Any) -> None:
         if "content" not in data:
             data["content"] = (
                 f"Study Protocol for NCT ID: {nct_id}.\n"
                 "[Dynamic protocol data would be injected here from the database]"
             )
-        super().__init__(name=f"StudyProtocol_{nct_id}", priority=priority, type=ComponentType.CONTEXT, **data)
+        super().__init__(
+            name=f"StudyProtocol_{nct_id}",
+            priority=priority,
+            type=ComponentType.CONTEXT,
+            nct_id=nct_id,
+            size_hint=size_hint,
+            **data,
+        )
+
+    def record(self) -> Tuple[str, str]:
+        return self.nct_id, f"Study Protocol for NCT ID: {self.nct_id}."
 
 
 def create_static_context(name: str, content: str, priority: int = 5) -> PromptComponent:
@@ -76,12 +193,14 @@ GxP_Context = create_static_context(
 class ContextLibrary:
     @staticmethod
     def register_context(name: str, component: Any, context: UserContext) -> None:
+        from coreason_construct.contexts.planner import DEPENDENCY_PLANNER
         from coreason_construct.contexts.registry import CONTEXT_REGISTRY
 
         if not context:
             raise ValueError("UserContext is required")
         logger.debug("Registering artifact", user_id=context.user_id, type="context", name=name)
         CONTEXT_REGISTRY[name] = component
+        DEPENDENCY_PLANNER.invalidate()
 
     @staticmethod
     def get_context(name: str, context: UserContext) -> Any:
@@ -0,0 +1,207 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import inspect
+import threading
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple, Type
+
+from loguru import logger
+
+from coreason_construct.schemas.base import PromptComponent
+from coreason_construct.utils.registry import VersionedRegistry
+
+
+class StepKind(str, Enum):
+    """
+    How a planned dependency is satisfied.
+    """
+
+    STATIC = "STATIC"  # A registered component instance
+    DYNAMIC = "DYNAMIC"  # A registered class, instantiated from context data at add time
+    MISSING = "MISSING"  # Not in the registry
+    REPEAT = "REPEAT"  # Already planned earlier in the same closure
+
+
+class PlanStep(NamedTuple):
+    """
+    A single dependency in a plan, listed in depth-first pre-order.
+
+    Attributes:
+        name: The dependency name as referenced.
+        parent: Name of the component requiring it (None for the plan's root dependencies).
+        kind: How the dependency is satisfied.
+        item: The registered instance or class, if any.
+        end: Index one past the last step of this dependency's sub-tree.
+    """
+
+    name: str
+    parent: Optional[str]
+    kind: StepKind
+    item: Any
+    end: int
+
+
+class DependencyPlan(NamedTuple):
+    """
+    The precomputed transitive closure of a dependency list.
+
+    Attributes:
+        steps: Dependencies in depth-first pre-order (the order in which the Weaver adds them).
+        order: Topological order of the static closure (dependencies before dependents).
+        cycles: Back edges `(parent, dependency)` found while planning.
+    """
+
+    steps: Tuple[PlanStep, ...]
+    order: Tuple[str, ...]
+    cycles: Tuple[Tuple[Optional[str], str], ...]
+
+
+class InitParameter(NamedTuple):
+    """A constructor parameter of a dynamic context class."""
+
+    name: str
+    required: bool
+
+
+EMPTY_PLAN = DependencyPlan(steps=(), order=(), cycles=())
+
+
+class DependencyPlanner:
+    """
+    Computes and caches dependency closures and dynamic-class constructor signatures.
+
+    Plans are keyed by the dependency list and the registry version, so they are computed
+    once per registry state. Unversioned registries (plain dicts) are planned without caching.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._plans: OrderedDict[Tuple[int, int, Tuple[str, ...]], Tuple[Mapping[str, Any], DependencyPlan]] = (
+            OrderedDict()
+        )
+        self._init_parameters: Dict[Type[PromptComponent], Tuple[InitParameter, ...]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def registry() -> Mapping[str, Any]:
+        # Looked up at call time so that a replaced registry module attribute is honoured.
+        from coreason_construct.contexts import registry
+
+        return registry.CONTEXT_REGISTRY
+
+    def invalidate(self) -> None:
+        """Drops all cached plans and constructor signatures."""
+        with self._lock:
+            self._plans.clear()
+            self._init_parameters.clear()
+
+    def init_parameters(self, component_class: Type[PromptComponent]) -> Tuple[InitParameter, ...]:
+        """
+        Returns the constructor parameters of a dynamic context class, inspecting it only once.
+        """
+        with self._lock:
+            cached = self._init_parameters.get(component_class)
+        if cached is not None:
+            return cached
+
+        parameters = tuple(
+            InitParameter(
+                name=name,
+                required=param.default == inspect.Parameter.empty
+                and param.kind not in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD),
+            )
+            for name, param in inspect.signature(component_class.__init__).parameters.items()
+            if name != "self"
+        )
+        with self._lock:
+            self._init_parameters[component_class] = parameters
+        return parameters
+
+    def plan(self, dependencies: Sequence[str], registry: Optional[Mapping[str, Any]] = None) -> DependencyPlan:
+        """
+        Returns the dependency plan for `dependencies`, computing it on first use.
+
+        Args:
+            dependencies: The dependency names of a component.
+            registry: The context registry to plan against (defaults to CONTEXT_REGISTRY).
+        """
+        if not dependencies:
+            return EMPTY_PLAN
+        if registry is None:
+            registry = self.registry()
+        if not isinstance(registry, VersionedRegistry):
+            return self._build(tuple(dependencies), registry)
+
+        key = (id(registry), registry.version, tuple(dependencies))
+        with self._lock:
+            cached = self._plans.get(key)
+            if cached is not None and cached[0] is registry:
+                self._plans.move_to_end(key)
+                return cached[1]
+
+        plan = self._build(key[2], registry)
+        with self._lock:
+            self._plans[key] = (registry, plan)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+        return plan
+
+    @staticmethod
+    def _build(dependencies: Tuple[str, ...], registry: Mapping[str, Any]) -> DependencyPlan:
+        steps: List[List[Any]] = []
+        planned: Set[str] = set()
+        on_path: Set[str] = set()
+        postorder: List[str] = []
+        cycles: List[Tuple[Optional[str], str]] = []
+
+        # Iterative depth-first traversal: (step index of the owner, owner name, remaining dependencies)
+        stack: List[Tuple[int, Optional[str], Iterator[str]]] = [(-1, None, iter(dependencies))]
+        while stack:
+            owner, owner_name, remaining = stack[-1]
+            dep_name = next(remaining, None)
+
+            if dep_name is None:
+                stack.pop()
+                if owner >= 0:
+                    steps[owner][4] = len(steps)
+                    on_path.discard(steps[owner][0])
+                    postorder.append(steps[owner][0])
+                continue
+
+            index = len(steps)
+            if dep_name in planned:
+                if dep_name in on_path:
+                    cycles.append((owner_name, dep_name))
+                steps.append([dep_name, owner_name, StepKind.REPEAT, None, index + 1])
+                continue
+
+            item = registry.get(dep_name)
+            if isinstance(item, PromptComponent):
+                planned.add(dep_name)
+                on_path.add(dep_name)
+                steps.append([dep_name, owner_name, StepKind.STATIC, item, index + 1])
+                stack.append((index, item.name, iter(list(getattr(item, "dependencies", [])))))
+            elif isinstance(item, type) and issubclass(item, PromptComponent):
+                planned.add(dep_name)
+                steps.append([dep_name, owner_name, StepKind.DYNAMIC, item, index + 1])
+            else:
+                steps.append([dep_name, owner_name, StepKind.MISSING, None, index + 1])
+
+        if cycles:
+            logger.debug(f"Dependency cycles detected while planning {list(dependencies)}: {cycles}")
+
+        return DependencyPlan(
+            steps=tuple(PlanStep(*step) for step in steps), order=tuple(postorder), cycles=tuple(cycles)
+        )
+
+
+DEPENDENCY_PLANNER = DependencyPlanner()
@@ -0,0 +1,275 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from loguru import logger
+
+__all__ = ["CONTEXT_PROVIDERS", "ContextProvider", "SQLiteContextProvider"]
+
+# Upper bound on the ids bound to one SQLite query (the default SQLITE_MAX_VARIABLE_NUMBER of older builds is 999)
+SQLITE_BATCH_SIZE = 900
+
+
+class _Entry(NamedTuple):
+    text: Optional[str]
+    expires: float
+
+
+class _Flight:
+    """A load in progress, waited on by the other threads requesting the same id."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.text: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class ContextProvider(ABC):
+    """
+    Loads the data of dynamic contexts (e.g. patient histories) by id.
+
+    Subclasses implement `load_many`, a batch query. On top of it, the provider keeps loaded
+    texts in a bounded LRU cache with a TTL (ids that were not found are cached too), loads
+    whole cohorts in a few batches with `prefetch`, and coalesces concurrent requests: while an
+    id is being loaded, other threads requesting it wait for that load instead of starting
+    their own. Thread-safe.
+
+    Attributes:
+        maxsize: Maximum number of ids cached.
+        ttl: Seconds a loaded text stays valid, or None for no expiry.
+        batch_size: Maximum number of ids passed to one `load_many` call.
+        hits: Number of lookups served from the cache or by a load in flight.
+        misses: Number of lookups that had to load.
+        loads: Number of `load_many` calls.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        ttl: Optional[float] = 300.0,
+        batch_size: int = 500,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            maxsize: Maximum number of ids cached.
+            ttl: Seconds a loaded text stays valid, or None for no expiry.
+            batch_size: Maximum number of ids passed to one `load_many` call.
+            clock: Monotonic time source, in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def load_many(self, ids: Sequence[str]) -> Dict[str, str]:
+        """
+        Loads the texts of several ids at once, e.g. with one database query.
+
+        Args:
+            ids: Distinct ids, at most `batch_size` of them.
+
+        Returns:
+            The text of every id that was found; ids that were not found are left out.
+        """
+
+    def get(self, record_id: str) -> Optional[str]:
+        """
+        Returns the text for `record_id`, or None if it does not exist.
+
+        Raises:
+            Exception: Whatever `load_many` raised, also in the threads waiting for that load.
+        """
+        with self._lock:
+            entry = self._lookup(record_id)
+            if entry is not None:
+                self.hits += 1
+                return entry.text
+            flight = self._flights.get(record_id)
+            if flight is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._flights[record_id] = _Flight()
+        if flight is not None:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.text
+        return self._load([record_id])[record_id]
+
+    def prefetch(self, ids: Iterable[str]) -> int:
+        """
+        Loads every id that is neither cached nor being loaded, in batches of `batch_size`.
+
+        Args:
+            ids: The ids about to be requested (e.g. the patients of a cohort).
+
+        Returns:
+            The number of ids loaded.
+        """
+        with self._lock:
+            pending = [
+                record_id
+                for record_id in dict.fromkeys(ids)
+                if record_id not in self._flights and self._lookup(record_id) is None
+            ]
+            for record_id in pending:
+                self._flights[record_id] = _Flight()
+        for start in range(0, len(pending), self.batch_size):
+            end = start + self.batch_size
+            try:
+                self._load(pending[start:end])
+            except BaseException as e:
+                # Release the threads waiting for the ids of the batches not loaded
+                self._fail(pending[end:], e)
+                raise
+        return len(pending)
+
+    def _lookup(self, record_id: str) -> Optional[_Entry]:
+        # Called with the lock held
+        entry = self._entries.get(record_id)
+        if entry is None:
+            return None
+        if entry.expires <= self._clock():
+            del self._entries[record_id]
+            return None
+        self._entries.move_to_end(record_id)
+        return entry
+
+    def _load(self, ids: List[str]) -> Dict[str, Optional[str]]:
+        """Loads `ids`, whose flights the caller registered, and completes their flights."""
+        with self._lock:
+            self.loads += 1
+        try:
+            found = self.load_many(ids)
+        except BaseException as e:
+            logger.error(f"Failed to load {len(ids)} context record(s): {e}")
+            self._fail(ids, e)
+            raise
+
+        texts = {record_id: found.get(record_id) for record_id in ids}
+        expires = self._clock() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            for record_id, text in texts.items():
+                self._entries[record_id] = _Entry(text, expires)
+                self._entries.move_to_end(record_id)
+                flight = self._flights.pop(record_id)
+                flight.text = text
+                flight.done.set()
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return texts
+
+    def _fail(self, ids: List[str], error: BaseException) -> None:
+        with self._lock:
+            flights = [self._flights.pop(record_id) for record_id in ids]
+        for flight in flights:
+            flight.error = error
+            flight.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss/load counters and the current cache size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self) -> None:
+        """Empties the cache and resets the counters. Loads in flight are not affected."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.loads = 0
+
+
+class SQLiteContextProvider(ContextProvider):
+    """
+    Reference provider reading context texts from a SQLite table.
+
+    Attributes:
+        table: Name of the table holding the texts.
+        id_column: Name of the column holding the ids.
+        text_column: Name of the column holding the texts.
+    """
+
+    def __init__(
+        self,
+        database: str,
+        table: str,
+        id_column: str = "id",
+        text_column: str = "content",
+        maxsize: int = 10_000,
+        ttl: Optional[float] = 300.0,
+        batch_size: int = 500,
+    ) -> None:
+        """
+        Args:
+            database: Path of the database file (or a SQLite URI).
+            table: Name of the table holding the texts.
+            id_column: Name of the column holding the ids.
+            text_column: Name of the column holding the texts.
+            maxsize: Maximum number of ids cached.
+            ttl: Seconds a loaded text stays valid, or None for no expiry.
+            batch_size: Maximum number of ids passed to one `load_many` call.
+
+        Raises:
+            ValueError: If a table or column name is not a plain identifier.
+        """
+        for identifier in (table, id_column, text_column):
+            if not identifier.isidentifier():
+                raise ValueError(f"Invalid SQL identifier '{identifier}'")
+        super().__init__(maxsize, ttl, batch_size)
+        self.table = table
+        self.id_column = id_column
+        self.text_column = text_column
+        # One connection shared by all threads; queries are serialized by `_db_lock`
+        self._connection = sqlite3.connect(database, check_same_thread=False, uri=database.startswith("file:"))
+        self._db_lock = threading.Lock()
+
+    def load_many(self, ids: Sequence[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        with self._db_lock:
+            for start in range(0, len(ids), SQLITE_BATCH_SIZE):
+                batch = ids[start : start + SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f'SELECT "{self.id_column}", "{self.text_column}" FROM "{self.table}" '
+                    f'WHERE "{self.id_column}" IN ({placeholders})',
+                    batch,
+                )
+                found.update((str(record_id), text) for record_id, text in rows if text is not None)
+        return found
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self._connection.close()
+
+
+# Providers backing the dynamic contexts, by context family (e.g. "PatientHistory")
+CONTEXT_PROVIDERS: Dict[str, ContextProvider] = {}
@@ -8,14 +8,17 @@
 #
 # Source Code: https://github.com/CoReason-AI/coreason_construct
 
-from typing import Dict, Type, Union
+from typing import Type, Union
 
 from coreason_construct.contexts.library import GxP_Context, HIPAA_Context, PatientHistory, StudyProtocol
 from coreason_construct.schemas.base import PromptComponent
+from coreason_construct.utils.registry import VersionedRegistry
 
-CONTEXT_REGISTRY: Dict[str, Union[PromptComponent, Type[PromptComponent]]] = {
-    "HIPAA": HIPAA_Context,
-    "GxP": GxP_Context,
-    "PatientHistory": PatientHistory,
-    "StudyProtocol": StudyProtocol,
-}
+CONTEXT_REGISTRY: VersionedRegistry[str, Union[PromptComponent, Type[PromptComponent]]] = VersionedRegistry(
+    {
+        "HIPAA": HIPAA_Context,
+        "GxP": GxP_Context,
+        "PatientHistory": PatientHistory,
+        "StudyProtocol": StudyProtocol,
+    }
+)
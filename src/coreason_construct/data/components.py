@@ -8,11 +8,11 @@
 #
 # Source Code: https://github.com/CoReason-AI/coreason_construct
 
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Tuple, Union
 
 from pydantic import BaseModel
 
-from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.schemas.base import ComponentType, PromptComponent, cut_points
 
 
 class FewShotExample(BaseModel):
@@ -38,6 +38,10 @@ class FewShotBank(PromptComponent):
         content = f"Here are some examples of how to perform the task:\n\n{formatted_examples}"
         super().__init__(name=name, type=ComponentType.DATA, content=content, priority=priority, examples=examples)
 
+    def shrink_points(self) -> Tuple[int, ...]:
+        """Examples are dropped from the end, one at a time, keeping at least one."""
+        return cut_points(self.content, r"\n\nInput: ", skip=1)
+
 
 class NegativeExample(PromptComponent):
     """
@@ -51,6 +55,10 @@ class NegativeExample(PromptComponent):
         content = f"NEGATIVE CONSTRAINTS (DO NOT DO THIS):\n{formatted_negatives}"
         super().__init__(name=name, type=ComponentType.DATA, content=content, priority=priority)
 
+    def shrink_points(self) -> Tuple[int, ...]:
+        """Bullets are dropped from the end, one at a time, keeping at least one."""
+        return cut_points(self.content, r"\n- ", skip=1)
+
 
 class DataDictionary(PromptComponent):
     """
@@ -63,3 +71,7 @@ class DataDictionary(PromptComponent):
         formatted_terms = "\n".join(f"{term}: {definition}" for term, definition in terms.items())
         content = f"DATA DICTIONARY / DEFINITIONS:\n{formatted_terms}"
         super().__init__(name=name, type=ComponentType.DATA, content=content, priority=priority)
+
+    def shrink_points(self) -> Tuple[int, ...]:
+        """Terms are dropped from the end, one line at a time, keeping at least one."""
+        return cut_points(self.content, r"\n", skip=1)
@@ -55,7 +55,14 @@ def resolve_command(args: argparse.Namespace, context: UserContext) -> None:
             return
 
     config = weaver.resolve_construct(args.construct_id, variables, context)
-    print(config.model_dump_json(indent=2))
+    # Stream the messages part by part, so that large prompts are never joined in memory
+    output = getattr(args, "output", None)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            config.write_json(f)
+    else:
+        config.write_json(sys.stdout)
+        sys.stdout.write("\n")
 
 
 def visualize_command(args: argparse.Namespace, context: UserContext) -> None:
@@ -75,6 +82,7 @@ def main() -> None:
     resolve_parser = subparsers.add_parser("resolve")
     resolve_parser.add_argument("--construct-id", required=True)
     resolve_parser.add_argument("--variables-file")
+    resolve_parser.add_argument("--output", help="Write the configuration to this file instead of stdout")
 
     visualize_parser = subparsers.add_parser("visualize")
     visualize_parser.add_argument("--construct-id", required=True)
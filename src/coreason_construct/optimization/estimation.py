@@ -0,0 +1,118 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import math
+from enum import Enum
+from typing import NamedTuple, Optional
+
+__all__ = [
+    "CL100K_RATIOS",
+    "DEFAULT_MARGIN",
+    "TOKEN_ESTIMATOR",
+    "EstimationTier",
+    "ScriptRatios",
+    "TokenBounds",
+    "TokenEstimator",
+]
+
+# The longest token in cl100k_base, in bytes. Every token covers at least one and at most this many bytes.
+MAX_TOKEN_BYTES = 128
+
+# Fraction of the limit that the upper bound must stay below for the cheap tier to decide.
+DEFAULT_MARGIN = 0.1
+
+
+class EstimationTier(str, Enum):
+    """
+    Which tier decided the token budget, as recorded in the provenance metadata.
+    """
+
+    UNBOUNDED = "unbounded"  # No limit was given, nothing was counted
+    ESTIMATE = "estimate"  # The cheap byte-ratio bound proved the prompt fits
+    EXACT = "exact"  # The prompt was (close to or over) the limit and was tokenized exactly
+
+
+class ScriptRatios(NamedTuple):
+    """
+    Calibrated bytes-per-token ranges of an encoding, per script class.
+
+    Attributes:
+        ascii_min: Fewest ASCII bytes per token (dense text: JSON, digits, punctuation).
+        ascii_max: Most ASCII bytes per token (prose and code).
+        other_min: Fewest non-ASCII (UTF-8) bytes per token (emoji, rare CJK).
+        other_max: Most non-ASCII bytes per token (Cyrillic, Latin with diacritics).
+    """
+
+    ascii_min: float
+    ascii_max: float
+    other_min: float
+    other_max: float
+
+
+# The maxima were measured on English prose, Python source, JSON, digit runs, punctuation,
+# Cyrillic, Greek, Chinese, Japanese and emoji; long whitespace runs can beat the lower bound,
+# which is only used for reporting. The minima are the worst case of byte-level BPE, one token
+# per byte, which adversarial inputs ("1,1,1," or "a\na\n") do reach: the upper bound, which
+# decides whether exact tokenization can be skipped, must hold for every input.
+CL100K_RATIOS = ScriptRatios(ascii_min=1.0, ascii_max=8.0, other_min=1.0, other_max=6.0)
+
+
+class TokenBounds(NamedTuple):
+    """Lower and upper estimates of a token count."""
+
+    lower: int
+    upper: int
+
+
+class TokenEstimator:
+    """
+    Cheap token-count bounds from UTF-8 byte counts, used to skip exact tokenization when
+    a prompt is clearly within its budget.
+
+    The bounds combine the calibrated per-script ratios with the hard limits of byte-level
+    BPE (between 1 and MAX_TOKEN_BYTES bytes per token). The cheap tier only decides when
+    the upper bound is at least `margin * limit` below the limit; anything closer is left
+    to exact tokenization.
+    """
+
+    def __init__(self, ratios: ScriptRatios = CL100K_RATIOS, margin: float = DEFAULT_MARGIN) -> None:
+        """
+        Args:
+            ratios: Calibrated bytes-per-token ranges of the encoding.
+            margin: Relative safety margin below the limit (0 trusts the bound fully, 1 always tokenizes).
+        """
+        if not 0 <= margin <= 1:
+            raise ValueError(f"margin must be between 0 and 1, got {margin}")
+        self.ratios = ratios
+        self.margin = margin
+
+    def bounds(self, text: str) -> TokenBounds:
+        """Returns lower and upper estimates of the token count of `text`."""
+        if text.isascii():
+            ascii_bytes = total_bytes = len(text)
+        else:
+            total_bytes = len(text.encode("utf-8"))
+            ascii_bytes = len(text.encode("ascii", "ignore"))
+        other_bytes = total_bytes - ascii_bytes
+
+        ratios = self.ratios
+        lower = math.floor(ascii_bytes / ratios.ascii_max + other_bytes / ratios.other_max)
+        upper = math.ceil(ascii_bytes / ratios.ascii_min + other_bytes / ratios.other_min)
+        return TokenBounds(
+            lower=max(lower, math.ceil(total_bytes / MAX_TOKEN_BYTES)),
+            upper=min(upper, total_bytes),
+        )
+
+    def fits(self, upper: int, limit: Optional[int]) -> bool:
+        """Whether an upper bound is far enough below `limit` to skip exact tokenization."""
+        return limit is not None and upper <= limit * (1 - self.margin)
+
+
+TOKEN_ESTIMATOR = TokenEstimator()
@@ -0,0 +1,190 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Characters taken from each side of a boundary when estimating junction tokens.
+# Byte-pair merges never reach further than one pre-tokenized word, so a small window
+# is enough to capture the separator and any merge across the seam.
+JUNCTION_WINDOW = 64
+
+
+def junction_tokens(
+    count_tokens: Callable[[str], int], left: str, separator: str, right: str, window: int = JUNCTION_WINDOW
+) -> int:
+    """
+    Estimate the tokens added when joining `left + separator + right`.
+
+    Only a bounded window around the seam is encoded, so the cost is independent of the
+    length of either side. The result accounts for the separator itself as well as any
+    merges (positive or negative) across the boundary.
+    """
+    joined, left_tail, right_head = junction_windows(left, separator, right, window)
+    return count_tokens(joined) - count_tokens(left_tail) - count_tokens(right_head)
+
+
+def junction_windows(left: str, separator: str, right: str, window: int = JUNCTION_WINDOW) -> Tuple[str, str, str]:
+    """
+    Returns the strings `junction_tokens` encodes: the joined window, the left tail and the right head.
+
+    The junction cost is `count(joined) - count(left_tail) - count(right_head)`, which lets callers
+    count the windows of many junctions in one batch.
+    """
+    left_tail = left[-window:]
+    right_head = right[:window]
+    return left_tail + separator + right_head, left_tail, right_head
+
+
+class TokenLedger:
+    """
+    Incremental token accounting for `separator.join(parts) + tail`.
+
+    Every part is tokenized exactly once on construction, unless its cost (or the junction
+    cost of an adjacent pair) is supplied pre-computed. Dropping a part subtracts its
+    cost and re-links its neighbours, adjusting only the junctions that changed, so the
+    running total is maintained without re-encoding the joined text.
+
+    Attributes:
+        total: The current estimated token count of the live text.
+    """
+
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        parts: Sequence[str],
+        separator: str = "\n\n",
+        window: int = JUNCTION_WINDOW,
+        costs: Optional[Sequence[Optional[int]]] = None,
+        junctions: Optional[Mapping[Tuple[int, int], int]] = None,
+        junction_cache: Optional[Dict[Tuple[int, int], int]] = None,
+    ) -> None:
+        """
+        Args:
+            count_tokens: Function returning the token count of a string.
+            parts: The parts, in order.
+            separator: The string joining adjacent parts.
+            window: Characters encoded on each side of a junction.
+            costs: Optional pre-computed token costs per part (None entries are computed).
+            junctions: Optional pre-computed junction costs keyed by adjacent part indices.
+            junction_cache: Optional dict used (and filled) in place of a private junction memo, so
+                that ledgers over the same parts can share junction estimates. Takes precedence
+                over `junctions`.
+        """
+        self._count = count_tokens
+        self._parts = list(parts)
+        self._separator = separator
+        self._window = window
+        if costs is None:
+            costs = [None] * len(self._parts)
+        self._costs = [count_tokens(p) if c is None else c for p, c in zip(self._parts, costs, strict=True)]
+        self._junctions: Dict[Tuple[int, int], int] = (
+            junction_cache if junction_cache is not None else dict(junctions or {})
+        )
+
+        size = len(self._parts)
+        self._prev: List[Optional[int]] = [i - 1 if i > 0 else None for i in range(size)]
+        self._next: List[Optional[int]] = [i + 1 if i < size - 1 else None for i in range(size)]
+        self._last: Optional[int] = size - 1 if size else None
+
+        self._tail = ""
+        self._tail_cost = 0
+        self._tail_junction = 0
+
+        self.total = sum(self._costs)
+        for i in range(size - 1):
+            self.total += self._junction(i, i + 1)
+
+    def _junction(self, left: int, right: int) -> int:
+        key = (left, right)
+        if key not in self._junctions:
+            self._junctions[key] = junction_tokens(
+                self._count, self._parts[left], self._separator, self._parts[right], self._window
+            )
+        return self._junctions[key]
+
+    def _junction_to_tail(self, left: Optional[int]) -> int:
+        if left is None or not self._tail:
+            return 0
+        return junction_tokens(self._count, self._parts[left], "", self._tail, self._window)
+
+    def cost(self, index: int) -> int:
+        """Returns the standalone token cost of a part."""
+        return self._costs[index]
+
+    def set_tail(self, text: str, cost: int) -> None:
+        """
+        Replaces the text appended after the joined parts.
+
+        Args:
+            text: The tail text (e.g. the final user message). Only its first `window` characters
+                are read, so a prefix of at least that length may be passed instead.
+            cost: The pre-computed token cost of the whole tail.
+        """
+        self.total -= self._tail_cost + self._tail_junction
+        self._tail = text
+        self._tail_cost = cost
+        self._tail_junction = self._junction_to_tail(self._last)
+        self.total += self._tail_cost + self._tail_junction
+
+    def replace(self, index: int, text: str, cost: int) -> None:
+        """
+        Replaces the text of a live part (e.g. with a truncated version), updating the total
+        incrementally. Only the junctions around the part are re-estimated; the ledger stops
+        sharing its `junction_cache` rather than modifying it.
+
+        Args:
+            index: The part to replace.
+            text: The new text of the part.
+            cost: The pre-computed token cost of `text`.
+        """
+        prev, nxt = self._prev[index], self._next[index]
+        self.total -= self._costs[index]
+        if prev is not None:
+            self.total -= self._junction(prev, index)
+        if nxt is not None:
+            self.total -= self._junction(index, nxt)
+
+        # Junctions estimated for the old text, by this ledger or by others sharing the cache
+        self._junctions = {key: value for key, value in self._junctions.items() if index not in key}
+        self._parts[index] = text
+        self._costs[index] = cost
+
+        self.total += cost
+        if prev is not None:
+            self.total += self._junction(prev, index)
+        if nxt is not None:
+            self.total += self._junction(index, nxt)
+        if index == self._last:
+            self.total -= self._tail_junction
+            self._tail_junction = self._junction_to_tail(index)
+            self.total += self._tail_junction
+
+    def drop(self, index: int) -> None:
+        """Removes a part from the live text, updating the total incrementally."""
+        prev, nxt = self._prev[index], self._next[index]
+
+        self.total -= self._costs[index]
+        if prev is not None:
+            self.total -= self._junction(prev, index)
+        if nxt is not None:
+            self.total -= self._junction(index, nxt)
+        if prev is not None and nxt is not None:
+            self.total += self._junction(prev, nxt)
+
+        if prev is not None:
+            self._next[prev] = nxt
+        if nxt is not None:
+            self._prev[nxt] = prev
+
+        if index == self._last:
+            self._last = prev
+            self.total -= self._tail_junction
+            self._tail_junction = self._junction_to_tail(prev)
+            self.total += self._tail_junction
@@ -0,0 +1,76 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+from typing import List, Sequence, Set
+
+# Upper bound on the DP table size (items x capacity). Larger problems use the greedy fallback.
+KNAPSACK_MAX_CELLS = 2_000_000
+
+
+def select_components(
+    weights: Sequence[int], values: Sequence[int], capacity: int, max_cells: int = KNAPSACK_MAX_CELLS
+) -> Set[int]:
+    """
+    Selects the subset of items maximizing total value within a token capacity.
+
+    Solves the 0/1 knapsack exactly with dynamic programming when the table fits within
+    `max_cells`, otherwise falls back to a greedy value-density heuristic.
+
+    Args:
+        weights: Token cost of each item.
+        values: Value (priority) of each item.
+        capacity: Token budget available for the items.
+        max_cells: Maximum DP table size before switching to the greedy fallback.
+
+    Returns:
+        The indices of the items to keep.
+    """
+    if capacity < 0:
+        return set()
+    if len(weights) * (capacity + 1) > max_cells:
+        return _select_greedy(weights, values, capacity)
+    return _select_dp(weights, values, capacity)
+
+
+def _select_dp(weights: Sequence[int], values: Sequence[int], capacity: int) -> Set[int]:
+    best = [0] * (capacity + 1)
+    taken: List[bytearray] = []
+
+    for weight, value in zip(weights, values, strict=True):
+        row = bytearray(capacity + 1)
+        for budget in range(capacity, weight - 1, -1):
+            candidate = best[budget - weight] + value
+            if candidate > best[budget]:
+                best[budget] = candidate
+                row[budget] = 1
+        taken.append(row)
+
+    keep: Set[int] = set()
+    budget = capacity
+    for index in range(len(weights) - 1, -1, -1):
+        if taken[index][budget]:
+            keep.add(index)
+            budget -= weights[index]
+    return keep
+
+
+def _select_greedy(weights: Sequence[int], values: Sequence[int], capacity: int) -> Set[int]:
+    # Highest value per token first; ties favour the more valuable (then earlier) item.
+    order = sorted(
+        range(len(weights)),
+        key=lambda i: (-values[i] / weights[i] if weights[i] else float("-inf"), -values[i], i),
+    )
+    keep: Set[int] = set()
+    remaining = capacity
+    for index in order:
+        if weights[index] <= remaining:
+            keep.add(index)
+            remaining -= weights[index]
+    return keep
@@ -0,0 +1,280 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import tiktoken
+from loguru import logger
+
+from coreason_construct.optimization.estimation import CL100K_RATIOS, TOKEN_ESTIMATOR, ScriptRatios, TokenEstimator
+from coreason_construct.utils import timing
+
+__all__ = [
+    "BYTE_RATIOS",
+    "DEFAULT_ENCODING",
+    "TIKTOKEN_ENCODINGS",
+    "TOKENIZER_REGISTRY",
+    "HuggingFaceTokenizer",
+    "TiktokenTokenizer",
+    "Tokenizer",
+    "TokenizerRegistry",
+]
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Byte-level BPE encodings whose token counts stay within CL100K_RATIOS. o200k_base shares the
+# cl100k pre-tokenization of digits and whitespace; its larger vocabulary only lowers counts.
+TIKTOKEN_ENCODINGS = ("cl100k_base", "o200k_base")
+
+# Bounds that hold for any tokenizer emitting at least one byte per token: the upper bound is the
+# byte count itself, so the cheap tier only decides for prompts far below the budget.
+BYTE_RATIOS = ScriptRatios(ascii_min=1.0, ascii_max=float(2**31), other_min=1.0, other_max=float(2**31))
+
+# Worker threads used by tiktoken's encode_batch
+BATCH_THREADS = 8
+
+
+class Tokenizer(ABC):
+    """
+    A named encoding used for exact token counts.
+
+    Subclasses implement `encode` and `decode`; `encode_batch` defaults to encoding one text
+    at a time and is overridden where the backend encodes batches in parallel.
+
+    Attributes:
+        name: The name the tokenizer is registered under.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    @abstractmethod
+    def encode(self, text: str) -> List[int]:
+        """Returns the token ids of `text`."""
+
+    @abstractmethod
+    def decode(self, tokens: Sequence[int]) -> str:
+        """Returns the text of a sequence of token ids."""
+
+    def encode_batch(self, texts: Sequence[str]) -> List[List[int]]:
+        """Returns the token ids of every text, in order."""
+        return [self.encode(text) for text in texts]
+
+    def count(self, text: str) -> int:
+        """Returns the number of tokens in `text`."""
+        return len(self.encode(text))
+
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        """Returns the number of tokens in every text, in order, using `encode_batch`."""
+        return [len(tokens) for tokens in self.encode_batch(texts)]
+
+
+class TiktokenTokenizer(Tokenizer):
+    """
+    A tiktoken encoding (e.g. cl100k_base, o200k_base). Batches are encoded on worker threads.
+    """
+
+    def __init__(self, name: str, encoding: Optional[tiktoken.Encoding] = None, num_threads: int = BATCH_THREADS):
+        """
+        Args:
+            name: The registered name.
+            encoding: The tiktoken encoding (defaults to `tiktoken.get_encoding(name)`).
+            num_threads: Worker threads used by `encode_batch`.
+        """
+        super().__init__(name)
+        self.encoding = encoding or tiktoken.get_encoding(name)
+        self.num_threads = num_threads
+
+    def encode(self, text: str) -> List[int]:
+        return self.encoding.encode(text)
+
+    def decode(self, tokens: Sequence[int]) -> str:
+        decoded: str = self.encoding.decode(list(tokens))
+        return decoded
+
+    def encode_batch(self, texts: Sequence[str]) -> List[List[int]]:
+        return self.encoding.encode_batch(list(texts), num_threads=self.num_threads)
+
+
+class HuggingFaceTokenizer(Tokenizer):
+    """
+    A Hugging Face `tokenizer.json` file, loaded with the optional `tokenizers` package.
+
+    Special tokens are not added, so counts cover the text only, like tiktoken's.
+    """
+
+    def __init__(self, name: str, path: str) -> None:
+        """
+        Args:
+            name: The registered name.
+            path: Path to the tokenizer.json file.
+        """
+        super().__init__(name)
+        try:
+            from tokenizers import Tokenizer as HFTokenizer
+        except ImportError as e:
+            raise ImportError(
+                f"Loading tokenizer '{name}' requires the 'tokenizers' package (pip install tokenizers)"
+            ) from e
+        self.path = path
+        self.tokenizer = HFTokenizer.from_file(path)
+
+    def encode(self, text: str) -> List[int]:
+        ids: List[int] = self.tokenizer.encode(text, add_special_tokens=False).ids
+        return ids
+
+    def decode(self, tokens: Sequence[int]) -> str:
+        decoded: str = self.tokenizer.decode(list(tokens))
+        return decoded
+
+    def encode_batch(self, texts: Sequence[str]) -> List[List[int]]:
+        return [encoding.ids for encoding in self.tokenizer.encode_batch(list(texts), add_special_tokens=False)]
+
+
+class _Entry(NamedTuple):
+    loader: Callable[[], Tokenizer]
+    ratios: ScriptRatios
+
+
+class TokenizerRegistry:
+    """
+    Process-wide registry of tokenizers, loaded once on first use and shared.
+
+    Any tiktoken encoding name resolves without registration. Other tokenizers (e.g. local
+    Hugging Face files) are registered under a name with a loader, together with the
+    bytes-per-token ratios the cheap estimation tier may assume for them.
+
+    Attributes:
+        default: The encoding used when none is selected.
+    """
+
+    def __init__(self, default: str = DEFAULT_ENCODING) -> None:
+        self.default = default
+        self._entries: Dict[str, _Entry] = {}
+        self._tokenizers: Dict[str, Tokenizer] = {}
+        self._estimators: Dict[ScriptRatios, TokenEstimator] = {CL100K_RATIOS: TOKEN_ESTIMATOR}
+        self._lock = threading.RLock()
+
+    def register(
+        self, name: str, loader: Callable[[], Tokenizer], ratios: ScriptRatios = BYTE_RATIOS
+    ) -> "TokenizerRegistry":
+        """
+        Registers (or replaces) a tokenizer. Loading is deferred until the first `get`.
+
+        Args:
+            name: The encoding name constructs and requests select it by.
+            loader: Returns the tokenizer; called once.
+            ratios: Bytes-per-token ranges the tokenizer is known to respect (defaults to
+                BYTE_RATIOS, which holds for any tokenizer).
+        """
+        with self._lock:
+            self._entries[name] = _Entry(loader, ratios)
+            self._tokenizers.pop(name, None)
+        return self
+
+    def unregister(self, name: str) -> None:
+        """Removes a registered tokenizer and drops it if loaded."""
+        with self._lock:
+            self._entries.pop(name, None)
+            self._tokenizers.pop(name, None)
+
+    def register_huggingface(self, name: str, path: str, ratios: ScriptRatios = BYTE_RATIOS) -> "TokenizerRegistry":
+        """Registers a Hugging Face tokenizer.json file under `name`."""
+        return self.register(name, lambda: HuggingFaceTokenizer(name, path), ratios)
+
+    def __contains__(self, name: object) -> bool:
+        with self._lock:
+            if name in self._entries:
+                return True
+        return isinstance(name, str) and name in tiktoken.list_encoding_names()
+
+    def names(self) -> List[str]:
+        """Returns the registered names and the available tiktoken encodings."""
+        with self._lock:
+            registered = list(self._entries)
+        return sorted(set(registered) | set(tiktoken.list_encoding_names()))
+
+    def get(self, name: Optional[str] = None) -> Tokenizer:
+        """
+        Returns the tokenizer for `name` (or the default), loading it on first use.
+
+        Raises:
+            KeyError: If `name` is neither registered nor a tiktoken encoding.
+        """
+        name = name or self.default
+        tokenizer = self._tokenizers.get(name)
+        if tokenizer is not None:
+            return tokenizer
+
+        with self._lock:
+            tokenizer = self._tokenizers.get(name)
+            if tokenizer is None:
+                tokenizer = self._load(name)
+                self._tokenizers[name] = tokenizer
+        return tokenizer
+
+    def _load(self, name: str) -> Tokenizer:
+        entry = self._entries.get(name)
+        if entry is not None:
+            logger.info(f"Loading tokenizer '{name}'")
+            return entry.loader()
+        if name not in tiktoken.list_encoding_names():
+            raise KeyError(f"Unknown encoding '{name}'. Expected one of {self.names()}")
+        logger.info(f"Loading tiktoken encoding '{name}'")
+        return TiktokenTokenizer(name)
+
+    def count(self, text: str, name: Optional[str] = None) -> int:
+        """Returns the number of tokens in `text` under encoding `name`."""
+        tokenizer = self.get(name)
+        timing.count("encodes")
+        with timing.phase("tokenize"):
+            return tokenizer.count(text)
+
+    def count_batch(self, texts: Sequence[str], name: Optional[str] = None) -> List[int]:
+        """Returns the number of tokens in every text under encoding `name`, encoding them as a batch."""
+        tokenizer = self.get(name)
+        timing.count("encodes", len(texts))
+        with timing.phase("tokenize"):
+            return tokenizer.count_batch(texts)
+
+    def ratios(self, name: Optional[str] = None) -> ScriptRatios:
+        """Returns the bytes-per-token ranges of an encoding, without loading it."""
+        name = name or self.default
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is not None:
+            return entry.ratios
+        return CL100K_RATIOS if name in TIKTOKEN_ENCODINGS else BYTE_RATIOS
+
+    def estimator(self, name: Optional[str] = None, **kwargs: Any) -> TokenEstimator:
+        """
+        Returns a cheap token estimator valid for an encoding, without loading it.
+
+        Estimators with default settings are shared per ratios; `kwargs` (e.g. `margin`)
+        build a new one.
+        """
+        ratios = self.ratios(name)
+        if kwargs:
+            return TokenEstimator(ratios, **kwargs)
+        with self._lock:
+            estimator = self._estimators.get(ratios)
+            if estimator is None:
+                estimator = self._estimators[ratios] = TokenEstimator(ratios)
+        return estimator
+
+    def clear(self) -> None:
+        """Drops the loaded tokenizers (registrations are kept)."""
+        with self._lock:
+            self._tokenizers.clear()
+
+
+TOKENIZER_REGISTRY = TokenizerRegistry()
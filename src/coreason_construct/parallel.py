@@ -0,0 +1,235 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from multiprocessing.context import BaseContext
+from types import TracebackType
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type
+
+from coreason_identity.models import UserContext
+
+from coreason_construct.compiled import CompiledConstruct, user_message_parts
+from coreason_construct.contexts.providers import CONTEXT_PROVIDERS, ContextProvider
+from coreason_construct.schemas.base import PromptConfiguration, PromptSegment
+
+__all__ = ["DEFAULT_CHUNKSIZE", "ParallelBuilder"]
+
+# Inputs per task sent to a worker. Large enough to amortize IPC and the per-chunk rendering,
+# small enough to keep every worker busy at the end of a batch.
+DEFAULT_CHUNKSIZE = 64
+
+# Chunks in flight per worker; bounds memory when inputs are streamed from a generator.
+CHUNKS_PER_WORKER = 2
+
+# A built configuration as returned by a worker: the system segments (None when identical to the
+# previous item of the chunk), the prefix hash, the task part of the user message, the provenance
+# metadata, and the dropped and shrunk components. The parent, which has the input, rebuilds the
+# messages from their parts.
+_Packed = Tuple[Optional[List[PromptSegment]], Optional[str], str, Dict[str, str], List[str], List[str]]
+
+# The construct loaded by each worker process, once, by _init_worker.
+_WORKER_CONSTRUCT: Optional[CompiledConstruct] = None
+
+
+def _init_worker(
+    data: bytes,
+    initializer: Optional[Callable[..., Any]],
+    initargs: Tuple[Any, ...],
+    context_providers: Dict[str, Callable[[], ContextProvider]],
+) -> None:
+    global _WORKER_CONSTRUCT
+    if initializer is not None:
+        initializer(*initargs)
+    for family, factory in context_providers.items():
+        CONTEXT_PROVIDERS[family] = factory()
+    _WORKER_CONSTRUCT = CompiledConstruct.from_wire(data)
+
+
+def _build_chunk(
+    inputs: Sequence[str], variables: Optional[Dict[str, Any]], max_tokens: Optional[int], optimization: str
+) -> List[_Packed]:
+    if _WORKER_CONSTRUCT is None:
+        raise RuntimeError("Worker process was not initialized with a construct")
+    packed: List[_Packed] = []
+    previous: Optional[str] = None
+    for config in _WORKER_CONSTRUCT.build_many(inputs, variables, max_tokens, None, optimization):
+        system_message = "".join(config.message_parts("system_message"))
+        repeated = system_message == previous
+        # The user message parts are (task, separator, input), or only the input without a task
+        user_parts = config.message_parts("user_message")
+        packed.append(
+            (
+                None if repeated else config.system_segments,
+                config.prefix_hash,
+                user_parts[0] if len(user_parts) > 1 else "",
+                config.provenance_metadata,
+                config.dropped_components,
+                config.shrunk_components,
+            )
+        )
+        previous = system_message
+    return packed
+
+
+class ParallelBuilder:
+    """
+    Builds a CompiledConstruct over many inputs on a pool of worker processes.
+
+    The construct is serialized once (`CompiledConstruct.to_wire`) and loaded once per worker
+    when the pool starts. Inputs are then streamed to the workers in chunks, each chunk built
+    with `build_many`, and the configurations are yielded in input order. Only the inputs and
+    the parts of the resulting messages cross process boundaries: the inputs are not sent back,
+    and within a chunk, a system prompt equal to the previous one is not sent again.
+
+    Workers count tokens with the construct's encoding from their own TOKENIZER_REGISTRY.
+    Tokenizers registered at runtime must be registered in the workers too (via `initializer`)
+    unless the pool uses the "fork" start method.
+
+    Lazy contexts are fetched in the workers, from the workers' own CONTEXT_PROVIDERS, which
+    are empty unless the pool uses the "fork" start method (and then hold the parent's
+    providers, whose database connections should not be used across a fork). Pass
+    `context_providers` to open a provider per family in every worker instead.
+
+    Usage:
+        with ParallelBuilder(weaver.compile()) as builder:
+            for config in builder.build_many(narratives, max_tokens=2000):
+                ...
+    """
+
+    def __init__(
+        self,
+        compiled: CompiledConstruct,
+        max_workers: Optional[int] = None,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        mp_context: Optional[BaseContext] = None,
+        initializer: Optional[Callable[..., Any]] = None,
+        initargs: Tuple[Any, ...] = (),
+        context_providers: Optional[Dict[str, Callable[[], ContextProvider]]] = None,
+    ) -> None:
+        """
+        Args:
+            compiled: The construct to build; it must be serializable with `to_wire`.
+            max_workers: Number of worker processes (defaults to the CPU count).
+            chunksize: Inputs sent to a worker per task.
+            mp_context: Multiprocessing context selecting the start method.
+            initializer: Called in each worker before the construct is loaded.
+            initargs: Arguments for `initializer`.
+            context_providers: Picklable factories of the context providers to register in each
+                worker, by context family (e.g. `{"PatientHistory": partial(SQLiteContextProvider, ...)}`).
+
+        Raises:
+            ValueError: If `chunksize` is not positive or the construct cannot be serialized.
+        """
+        if chunksize < 1:
+            raise ValueError(f"chunksize must be positive, got {chunksize}")
+        self.compiled = compiled
+        self.chunksize = chunksize
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            self.max_workers,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(compiled.to_wire(), initializer, initargs, dict(context_providers or {})),
+        )
+
+    def __enter__(self) -> "ParallelBuilder":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shuts the worker processes down, cancelling pending chunks."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def build_many(
+        self,
+        inputs: Iterable[str],
+        variables: Optional[Dict[str, Any]] = None,
+        max_tokens: Optional[int] = None,
+        context: Optional[UserContext] = None,
+        optimization: str = "priority",
+    ) -> Iterator[PromptConfiguration]:
+        """
+        Lazily build one prompt configuration per user input, in input order, on the worker pool.
+
+        Produces the same configurations as `CompiledConstruct.build_many`. At most
+        `CHUNKS_PER_WORKER` chunks per worker are in flight, so `inputs` may be a long stream.
+
+        Args:
+            inputs: The user inputs, one per configuration.
+            variables: Optional variables to render components, shared by all inputs.
+            max_tokens: Maximum allowed estimated tokens per configuration.
+            context: Optional UserContext (though encouraged).
+            optimization: Component selection strategy when over budget, one of OPTIMIZATION_MODES.
+        """
+        CompiledConstruct._check_mode(optimization)
+        return self._stream(iter(inputs), variables, max_tokens, context, optimization)
+
+    def _stream(
+        self,
+        inputs: Iterator[str],
+        variables: Optional[Dict[str, Any]],
+        max_tokens: Optional[int],
+        context: Optional[UserContext],
+        optimization: str,
+    ) -> Iterator[PromptConfiguration]:
+        pending: Deque[Tuple[Future[List[_Packed]], List[str]]] = deque()
+        in_flight = self.max_workers * CHUNKS_PER_WORKER
+
+        def submit() -> bool:
+            chunk = list(islice(inputs, self.chunksize))
+            if chunk:
+                future = self._executor.submit(_build_chunk, chunk, variables, max_tokens, optimization)
+                pending.append((future, chunk))
+            return bool(chunk)
+
+        try:
+            while len(pending) < in_flight and submit():
+                pass
+            while pending:
+                future, chunk = pending.popleft()
+                packed = future.result()
+                submit()
+                yield from self._unpack(packed, chunk, context)
+        finally:
+            for future, _ in pending:
+                future.cancel()
+
+    def _unpack(
+        self, packed: List[_Packed], chunk: List[str], context: Optional[UserContext]
+    ) -> Iterator[PromptConfiguration]:
+        system_segments: List[PromptSegment] = []
+        system_parts: List[str] = []
+        for (segments, prefix_hash, task_part, metadata, dropped, shrunk), user_input in zip(
+            packed, chunk, strict=True
+        ):
+            if segments is not None:
+                system_segments, system_parts = segments, [segment.text for segment in segments]
+            if context:
+                metadata["owner_id"] = context.user_id
+            yield PromptConfiguration.from_parts(
+                system_parts,
+                user_message_parts(task_part, user_input),
+                response_model=self.compiled.response_model,
+                provenance_metadata=metadata,
+                dropped_components=dropped,
+                shrunk_components=shrunk,
+                system_segments=system_segments,
+                prefix_hash=prefix_hash,
+            )
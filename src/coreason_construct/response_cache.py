@@ -0,0 +1,118 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, NamedTuple, Optional, TypeVar
+
+__all__ = ["ResponseCache"]
+
+T = TypeVar("T")
+
+
+class _Entry(NamedTuple):
+    value: Any
+    expires: float
+
+
+class ResponseCache(Generic[T]):
+    """
+    Caches responses by request key in a bounded LRU cache with a TTL, and coalesces concurrent
+    requests: while a response is being computed, other requests with the same key await that
+    computation instead of starting their own.
+
+    Only successful responses are cached; an error is raised to every request awaiting the
+    computation that failed. A computation runs to completion even if the request that started
+    it is cancelled (e.g. by a client disconnect), so the requests awaiting it still get it.
+
+    Not thread-safe: `get_or_compute` is called from one event loop.
+
+    Attributes:
+        maxsize: Maximum number of responses cached; 0 only coalesces concurrent requests.
+        ttl: Seconds a response stays valid, or None for no expiry.
+        hits: Number of requests served from the cache.
+        coalesced: Number of requests that awaited a computation in flight.
+        misses: Number of requests that computed their response.
+    """
+
+    def __init__(
+        self, maxsize: int = 1024, ttl: Optional[float] = 60.0, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        Args:
+            maxsize: Maximum number of responses cached; 0 only coalesces concurrent requests.
+            ttl: Seconds a response stays valid, or None for no expiry.
+            clock: Monotonic time source, in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._flights: Dict[str, "asyncio.Future[T]"] = {}
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[T]]) -> T:
+        """
+        Returns the response cached for `key`, or awaits `compute()` for it.
+
+        Raises:
+            Exception: Whatever `compute` raised, also in the requests that awaited it.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value: T = entry.value
+                return value
+            del self._entries[key]
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            flight = asyncio.ensure_future(self._compute(key, compute))
+            # Retrieves the error of a computation nobody awaits anymore, so it is not logged as unhandled
+            flight.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._flights[key] = flight
+        return await asyncio.shield(flight)
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[T]]) -> T:
+        try:
+            value = await compute()
+        finally:
+            del self._flights[key]
+        if self.maxsize > 0:
+            expires = self._clock() + self.ttl if self.ttl is not None else float("inf")
+            self._entries[key] = _Entry(value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """Drops all cached responses."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/coalesced/miss counters, the hit rate and the current cache size."""
+        requests = self.hits + self.coalesced + self.misses
+        return {
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.coalesced) / requests if requests else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
@@ -13,6 +13,7 @@ from typing import Optional
 from coreason_identity.models import UserContext
 from loguru import logger
 
+from coreason_construct.contexts.planner import DEPENDENCY_PLANNER
 from coreason_construct.roles.base import RoleDefinition
 from coreason_construct.roles.registry import ROLE_REGISTRY
 
@@ -79,6 +80,7 @@ class RoleLibrary:
             raise ValueError("UserContext is required")
         logger.debug("Registering artifact", user_id=context.user_id, type="role", name=name)
         ROLE_REGISTRY[name] = role
+        DEPENDENCY_PLANNER.invalidate()
 
     @staticmethod
     def get_role(name: str, context: UserContext) -> Optional[RoleDefinition]:
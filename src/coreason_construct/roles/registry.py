@@ -8,8 +8,7 @@
 #
 # Source Code: https://github.com/CoReason-AI/coreason_construct
 
-from typing import Dict
-
 from coreason_construct.roles.base import RoleDefinition
+from coreason_construct.utils.registry import VersionedRegistry
 
-ROLE_REGISTRY: Dict[str, RoleDefinition] = {}
+ROLE_REGISTRY: VersionedRegistry[str, RoleDefinition] = VersionedRegistry()
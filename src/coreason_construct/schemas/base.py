@@ -8,11 +8,42 @@
 #
 # Source Code: https://github.com/CoReason-AI/coreason_construct
 
+import json
+import re
 from enum import Enum
-from typing import Dict, List, Optional, Type
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, List, Optional, Protocol, Sequence, Tuple, Type
 
-from jinja2 import StrictUndefined, Template
-from pydantic import BaseModel, Field
+from pydantic import (
+    BaseModel,
+    Field,
+    PrivateAttr,
+    SerializationInfo,
+    SerializerFunctionWrapHandler,
+    model_serializer,
+)
+
+from coreason_construct.utils.fingerprint import canonical_json, class_fingerprint, digest, qualified_name
+from coreason_construct.utils.templates import TEMPLATE_CACHE
+from coreason_construct.utils.timing import BuildTimings
+
+# Whitespace following the end of a sentence; contexts may be truncated just before it
+SENTENCE_BOUNDARY = r"(?<=[.!?])\s+"
+
+
+def cut_points(content: str, pattern: str, skip: int = 0) -> Tuple[int, ...]:
+    """
+    Returns the offsets at which `content` can be truncated: the start of every match of the
+    regular expression `pattern`, except the first `skip` ones and those leaving only whitespace.
+
+    Args:
+        content: The text to truncate.
+        pattern: Regular expression matching the separator before each removable item.
+        skip: Number of leading matches to ignore (e.g. the separator between a heading and
+            the first item, so that at least one item is kept).
+    """
+    starts = [match.start() for match in re.finditer(pattern, content)][skip:]
+    return tuple(start for start in starts if start > 0 and content[start:].strip())
 
 
 class ComponentType(str, Enum):
@@ -43,31 +74,148 @@ class PromptComponent(BaseModel):
     content: str
     priority: int = Field(default=1, ge=1, le=10)
 
-    def render(self, **kwargs: str) -> str:
+    @property
+    def template_variables(self) -> FrozenSet[str]:
+        """
+        The template variables referenced by the content, found by static analysis.
+        Computed once per distinct content and shared process-wide.
+        """
+        return TEMPLATE_CACHE.get(self.content).variables
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """
+        A content hash of the component: its class and every field value, with class-valued
+        fields (e.g. a response model) hashed by name and JSON schema.
+
+        Stable across processes and PYTHONHASHSEED values. Computed on first access and reset
+        when a field is assigned; mutating a field in place (e.g. appending to a list) is not
+        detected.
+        """
+        fields = type(self).model_fields
+        class_fields = {
+            name: class_fingerprint(getattr(self, name)) for name in fields if isinstance(getattr(self, name), type)
+        }
+        values = self.model_dump(mode="json", exclude=set(class_fields))
+        return digest("component", qualified_name(type(self)), canonical_json(values), canonical_json(class_fields))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        self.__dict__.pop("fingerprint", None)
+
+    def __copy__(self) -> "PromptComponent":
+        # model_copy(update=...) updates the copy's __dict__ directly, so drop the memoized hash here
+        copied = super().__copy__()
+        copied.__dict__.pop("fingerprint", None)
+        return copied
+
+    def __deepcopy__(self, memo: Optional[Dict[int, Any]] = None) -> "PromptComponent":
+        copied = super().__deepcopy__(memo)
+        copied.__dict__.pop("fingerprint", None)
+        return copied
+
+    def shrink_points(self) -> Tuple[int, ...]:
+        """
+        Offsets, in increasing order, at which `content` may be truncated to fit a token budget.
+
+        The optimizer keeps the longest prefix `content[:point]` that fits before it drops the
+        whole component. Contexts can be truncated at sentence boundaries; other components
+        cannot be shrunk unless a subclass says otherwise.
+        """
+        if self.type != ComponentType.CONTEXT:
+            return ()
+        return cut_points(self.content, SENTENCE_BOUNDARY)
+
+    @classmethod
+    async def aload(cls, **kwargs: Any) -> "PromptComponent":
+        """
+        Asynchronously creates a dynamic context from its context data.
+
+        Used by `AsyncWeaver` in place of the constructor. The default calls the constructor;
+        dynamic contexts backed by I/O (e.g. a database) override it to fetch their content
+        without blocking the event loop.
+
+        Args:
+            **kwargs: The constructor arguments taken from the Weaver's context_data.
+        """
+        return cls(**kwargs)
+
+    def render(self, **kwargs: Any) -> str:
         """
         Renders the content string with provided variables using Jinja2.
 
+        Renders are memoized on the referenced subset of `kwargs`, so components without
+        variables are rendered only once.
+
         Args:
             **kwargs: Variables to inject into the content string.
 
         Returns:
             The formatted string.
         """
-        # Use StrictUndefined to ensure missing variables raise errors
-        template = Template(self.content, undefined=StrictUndefined)
-        return template.render(**kwargs)
+        # The shared environment uses StrictUndefined to ensure missing variables raise errors
+        return TEMPLATE_CACHE.get(self.content).render(**kwargs)
+
+
+class SegmentKind(str, Enum):
+    """
+    How often the text of a system prompt segment changes between requests.
+    """
+
+    STATIC = "STATIC"  # Variable-free library text (roles, HIPAA, modes), identical across requests
+    VARIABLE = "VARIABLE"  # Rendered from template variables
+    DYNAMIC = "DYNAMIC"  # Per-request dynamic context (e.g. PatientHistory_P123)
+
+
+class PromptSegment(BaseModel):
+    """
+    A run of consecutive system prompt components of the same kind.
+
+    Attributes:
+        text: The segment text, including the separator to the next segment, so that the
+            segment texts concatenate to the system message.
+        kind: How often the segment text changes.
+        components: Names of the components in the segment.
+        cache_breakpoint: Whether a provider prompt-cache breakpoint belongs after this segment.
+            Set on every segment before the first DYNAMIC one.
+    """
+
+    text: str
+    kind: SegmentKind
+    components: List[str]
+    cache_breakpoint: bool = False
+
+
+class TextWriter(Protocol):
+    """A text stream, such as an open file, `sys.stdout` or `socket.makefile("w")`."""
+
+    def write(self, text: str, /) -> Any: ...
+
+
+# PromptConfiguration fields that may be held as parts and joined on first access
+LAZY_MESSAGE_FIELDS = ("system_message", "user_message")
 
 
 class PromptConfiguration(BaseModel):
     """
     The final output configuration for the LLM request.
 
+    Configurations built by a construct hold their messages as parts (the system segments,
+    the task and the user input) and only join them when `system_message` or `user_message`
+    is first accessed, so that a large input is not copied by a build. `write_json` streams
+    the parts without joining them at all.
+
     Attributes:
         system_message: The constructed system prompt.
         user_message: The final user input/task.
         response_model: The Pydantic model enforcing the output structure.
         max_retries: Number of allowed retries for the LLM call.
         provenance_metadata: Traceability data (which components created this).
+        dropped_components: Names of the components dropped to fit the token budget.
+        shrunk_components: Names of the components truncated to fit the token budget.
+        system_segments: The system message split into segments with cache breakpoints.
+        prefix_hash: SHA-256 of the system message up to the last cache breakpoint, if any.
+        timings: Time spent in each phase of the build, when the Weaver is instrumented.
     """
 
     system_message: str
@@ -76,3 +224,95 @@ class PromptConfiguration(BaseModel):
     max_retries: int = Field(default=3, ge=0)
     provenance_metadata: Dict[str, str]
     dropped_components: List[str] = Field(default_factory=list)
+    shrunk_components: List[str] = Field(default_factory=list)
+    system_segments: List[PromptSegment] = Field(default_factory=list)
+    prefix_hash: Optional[str] = None
+    timings: Optional[BuildTimings] = None
+
+    # Parts of the messages not joined yet, by field name. Replaced rather than modified,
+    # since copies of the configuration share it.
+    _parts: Dict[str, Tuple[str, ...]] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def from_parts(cls, system_parts: Sequence[str], user_parts: Sequence[str], **fields: Any) -> "PromptConfiguration":
+        """
+        Creates a configuration whose messages are joined from their parts on first access.
+
+        Args:
+            system_parts: Strings concatenating to the system message.
+            user_parts: Strings concatenating to the user message.
+            **fields: The other fields.
+        """
+        config = cls(system_message="", user_message="", **fields)
+        del config.__dict__["system_message"]
+        del config.__dict__["user_message"]
+        config._parts = {"system_message": tuple(system_parts), "user_message": tuple(user_parts)}
+        return config
+
+    if not TYPE_CHECKING:
+
+        def __getattr__(self, name: str) -> Any:
+            if name in LAZY_MESSAGE_FIELDS:
+                parts = self._parts.get(name)
+                if parts is not None:
+                    # Keep the fields in declaration order, which is the order they are serialized in
+                    values = {**self.__dict__, name: "".join(parts)}
+                    object.__setattr__(
+                        self, "__dict__", {key: values[key] for key in type(self).model_fields if key in values}
+                    )
+                    self._parts = {key: value for key, value in self._parts.items() if key != name}
+                if name in self.__dict__:  # Also set by a concurrent first access
+                    return self.__dict__[name]
+            return super().__getattr__(name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in LAZY_MESSAGE_FIELDS and name in self._parts:
+            self._parts = {key: parts for key, parts in self._parts.items() if key != name}
+
+    def message_parts(self, name: str) -> Tuple[str, ...]:
+        """
+        Returns the parts concatenating to a message, without joining them.
+
+        Args:
+            name: "system_message" or "user_message".
+        """
+        # A message set since (e.g. by model_copy(update=...)) supersedes its parts
+        if name in self.__dict__:
+            return (self.__dict__[name],)
+        parts = self._parts.get(name)
+        return parts if parts is not None else (getattr(self, name),)
+
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler: SerializerFunctionWrapHandler, info: SerializationInfo) -> Any:
+        # Join the messages that are about to be serialized
+        for name in self._parts:
+            if (info.include is None or name in info.include) and (info.exclude is None or name not in info.exclude):
+                getattr(self, name)
+        return handler(self)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, PromptConfiguration):
+            for config in (self, other):
+                for name in config._parts:
+                    getattr(config, name)
+        return super().__eq__(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def write_json(self, writer: TextWriter) -> None:
+        """
+        Writes the configuration to `writer` as a JSON object, streaming the messages part by
+        part instead of joining them. The response model is written as its class name.
+
+        Args:
+            writer: The text stream to write to.
+        """
+        rest = self.model_dump_json(exclude={"system_message", "user_message", "response_model"})
+        for prefix, name in (('{"system_message":"', "system_message"), ('","user_message":"', "user_message")):
+            writer.write(prefix)
+            for part in self.message_parts(name):
+                writer.write(json.dumps(part, ensure_ascii=False)[1:-1])
+        response_model = self.response_model.__name__ if self.response_model is not None else None
+        writer.write(f'","response_model":{json.dumps(response_model)},')
+        writer.write(rest[1:])
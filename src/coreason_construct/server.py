@@ -1,16 +1,65 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Deque,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 import jinja2
-import tiktoken
 from coreason_identity.models import UserContext
-from fastapi import Depends, FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from tiktoken import Encoding
-
-from coreason_construct.schemas.base import PromptComponent
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from starlette.requests import ClientDisconnect
+from starlette.types import Receive, Scope, Send
+
+from coreason_construct.compile_pool import CompilePool, LoopMonitor, PoolSaturatedError
+from coreason_construct.compiled import CompiledConstruct
+from coreason_construct.construct_store import ConstructStore
+from coreason_construct.contexts.planner import DEPENDENCY_PLANNER
+from coreason_construct.optimization.tokenizers import TOKENIZER_REGISTRY, Tokenizer
+from coreason_construct.response_cache import ResponseCache
+from coreason_construct.schemas.base import PromptComponent, PromptConfiguration, PromptSegment
+from coreason_construct.utils.fingerprint import canonical_json, digest
+from coreason_construct.utils.registry import VersionedRegistry
 from coreason_construct.weaver import Weaver
 
-app = FastAPI(title="Coreason Construct Compiler", version="1.0.0")
+T = TypeVar("T")
+
+# Compiled constructs kept by ConstructServer.handle_shared
+SHARED_CONSTRUCTS_SIZE = 256
+
+# Registered constructs kept compiled in memory, unless COREASON_CONSTRUCT_CACHE_SIZE is set
+REGISTERED_CONSTRUCTS_SIZE = 256
+
+# Responses of /v1/compile cached, and seconds they stay valid, unless set by the environment
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_TTL = 60.0
+
+# Batch items per task sent to the compile pool
+BATCH_CHUNKSIZE = 32
+
+# Batch tasks in flight per pool worker; bounds memory when the items are streamed
+BATCH_CHUNKS_PER_WORKER = 2
+
+NDJSON = "application/x-ndjson"
 
 
 class BlueprintRequest(BaseModel):
@@ -18,25 +67,69 @@ class BlueprintRequest(BaseModel):
     variables: Dict[str, Any] = Field(default_factory=dict)
     components: List[PromptComponent]
     max_tokens: Optional[int] = None
+    optimization: str = Field(default="priority", pattern="^(priority|optimal)$")
+    ordering: str = Field(default="priority", pattern="^(priority|cache)$")
+    encoding: Optional[str] = None
+
+
+# Precompiled validator and serializer of the fast JSON path
+_BLUEPRINT_REQUEST = TypeAdapter(BlueprintRequest)
+
+
+class ConstructRequest(BaseModel):
+    components: List[PromptComponent]
+    ordering: str = Field(default="priority", pattern="^(priority|cache)$")
+    encoding: Optional[str] = None
+
+
+class ConstructCompileRequest(BaseModel):
+    user_input: str
+    variables: Dict[str, Any] = Field(default_factory=dict)
+    max_tokens: Optional[int] = None
+    optimization: str = Field(default="priority", pattern="^(priority|optimal)$")
 
 
 class OptimizationRequest(BaseModel):
     text: str
     limit: int
     strategy: str = Field(..., pattern="^prune_middle$")
+    encoding: Optional[str] = None
 
 
 class CompilationResponse(BaseModel):
     system_prompt: str
     token_count: int
     warnings: List[str] = []
+    system_segments: List[PromptSegment] = []
+    prefix_hash: Optional[str] = None
+
+
+_COMPILATION_RESPONSE = TypeAdapter(CompilationResponse)
+
+
+class ConstructResponse(BaseModel):
+    construct_id: str
+    fingerprint: str
 
 
 class OptimizationResponse(BaseModel):
     text: str
 
 
-def prune_middle(text: str, limit: int, encoding: Encoding) -> str:
+class BatchError(BaseModel):
+    index: int
+    status_code: int
+    detail: Any
+
+
+class MetricsResponse(BaseModel):
+    pool: Dict[str, Any]
+    event_loop: Dict[str, Any]
+    constructs: Dict[str, int]
+    responses: Dict[str, Any]
+
+
+def prune_middle(text: str, limit: int, encoding: Tokenizer) -> str:
     tokens = encoding.encode(text)
     if len(tokens) <= limit:
         return text
@@ -54,18 +147,82 @@ def prune_middle(text: str, limit: int, encoding: Encoding) -> str:
     start_tokens = tokens[:start_count]
     end_tokens = tokens[-end_count:] if end_count > 0 else []
 
-    # Cast to str explicitly if mypy complains, but Encoding.decode usually returns str
-    decoded: str = encoding.decode(start_tokens + end_tokens)
-    return decoded
+    return encoding.decode(start_tokens + end_tokens)
 
 
-class ConstructServer:
-    def handle_request(self, request: BlueprintRequest, context: UserContext) -> CompilationResponse:
-        weaver = Weaver(context_data=request.variables)
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "0").lower() in ("1", "true", "yes")
+
 
-        # Use identity-aware methods
-        weaver.create_construct(name="request_construct", components=request.components, context=context)
+def pool_from_env() -> CompilePool:
+    """
+    Creates the compile pool configured by the environment: COREASON_COMPILE_WORKERS (pool size,
+    defaults to the CPU count), COREASON_COMPILE_PROCESSES ("1" for worker processes instead of
+    threads) and COREASON_COMPILE_MAX_PENDING (requests queued or running before further ones
+    are rejected with 503; unlimited by default).
+    """
+    workers = os.environ.get("COREASON_COMPILE_WORKERS")
+    max_pending = os.environ.get("COREASON_COMPILE_MAX_PENDING")
+    return CompilePool(
+        max_workers=int(workers) if workers else None,
+        processes=_env_flag("COREASON_COMPILE_PROCESSES"),
+        max_pending=int(max_pending) if max_pending else None,
+    )
 
+
+def construct_store_from_env() -> ConstructStore:
+    """
+    Creates the store of registered constructs configured by the environment: COREASON_CONSTRUCT_DB
+    (SQLite database file; registered constructs are kept in memory only by default) and
+    COREASON_CONSTRUCT_CACHE_SIZE (constructs kept compiled in memory, 256 by default).
+    """
+    maxsize = os.environ.get("COREASON_CONSTRUCT_CACHE_SIZE")
+    return ConstructStore(
+        os.environ.get("COREASON_CONSTRUCT_DB", ":memory:"),
+        maxsize=int(maxsize) if maxsize else REGISTERED_CONSTRUCTS_SIZE,
+    )
+
+
+def response_cache_from_env() -> "ResponseCache[CompilationResponse]":
+    """
+    Creates the cache of /v1/compile responses configured by the environment:
+    COREASON_RESPONSE_CACHE_SIZE (responses cached, 1024 by default; 0 disables caching but
+    still coalesces concurrent identical requests) and COREASON_RESPONSE_CACHE_TTL (seconds a
+    response is served from the cache, 60 by default; 0 or less for no expiry).
+    """
+    maxsize = os.environ.get("COREASON_RESPONSE_CACHE_SIZE")
+    ttl = float(os.environ.get("COREASON_RESPONSE_CACHE_TTL", RESPONSE_CACHE_TTL))
+    return ResponseCache(
+        maxsize=int(maxsize) if maxsize else RESPONSE_CACHE_SIZE,
+        ttl=ttl if ttl > 0 else None,
+    )
+
+
+class ConstructServer:
+    def __init__(
+        self,
+        pool: Optional[CompilePool] = None,
+        max_constructs: int = SHARED_CONSTRUCTS_SIZE,
+        store: Optional[ConstructStore] = None,
+        responses: Optional["ResponseCache[CompilationResponse]"] = None,
+        fast_json: Optional[bool] = None,
+    ) -> None:
+        # Runs compile and optimize work off the event loop
+        self.pool = pool or pool_from_env()
+        # Constructs registered through /v1/constructs
+        self.store = store or construct_store_from_env()
+        # Responses of /v1/compile, by request key
+        self.responses = responses or response_cache_from_env()
+        # Serve /v1/compile through the fast JSON path; defaults to COREASON_FAST_JSON
+        self.fast_json = fast_json if fast_json is not None else _env_flag("COREASON_FAST_JSON")
+        self.max_constructs = max_constructs
+        # Constructs compiled by handle_shared, by construct key; None marks constructs with
+        # dependencies instantiated from the request variables, which cannot be shared
+        self._constructs: OrderedDict[str, Optional[CompiledConstruct]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _resolve_vars(request: BlueprintRequest) -> Dict[str, Any]:
         # Prepare variables to include user_input if needed by resolve_construct logic
         resolve_vars = request.variables.copy()
         if "user_input" not in resolve_vars:
@@ -74,21 +231,327 @@ class ConstructServer:
         # Inject max_tokens into variables so resolve_construct can pick it up
         if request.max_tokens is not None:
             resolve_vars["max_tokens"] = request.max_tokens
+        resolve_vars["optimization"] = request.optimization
+        resolve_vars["ordering"] = request.ordering
+        return resolve_vars
+
+    @staticmethod
+    def _weave(
+        components: List[PromptComponent],
+        variables: Dict[str, Any],
+        known_variables: Optional[Dict[str, Any]],
+        encoding: Optional[str],
+        context: UserContext,
+    ) -> Weaver:
+        try:
+            weaver = Weaver(context_data=variables, known_variables=known_variables, encoding=encoding)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
 
         try:
-            config = weaver.resolve_construct(construct_id="request_construct", variables=resolve_vars, context=context)
+            # Use identity-aware methods
+            weaver.create_construct(name="request_construct", components=components, context=context)
         except jinja2.exceptions.UndefinedError as e:
             raise HTTPException(status_code=400, detail=f"Missing variable in template: {e}") from e
+        return weaver
 
-        encoding = tiktoken.get_encoding("cl100k_base")
-        token_count = len(encoding.encode(config.system_message))
+    @staticmethod
+    def _respond(config: PromptConfiguration, encoding: str) -> CompilationResponse:
+        token_count = TOKENIZER_REGISTRY.count(config.system_message, encoding)
 
         return CompilationResponse(
-            system_prompt=config.system_message, token_count=token_count, warnings=config.dropped_components
+            system_prompt=config.system_message,
+            token_count=token_count,
+            warnings=config.dropped_components,
+            system_segments=config.system_segments,
+            prefix_hash=config.prefix_hash,
+        )
+
+    def handle_request(self, request: BlueprintRequest, context: UserContext) -> CompilationResponse:
+        resolve_vars = self._resolve_vars(request)
+        weaver = self._weave(request.components, request.variables, resolve_vars, request.encoding, context)
+        try:
+            config = weaver.resolve_construct(construct_id="request_construct", variables=resolve_vars, context=context)
+        except jinja2.exceptions.UndefinedError as e:
+            raise HTTPException(status_code=400, detail=f"Missing variable in template: {e}") from e
+        return self._respond(config, weaver.encoding)
+
+    def handle_shared(self, request: BlueprintRequest, context: UserContext) -> CompilationResponse:
+        """
+        Handles a request like `handle_request`, reusing the construct compiled for an earlier
+        request with the same components, encoding and ordering, as long as the context registry
+        their dependencies resolve against is unchanged. Constructs with dependencies instantiated
+        from the request variables are still woven per request.
+        """
+        registry = DEPENDENCY_PLANNER.registry()
+        if not isinstance(registry, VersionedRegistry):
+            # Changes to the registry cannot be detected, like in DependencyPlanner.plan
+            return self.handle_request(request, context)
+        encoding = request.encoding or TOKENIZER_REGISTRY.default
+        key = digest(
+            "shared",
+            str(id(registry)),
+            str(registry.version),
+            encoding,
+            request.ordering,
+            *(c.fingerprint for c in request.components),
         )
+        with self._lock:
+            shared = key in self._constructs
+            compiled = self._constructs.get(key)
+            if shared:
+                self._constructs.move_to_end(key)
+        if shared and compiled is None:
+            return self.handle_request(request, context)
+
+        resolve_vars = self._resolve_vars(request)
+        if compiled is None:
+            weaver = self._weave(request.components, request.variables, resolve_vars, request.encoding, context)
+            # Dependencies instantiated from `context_data` depend on this request's variables
+            compiled = weaver.compile(request.ordering) if not weaver.dynamic_names else None
+            with self._lock:
+                self._constructs[key] = compiled
+                while len(self._constructs) > self.max_constructs:
+                    self._constructs.popitem(last=False)
+            if compiled is None:
+                return self.handle_request(request, context)
+
+        try:
+            config = compiled.build(request.user_input, resolve_vars, request.max_tokens, context, request.optimization)
+        except jinja2.exceptions.UndefinedError as e:
+            raise HTTPException(status_code=400, detail=f"Missing variable in template: {e}") from e
+        return self._respond(config, encoding)
+
+    def compile_construct(self, request: ConstructRequest, context: UserContext) -> CompiledConstruct:
+        """Weaves and compiles a construct to register."""
+        weaver = self._weave(request.components, {}, None, request.encoding, context)
+        return weaver.compile(request.ordering)
+
+    def handle_registered(
+        self, compiled: CompiledConstruct, request: ConstructCompileRequest, context: UserContext
+    ) -> CompilationResponse:
+        """Builds the prompt of a registered construct for one input."""
+        variables = {"user_input": request.user_input, **request.variables}
+        try:
+            config = compiled.build(request.user_input, variables, request.max_tokens, context, request.optimization)
+        except jinja2.exceptions.UndefinedError as e:
+            raise HTTPException(status_code=400, detail=f"Missing variable in template: {e}") from e
+        return self._respond(config, compiled.encoding or TOKENIZER_REGISTRY.default)
 
 
 server = ConstructServer()
+loop_monitor = LoopMonitor()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    loop_monitor.ensure_running()
+    yield
+    loop_monitor.stop()
+    server.pool.close()
+
+
+class _JSONRoute(APIRoute):
+    """
+    A route that, when `server.fast_json` is set, hands requests to the fast JSON handler of its
+    endpoint (if it has one), bypassing FastAPI's request parsing and response encoding.
+
+    The fast handler is served by a route of its own, so its dependencies (the user identity)
+    are still resolved by FastAPI, overrides included.
+    """
+
+    _fast_handler: Optional[Callable[[Request], Coroutine[Any, Any, Response]]] = None
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            if server.fast_json and self.endpoint in _FAST_HANDLERS:
+                if self._fast_handler is None:
+                    self._fast_handler = APIRoute(
+                        self.path,
+                        _FAST_HANDLERS[self.endpoint],
+                        methods=self.methods,
+                        dependencies=self.dependencies,
+                        dependency_overrides_provider=self.dependency_overrides_provider,
+                    ).get_route_handler()
+                return await self._fast_handler(request)
+            return await handler(request)
+
+        return route_handler
+
+
+app = FastAPI(title="Coreason Construct Compiler", version="1.0.0", lifespan=lifespan)
+app.router.route_class = _JSONRoute
+
+
+class _HTTPError(NamedTuple):
+    status_code: int
+    detail: Any
+
+
+def _in_worker(fn: Callable[..., T], *args: Any) -> Union[T, _HTTPError]:
+    # HTTPException cannot be pickled, so worker processes return HTTP errors instead of raising them
+    try:
+        return fn(*args)
+    except HTTPException as e:
+        return _HTTPError(e.status_code, e.detail)
+
+
+def _compile(request: BlueprintRequest, context: UserContext) -> CompilationResponse:
+    return server.handle_request(request, context)
+
+
+def _request_key(request: BlueprintRequest, context: UserContext) -> str:
+    """Hashes a compile request (defaults filled in, keys sorted) with the identity it runs as."""
+    return digest(
+        "compile",
+        canonical_json(request.model_dump(mode="json")),
+        canonical_json(context.model_dump(mode="json", exclude={"downstream_token"})),
+    )
+
+
+def _parse_compile(body: bytes, context: UserContext) -> Tuple[BlueprintRequest, str]:
+    """Validates a compile request straight from its JSON body, returning it with its cache key."""
+    try:
+        request = _BLUEPRINT_REQUEST.validate_json(body)
+    except ValidationError as e:
+        # Reported like FastAPI reports invalid bodies
+        errors = json.loads(e.json(include_url=False))
+        raise HTTPException(
+            status_code=422, detail=[{**error, "loc": ["body", *error["loc"]]} for error in errors]
+        ) from e
+    return request, _request_key(request, context)
+
+
+def _compile_construct(request: ConstructRequest, context: UserContext) -> CompiledConstruct:
+    return server.compile_construct(request, context)
+
+
+def _build_registered(
+    compiled: CompiledConstruct, request: ConstructCompileRequest, context: UserContext
+) -> CompilationResponse:
+    return server.handle_registered(compiled, request, context)
+
+
+def _optimize(request: OptimizationRequest) -> OptimizationResponse:
+    try:
+        encoding = TOKENIZER_REGISTRY.get(request.encoding)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=e.args[0]) from e
+    return OptimizationResponse(text=prune_middle(request.text, request.limit, encoding))
+
+
+async def _offload(fn: Callable[..., T], *args: Any) -> T:
+    """Runs a request handler on the compile pool, keeping the event loop free for other requests."""
+    loop_monitor.ensure_running()
+    try:
+        result: Union[T, _HTTPError] = await server.pool.run(_in_worker, fn, *args)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    if isinstance(result, _HTTPError):
+        raise HTTPException(status_code=result.status_code, detail=result.detail)
+    return result
+
+
+# A batch item: one NDJSON line, or one element of a JSON array
+_BatchItem = Union[bytes, Any]
+
+
+def _compile_batch(items: Sequence[_BatchItem], start: int, context: UserContext) -> bytes:
+    """Compiles consecutive batch items, returning their NDJSON response lines."""
+    lines: List[str] = []
+    for index, item in enumerate(items, start):
+        try:
+            if isinstance(item, bytes):
+                request = BlueprintRequest.model_validate_json(item)
+            else:
+                request = BlueprintRequest.model_validate(item)
+            lines.append(server.handle_shared(request, context).model_dump_json())
+        except ValidationError as e:
+            detail = json.loads(e.json(include_url=False))
+            lines.append(BatchError(index=index, status_code=422, detail=detail).model_dump_json())
+        except HTTPException as e:
+            lines.append(BatchError(index=index, status_code=e.status_code, detail=e.detail).model_dump_json())
+    return "".join(line + "\n" for line in lines).encode()
+
+
+async def _run_batch(items: List[_BatchItem], start: int, context: UserContext) -> bytes:
+    try:
+        return await server.pool.run(_compile_batch, items, start, context)
+    except PoolSaturatedError as e:
+        errors = (BatchError(index=start + k, status_code=503, detail=str(e)) for k in range(len(items)))
+        return "".join(error.model_dump_json() + "\n" for error in errors).encode()
+
+
+async def _ndjson_items(request: Request) -> AsyncIterator[_BatchItem]:
+    """Yields the non-blank lines of an NDJSON request body as they arrive."""
+    head: List[bytes] = []
+    async for chunk in request.stream():
+        lines = chunk.split(b"\n")
+        if len(lines) > 1:
+            lines[0] = b"".join((*head, lines[0]))
+            head = []
+            for line in lines[:-1]:
+                if line.strip():
+                    yield line
+        head.append(lines[-1])
+    line = b"".join(head)
+    if line.strip():
+        yield line
+
+
+class _NDJSONResponse(StreamingResponse):
+    """
+    A streaming NDJSON response that may be sent while the request body is still being read.
+
+    StreamingResponse normally listens for the client disconnecting by reading `receive`, which
+    would swallow the body messages of a streamed request; here only the body reader reads it.
+    """
+
+    media_type = NDJSON
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError as e:
+            raise ClientDisconnect() from e
+
+
+async def _array_items(items: List[Any]) -> AsyncIterator[_BatchItem]:
+    for item in items:
+        yield item
+
+
+async def _stream_batch(items: AsyncIterator[_BatchItem], context: UserContext) -> AsyncIterator[bytes]:
+    """
+    Compiles batch items on the compile pool, in chunks, yielding their response lines in order.
+
+    The first item is compiled on its own, so that the construct it compiles is shared by all
+    the chunks that follow instead of being compiled by several of them at once.
+    """
+    pending: Deque["asyncio.Future[bytes]"] = deque()
+    in_flight = server.pool.max_workers * BATCH_CHUNKS_PER_WORKER
+    chunk: List[_BatchItem] = []
+    start = 0
+    try:
+        async for item in items:
+            chunk.append(item)
+            if start == 0 or len(chunk) >= BATCH_CHUNKSIZE:
+                pending.append(asyncio.ensure_future(_run_batch(chunk, start, context)))
+                start += len(chunk)
+                chunk = []
+                if start == 1:
+                    yield await pending.popleft()
+                while len(pending) >= in_flight or (pending and pending[0].done()):
+                    yield await pending.popleft()
+        if chunk:
+            pending.append(asyncio.ensure_future(_run_batch(chunk, start, context)))
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
 
 
 def get_current_user_context() -> UserContext:
@@ -104,12 +567,118 @@ async def compile_blueprint(
     request: BlueprintRequest,
     context: UserContext = Depends(get_current_user_context),  # noqa: B008
 ) -> CompilationResponse:
-    return server.handle_request(request, context)
+    """
+    Compiles a blueprint. Responses are cached by request, and concurrent identical requests
+    share one compile. Only the compile runs on the compile pool, so cached responses are served
+    even while the pool is saturated.
+    """
+    key = _request_key(request, context)
+    return await server.responses.get_or_compute(key, lambda: _offload(_compile, request, context))
+
+
+async def _fast_compile(
+    request: Request,
+    context: UserContext = Depends(get_current_user_context),  # noqa: B008
+) -> Response:
+    """
+    The fast JSON path of /v1/compile: the body is validated from bytes by a precompiled
+    validator, and the response is serialized to bytes by pydantic-core. Like on the default
+    path, only the compile runs on the compile pool.
+    """
+    blueprint, key = _parse_compile(await request.body(), context)
+    response = await server.responses.get_or_compute(key, lambda: _offload(_compile, blueprint, context))
+    return Response(_COMPILATION_RESPONSE.dump_json(response), media_type="application/json")
+
+
+@app.post("/v1/compile:batch")
+async def compile_batch(
+    request: Request,
+    context: UserContext = Depends(get_current_user_context),  # noqa: B008
+) -> StreamingResponse:
+    """
+    Compiles a JSON array, or an NDJSON stream (Content-Type application/x-ndjson), of blueprint
+    requests. Responds with one NDJSON line per item, in order: its CompilationResponse, or a
+    BatchError. Items with the same components share one compiled construct.
+    """
+    loop_monitor.ensure_running()
+    items: AsyncIterator[_BatchItem]
+    if request.headers.get("content-type", "").split(";")[0].strip() == NDJSON:
+        items = _ndjson_items(request)
+    else:
+        try:
+            body = await server.pool.run(json.loads, await request.body())
+        except PoolSaturatedError as e:
+            raise HTTPException(status_code=503, detail=str(e)) from e
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}") from e
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of blueprint requests")
+        items = _array_items(body)
+    return _NDJSONResponse(_stream_batch(items, context))
+
+
+# Registered constructs are kept by the store of this process; only weaving and builds run on the
+# compile pool, which sends the constructs to worker processes in their wire format.
+
+
+@app.post("/v1/constructs", response_model=ConstructResponse)
+async def register_construct(
+    request: ConstructRequest,
+    context: UserContext = Depends(get_current_user_context),  # noqa: B008
+) -> ConstructResponse:
+    """Registers a construct owned by the calling user."""
+    compiled = await _offload(_compile_construct, request, context)
+    construct_id = await asyncio.to_thread(server.store.register, compiled, context.user_id)
+    return ConstructResponse(construct_id=construct_id, fingerprint=compiled.fingerprint)
+
+
+async def _registered(construct_id: str, context: UserContext) -> CompiledConstruct:
+    compiled = await asyncio.to_thread(server.store.get, construct_id, context.user_id)
+    if compiled is None:
+        # Constructs of other users are reported as unknown too
+        raise HTTPException(status_code=404, detail=f"Unknown construct '{construct_id}'")
+    return compiled
+
+
+@app.post("/v1/constructs/{construct_id}/compile", response_model=CompilationResponse)
+async def compile_construct(
+    construct_id: str,
+    request: ConstructCompileRequest,
+    context: UserContext = Depends(get_current_user_context),  # noqa: B008
+) -> CompilationResponse:
+    compiled = await _registered(construct_id, context)
+    return await _offload(_build_registered, compiled, request, context)
+
+
+@app.delete("/v1/constructs/{construct_id}", status_code=204)
+async def delete_construct(
+    construct_id: str,
+    context: UserContext = Depends(get_current_user_context),  # noqa: B008
+) -> Response:
+    if not await asyncio.to_thread(server.store.delete, construct_id, context.user_id):
+        raise HTTPException(status_code=404, detail=f"Unknown construct '{construct_id}'")
+    return Response(status_code=204)
 
 
 @app.post("/v1/optimize", response_model=OptimizationResponse)
 async def optimize_text(request: OptimizationRequest) -> OptimizationResponse:
-    encoding = tiktoken.get_encoding("cl100k_base")
-    optimized_text = prune_middle(request.text, request.limit, encoding)
+    return await _offload(_optimize, request)
+
+
+@app.get("/v1/metrics", response_model=MetricsResponse)
+async def metrics() -> MetricsResponse:
+    loop_monitor.ensure_running()
+    # Counting the registered constructs queries the database
+    constructs = await asyncio.to_thread(server.store.stats)
+    return MetricsResponse(
+        pool=server.pool.stats(),
+        event_loop=loop_monitor.stats(),
+        constructs=constructs,
+        responses=server.responses.stats(),
+    )
+
 
-    return OptimizationResponse(text=optimized_text)
+# Fast JSON handlers, by endpoint (see _JSONRoute)
+_FAST_HANDLERS: Dict[Callable[..., Any], Callable[..., Awaitable[Response]]] = {
+    compile_blueprint: _fast_compile,
+}
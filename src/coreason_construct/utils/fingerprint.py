@@ -0,0 +1,57 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import hashlib
+import json
+import weakref
+from typing import Any, MutableMapping, Union
+
+from pydantic import BaseModel
+
+__all__ = ["canonical_json", "class_fingerprint", "digest", "qualified_name"]
+
+_CLASS_FINGERPRINTS: MutableMapping[type, str] = weakref.WeakKeyDictionary()
+
+
+def canonical_json(value: Any) -> bytes:
+    """Serializes JSON-compatible data with sorted keys and no whitespace, as UTF-8."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def digest(*parts: Union[str, bytes]) -> str:
+    """
+    Returns the SHA-256 hex digest of a sequence of parts.
+
+    Every part is length-prefixed, so different splits of the same bytes never collide. Digests
+    of digests form a Merkle tree: a parent only needs its children's fingerprints.
+    """
+    hasher = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8") if isinstance(part, str) else part
+        hasher.update(len(data).to_bytes(8, "big"))
+        hasher.update(data)
+    return hasher.hexdigest()
+
+
+def qualified_name(cls: type) -> str:
+    """Returns the `module:qualname` name of a class."""
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def class_fingerprint(cls: type) -> str:
+    """
+    Returns the fingerprint of a class: its qualified name and, for Pydantic models, its JSON
+    schema, so that a response model whose fields change gets a new fingerprint. Memoized per class.
+    """
+    fingerprint = _CLASS_FINGERPRINTS.get(cls)
+    if fingerprint is None:
+        schema = cls.model_json_schema() if issubclass(cls, BaseModel) else None
+        fingerprint = _CLASS_FINGERPRINTS[cls] = digest("class", qualified_name(cls), canonical_json(schema))
+    return fingerprint
@@ -0,0 +1,63 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+from typing import Any, Dict, Tuple, TypeVar
+
+__all__ = ["VersionedRegistry"]
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class VersionedRegistry(Dict[K, V]):
+    """
+    A dict that bumps `version` on every mutation.
+
+    Caches derived from a registry (e.g. dependency plans) key on the version, so they are
+    invalidated even when the registry is modified directly rather than through a library.
+    """
+
+    version: int = 0
+
+    def _bump(self) -> None:
+        self.version += 1
+
+    def __setitem__(self, key: K, value: V) -> None:
+        super().__setitem__(key, value)
+        self._bump()
+
+    def __delitem__(self, key: K) -> None:
+        super().__delitem__(key)
+        self._bump()
+
+    def pop(self, key: K, *default: Any) -> Any:
+        self._bump()
+        return super().pop(key, *default)
+
+    def popitem(self) -> Tuple[K, V]:
+        self._bump()
+        return super().popitem()
+
+    def setdefault(self, key: K, default: Any = None) -> Any:
+        self._bump()
+        return super().setdefault(key, default)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        super().update(*args, **kwargs)
+        self._bump()
+
+    def clear(self) -> None:
+        super().clear()
+        self._bump()
+
+    def __ior__(self, other: Any) -> "VersionedRegistry[K, V]":  # type: ignore[override, misc]
+        super().__ior__(other)
+        self._bump()
+        return self
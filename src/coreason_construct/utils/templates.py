@@ -0,0 +1,140 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from jinja2 import Environment, StrictUndefined, Template, meta
+
+from coreason_construct.utils import timing
+
+__all__ = ["TEMPLATE_CACHE", "CompiledTemplate", "TemplateCache"]
+
+# Variable values that are safe to use as render memo keys (immutable and hashable by value).
+_MEMO_VALUE_TYPES = (str, int, float, bool, type(None))
+
+
+class CompiledTemplate:
+    """
+    A compiled template together with the variables it statically references.
+
+    Renders are memoized on the referenced subset of the supplied variables only, so a
+    template without variables is rendered once and unrelated variables never cause a
+    re-render.
+
+    Attributes:
+        template: The compiled Jinja2 template.
+        variables: Names of the undeclared variables referenced by the template source.
+    """
+
+    def __init__(self, template: Template, variables: FrozenSet[str], memo_size: int = 64) -> None:
+        self.template = template
+        self.variables = variables
+        self._sorted_variables = tuple(sorted(variables))
+        self._memo_size = memo_size
+        self._renders: OrderedDict[Tuple[Tuple[str, type, Any], ...], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _memo_key(self, kwargs: Dict[str, Any]) -> Optional[Tuple[Tuple[str, type, Any], ...]]:
+        # The value type is part of the key so that e.g. True, 1 and 1.0 render separately.
+        key = tuple((name, type(kwargs[name]), kwargs[name]) for name in self._sorted_variables if name in kwargs)
+        if all(isinstance(value, _MEMO_VALUE_TYPES) for _, _, value in key):
+            return key
+        return None
+
+    def render(self, **kwargs: Any) -> str:
+        """
+        Renders the template, reusing a previous result for the same referenced variables.
+        """
+        key = self._memo_key(kwargs)
+        if key is not None:
+            with self._lock:
+                cached = self._renders.get(key)
+                if cached is not None:
+                    self._renders.move_to_end(key)
+                    timing.count("render_hits")
+                    return cached
+
+        timing.count("renders")
+        rendered: str = self.template.render(**kwargs)
+
+        if key is not None:
+            with self._lock:
+                self._renders[key] = rendered
+                while len(self._renders) > self._memo_size:
+                    self._renders.popitem(last=False)
+        return rendered
+
+
+class TemplateCache:
+    """
+    Process-wide cache of compiled Jinja2 templates.
+
+    Templates are compiled by a single shared `Environment` (with `StrictUndefined`) and
+    kept in a bounded LRU keyed by a hash of their source, so each distinct template is
+    parsed, analysed for referenced variables and compiled once per process.
+
+    Attributes:
+        environment: The shared Jinja2 environment used for compilation.
+        maxsize: Maximum number of compiled templates retained.
+        hits: Number of lookups served from the cache.
+        misses: Number of lookups that required compilation.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.environment = Environment(undefined=StrictUndefined)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._templates: OrderedDict[bytes, CompiledTemplate] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(source: str) -> bytes:
+        return hashlib.blake2b(source.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, source: str) -> CompiledTemplate:
+        """
+        Returns the compiled template for `source`, compiling it on first use.
+        """
+        key = self._key(source)
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return template
+            self.misses += 1
+
+        # Compile outside the lock; a concurrent miss for the same source is harmless.
+        ast = self.environment.parse(source)
+        template = CompiledTemplate(self.environment.from_string(ast), frozenset(meta.find_undeclared_variables(ast)))
+        with self._lock:
+            self._templates[key] = template
+            while len(self._templates) > self.maxsize:
+                self._templates.popitem(last=False)
+        return template
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss counters and the current cache size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._templates), "maxsize": self.maxsize}
+
+    def clear(self) -> None:
+        """Empties the cache and resets the counters."""
+        with self._lock:
+            self._templates.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+TEMPLATE_CACHE = TemplateCache()
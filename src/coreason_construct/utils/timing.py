@@ -0,0 +1,209 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Callable, Dict, Iterator, List, Optional
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+__all__ = [
+    "BuildTimings",
+    "LogSink",
+    "PhaseTiming",
+    "TimingRecorder",
+    "TimingSink",
+    "active_recorder",
+    "count",
+    "phase",
+]
+
+
+class PhaseTiming(BaseModel):
+    """
+    Time spent in one phase of a build.
+
+    Attributes:
+        wall: Wall-clock seconds.
+        cpu: CPU seconds of the building thread.
+        calls: Number of times the phase was entered.
+    """
+
+    wall: float = 0.0
+    cpu: float = 0.0
+    calls: int = 0
+
+
+class BuildTimings(BaseModel):
+    """
+    The timing record of one build.
+
+    Phases nest: e.g. "tokenize" also runs within "optimize", and each phase reports its
+    inclusive time. Phases that did not run are absent.
+
+    Attributes:
+        fingerprint: Fingerprint of the construct that was built, if known.
+        wall: Total wall-clock seconds of the build.
+        cpu: Total CPU seconds of the build.
+        phases: Time by phase: "resolve" (dependency resolution while adding components, for
+            the whole construct), "compile", "render", "estimate", "tokenize", "optimize",
+            "fetch" and "assemble".
+        components: Render wall-clock seconds by component name.
+        counts: Event counts: "renders" (Jinja renders), "render_hits" (renders served from the
+            template memo), "encodes" (texts tokenized), "plans", "optimize_iterations" and "fetches".
+    """
+
+    fingerprint: Optional[str] = None
+    wall: float = 0.0
+    cpu: float = 0.0
+    phases: Dict[str, PhaseTiming] = Field(default_factory=dict)
+    components: Dict[str, float] = Field(default_factory=dict)
+    counts: Dict[str, int] = Field(default_factory=dict)
+
+
+# Receives the timing record of every instrumented build
+TimingSink = Callable[[BuildTimings], None]
+
+
+class LogSink:
+    """
+    A TimingSink logging the builds slower than a threshold, with their slowest phases.
+
+    Attributes:
+        threshold: Wall-clock seconds above which a build is logged.
+    """
+
+    def __init__(self, threshold: float = 0.1) -> None:
+        self.threshold = threshold
+
+    def __call__(self, timings: BuildTimings) -> None:
+        if timings.wall < self.threshold:
+            return
+        phases = sorted(timings.phases.items(), key=lambda item: item[1].wall, reverse=True)
+        logger.warning(
+            f"Slow build of construct {timings.fingerprint}: {timings.wall * 1000:.1f} ms "
+            f"({', '.join(f'{name} {timing.wall * 1000:.1f} ms' for name, timing in phases)})",
+            fingerprint=timings.fingerprint,
+            timings=timings.model_dump(),
+        )
+
+
+_ACTIVE: ContextVar[Optional["TimingRecorder"]] = ContextVar("coreason_construct_timing", default=None)
+
+
+class TimingRecorder:
+    """
+    Records wall and CPU time per phase, and event counts, while active.
+
+    Activate it with `with recorder:`; instrumented code in this library (in the same thread or
+    task) then reports to it through `phase` and `count`. A phase entered again while it is
+    already running (e.g. nested tokenization) is only timed once.
+    """
+
+    def __init__(self) -> None:
+        self._phases: Dict[str, List[float]] = {}
+        self._running: Dict[str, int] = {}
+        self._components: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._tokens: List[Token[Optional["TimingRecorder"]]] = []
+        self._started: Optional[List[float]] = None
+        self._elapsed = [0.0, 0.0]
+
+    def __enter__(self) -> "TimingRecorder":
+        self._tokens.append(_ACTIVE.set(self))
+        self._started = [time.perf_counter(), time.thread_time()]
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self._started is not None:
+            self._elapsed[0] += time.perf_counter() - self._started[0]
+            self._elapsed[1] += time.thread_time() - self._started[1]
+            self._started = None
+        _ACTIVE.reset(self._tokens.pop())
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times the enclosed code as phase `name`."""
+        running = self._running.get(name, 0)
+        self._running[name] = running + 1
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self._running[name] = running
+            totals = self._phases.setdefault(name, [0.0, 0.0, 0])
+            totals[2] += 1
+            if not running:
+                totals[0] += time.perf_counter() - wall
+                totals[1] += time.thread_time() - cpu
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Adds `n` to the event count `name`."""
+        self._counts[name] = self._counts.get(name, 0) + n
+
+    def component(self, name: str, wall: float) -> None:
+        """Adds `wall` seconds to the render time of component `name`."""
+        self._components[name] = self._components.get(name, 0.0) + wall
+
+    def merge(self, other: "TimingRecorder") -> None:
+        """Adds the phases, component render times and counts recorded by `other`."""
+        for name, (wall, cpu, calls) in other._phases.items():
+            totals = self._phases.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += wall
+            totals[1] += cpu
+            totals[2] += calls
+        for name, wall in other._components.items():
+            self.component(name, wall)
+        for name, n in other._counts.items():
+            self.count(name, n)
+
+    def timings(self, fingerprint: Optional[str] = None) -> BuildTimings:
+        """
+        Returns the record of everything timed so far.
+
+        Args:
+            fingerprint: Fingerprint of the construct that was built.
+        """
+        return BuildTimings(
+            fingerprint=fingerprint,
+            wall=self._elapsed[0],
+            cpu=self._elapsed[1],
+            phases={
+                name: PhaseTiming(wall=wall, cpu=cpu, calls=int(calls))
+                for name, (wall, cpu, calls) in self._phases.items()
+            },
+            components=dict(self._components),
+            counts=dict(self._counts),
+        )
+
+
+def active_recorder() -> Optional[TimingRecorder]:
+    """Returns the recorder active in this context, if any."""
+    return _ACTIVE.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Times the enclosed code as phase `name` of the active recorder, if any."""
+    recorder = _ACTIVE.get()
+    if recorder is None:
+        yield
+        return
+    with recorder.phase(name):
+        yield
+
+
+def count(name: str, n: int = 1) -> None:
+    """Adds `n` to the event count `name` of the active recorder, if any."""
+    recorder = _ACTIVE.get()
+    if recorder is not None:
+        recorder.count(name, n)
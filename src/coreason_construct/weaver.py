@@ -8,17 +8,24 @@
 #
 # Source Code: https://github.com/CoReason-AI/coreason_construct
 
-import inspect
-from typing import Any, Dict, List, Optional, Type, Union
+from contextlib import contextmanager
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple, Type
 
-import tiktoken
+import jinja2
 from coreason_identity.models import UserContext
 from loguru import logger
 from pydantic import BaseModel
 
-from coreason_construct.contexts.library import ContextLibrary
+from coreason_construct.build_cache import BuildCache
+from coreason_construct.compiled import ORDERING_MODES, SEGMENT_ORDER, CompiledConstruct
+from coreason_construct.contexts.library import ContextLibrary, LazyContext
+from coreason_construct.contexts.planner import DEPENDENCY_PLANNER, DependencyPlan, PlanStep, StepKind
+from coreason_construct.optimization.estimation import TokenEstimator
+from coreason_construct.optimization.tokenizers import TOKENIZER_REGISTRY
 from coreason_construct.primitives.base import StructuredPrimitive
-from coreason_construct.schemas.base import ComponentType, PromptComponent, PromptConfiguration
+from coreason_construct.schemas.base import PromptComponent, PromptConfiguration, SegmentKind, TextWriter
+from coreason_construct.utils import timing
+from coreason_construct.utils.timing import TimingRecorder, TimingSink
 
 
 class Weaver:
@@ -26,114 +33,279 @@ class Weaver:
     The Builder Engine that stitches components into the final request configuration.
     """
 
-    def __init__(self, context_data: Optional[Dict[str, Any]] = None) -> None:
+    def __init__(
+        self,
+        context_data: Optional[Dict[str, Any]] = None,
+        known_variables: Optional[Iterable[str]] = None,
+        estimator: Optional[TokenEstimator] = None,
+        encoding: Optional[str] = None,
+        build_cache: Optional[BuildCache] = None,
+        instrument: bool = False,
+        timing_sink: Optional[TimingSink] = None,
+    ) -> None:
+        """
+        Args:
+            context_data: Data used to instantiate dynamic context dependencies.
+            known_variables: Names of the variables that will be supplied at build time. When given,
+                components referencing any other template variable are rejected by `add`.
+            estimator: Cheap token bounds deciding when exact tokenization can be skipped
+                (defaults to the bounds valid for `encoding`).
+            encoding: Name of the tokenizer in TOKENIZER_REGISTRY used for exact token counts
+                (defaults to the registry default, cl100k_base).
+            build_cache: Cache of built configurations used by `build` and `resolve_construct`
+                (e.g. the shared BUILD_CACHE). Disabled by default.
+            instrument: Record the wall and CPU time of every phase of every build (see
+                `BuildTimings`) into `PromptConfiguration.timings`. Off by default.
+            timing_sink: Receives the timing record of every build, e.g. a `LogSink` reporting
+                slow constructs. Setting it turns `instrument` on.
+
+        Raises:
+            ValueError: If `encoding` is not a known encoding.
+        """
+        if encoding is not None and encoding not in TOKENIZER_REGISTRY:
+            raise ValueError(f"Unknown encoding '{encoding}'. Expected one of {TOKENIZER_REGISTRY.names()}")
         self.components: List[PromptComponent] = []
+        # Indexes over `components`: exact names and dynamic family prefixes (e.g. "PatientHistory"
+        # for "PatientHistory_P123"), giving O(1) duplicate checks and O(k) dependency checks.
+        self._component_names: Set[str] = set()
+        self._component_families: Set[str] = set()
+        self._indexed_count = 0
+        # Names of the components instantiated from dynamic context classes during dependency resolution
+        self._dynamic_names: Set[str] = set()
         self._response_model: Optional[Type[BaseModel]] = None
         self.context_data: Dict[str, Any] = context_data or {}
+        self.known_variables: Optional[Set[str]] = set(known_variables) if known_variables is not None else None
+        self.encoding = encoding or TOKENIZER_REGISTRY.default
+        self.estimator = estimator or TOKENIZER_REGISTRY.estimator(self.encoding)
+        self.build_cache = build_cache
+        self.instrument = instrument or timing_sink is not None
+        self.timing_sink = timing_sink
+        # Dependency resolution time of the components added so far, reported with every build
+        self._resolve_timings = TimingRecorder()
+
+    @property
+    def dynamic_names(self) -> FrozenSet[str]:
+        """
+        Names of the components instantiated from dynamic context classes, whose content depends
+        on `context_data`, e.g. {"PatientHistory_P123"}.
+        """
+        return frozenset(self._dynamic_names)
+
+    @staticmethod
+    def _family_prefixes(name: str) -> Iterator[str]:
+        """Yields every prefix `p` such that `name.startswith(f"{p}_")`."""
+        index = name.find("_")
+        while index != -1:
+            yield name[:index]
+            index = name.find("_", index + 1)
+
+    def _index_component(self, component: PromptComponent) -> None:
+        self._component_names.add(component.name)
+        self._component_families.update(self._family_prefixes(component.name))
+        self._indexed_count += 1
+
+    def _sync_index(self) -> None:
+        # `components` is a public list; rebuild the indexes if it was modified outside add().
+        if self._indexed_count != len(self.components):
+            self._component_names.clear()
+            self._component_families.clear()
+            self._indexed_count = 0
+            for component in self.components:
+                self._index_component(component)
 
     def _has_component(self, name: str) -> bool:
-        return any(c.name == name for c in self.components)
-
-    def _sort_components(self, components: List[PromptComponent]) -> List[PromptComponent]:
+        self._sync_index()
+        return name in self._component_names
+
+    def _has_family(self, prefix: str) -> bool:
+        """Whether a dynamic component of the family `prefix` (e.g. PatientHistory_123) is present."""
+        self._sync_index()
+        return prefix in self._component_families
+
+    def _sort_components(
+        self, components: List[PromptComponent], ordering: str = "priority", dynamic: Optional[Set[str]] = None
+    ) -> List[PromptComponent]:
+        if ordering == "cache":
+            # Static text first and per-request dynamic contexts last, each by priority (descending)
+            # then name, so the order does not depend on the order components were added in.
+            dynamic = self._dynamic_components() if dynamic is None else dynamic
+            return sorted(
+                components, key=lambda c: (SEGMENT_ORDER[self._segment_kind(c, dynamic)], -c.priority, c.name)
+            )
         # Sort by priority (descending), then stable
         return sorted(components, key=lambda c: c.priority, reverse=True)
 
-    def _resolve_dependency(self, dep_name: str, context: Optional[UserContext]) -> Optional[PromptComponent]:
+    def _dynamic_components(self) -> Set[str]:
         """
-        Resolves a dependency name to a PromptComponent instance.
-        Supports both static instances and dynamic class instantiation.
+        Names of the per-request dynamic contexts: components instantiated from a dynamic context
+        class during dependency resolution, instances of a class registered as one, and lazy contexts.
         """
-        if not context:
-            # Enforce context as per "Fail Safe" constraint
-            raise ValueError(f"UserContext is required to resolve dependency '{dep_name}'")
+        classes = (LazyContext, *(item for item in DEPENDENCY_PLANNER.registry().values() if isinstance(item, type)))
+        return {c.name for c in self.components if c.name in self._dynamic_names or isinstance(c, classes)}
 
-        # Use ContextLibrary to retrieve artifact (ensures audit logging)
-        registry_item: Optional[Union[PromptComponent, Type[PromptComponent]]] = ContextLibrary.get_context(
-            dep_name, context
-        )
+    @staticmethod
+    def _segment_kind(component: PromptComponent, dynamic: Set[str]) -> SegmentKind:
+        if component.name in dynamic:
+            return SegmentKind.DYNAMIC
+        return SegmentKind.VARIABLE if component.template_variables else SegmentKind.STATIC
 
-        if not registry_item:
+    def _dependency_kwargs(self, dep_name: str, component_class: Type[PromptComponent]) -> Optional[Dict[str, Any]]:
+        """
+        Prepares the constructor arguments of a dynamic context class from context_data.
+        The constructor signature is inspected once per class by the dependency planner.
+        """
+        # Prepare arguments from context_data; flag parameters without defaults that are missing
+        kwargs = {}
+        missing_params = []
+        for param in DEPENDENCY_PLANNER.init_parameters(component_class):
+            if param.name in self.context_data:
+                kwargs[param.name] = self.context_data[param.name]
+            elif param.required:
+                missing_params.append(param.name)
+
+        if missing_params:
+            logger.warning(
+                f"Cannot instantiate dependency '{dep_name}': Missing required context data: {missing_params}"
+            )
             return None
+        return kwargs
 
-        # Case 1: Registry item is already an instance
-        if isinstance(registry_item, PromptComponent):
-            return registry_item
-
-        # Case 2: Registry item is a class (Dynamic Context)
-        if isinstance(registry_item, type) and issubclass(registry_item, PromptComponent):
-            # Inspect __init__ to see what arguments it needs
-            init_signature = inspect.signature(registry_item.__init__)
-            init_params = init_signature.parameters
+    def _instantiate_dependency(
+        self, dep_name: str, component_class: Type[PromptComponent]
+    ) -> Optional[PromptComponent]:
+        """
+        Instantiates a dynamic context class from context_data.
+        """
+        kwargs = self._dependency_kwargs(dep_name, component_class)
+        if kwargs is None:
+            return None
 
-            # Prepare arguments from context_data
-            kwargs = {}
-            missing_params = []
+        try:
+            return component_class(**kwargs)
+        except Exception as e:
+            logger.error(f"Failed to instantiate dependency '{dep_name}': {e}")
+        return None
 
-            for param_name, param in init_params.items():
-                if param_name == "self":
-                    continue
-                # If param is in context_data, use it
-                if param_name in self.context_data:
-                    kwargs[param_name] = self.context_data[param_name]
-                # If param has no default value and is missing, flag it
-                elif param.default == inspect.Parameter.empty and param.kind not in (
-                    inspect.Parameter.VAR_POSITIONAL,
-                    inspect.Parameter.VAR_KEYWORD,
-                ):
-                    missing_params.append(param_name)
-
-            if missing_params:
-                logger.warning(
-                    f"Cannot instantiate dependency '{dep_name}': Missing required context data: {missing_params}"
+    def _append(self, component: PromptComponent) -> None:
+        # Surface missing template variables now rather than deep inside build()
+        if self.known_variables is not None:
+            missing = component.template_variables - self.known_variables
+            if missing:
+                raise jinja2.UndefinedError(
+                    f"Component '{component.name}' references undefined variables: {sorted(missing)}"
                 )
-                return None
 
-            try:
-                return registry_item(**kwargs)
-            except Exception as e:
-                logger.error(f"Failed to instantiate dependency '{dep_name}': {e}")
+        self.components.append(component)
+        self._index_component(component)
 
-        return None
+        if isinstance(component, StructuredPrimitive):
+            self._response_model = component.response_model
+
+    @staticmethod
+    def _plan_for(component: PromptComponent) -> DependencyPlan:
+        return DEPENDENCY_PLANNER.plan(getattr(component, "dependencies", None) or ())
 
     def add(self, component: PromptComponent, context: Optional[UserContext] = None) -> "Weaver":
         """
         Add a component to the weaver.
         Handles dependency resolution.
+
+        Transitive dependencies are added in depth-first order from a precomputed dependency
+        plan, iteratively, so deep dependency chains do not hit the recursion limit.
+        """
+        with self._resolving():
+            self._add(component, context)
+        return self
+
+    @contextmanager
+    def _resolving(self) -> Iterator[None]:
+        """Times the enclosed dependency resolution, when instrumenting."""
+        if not self.instrument:
+            yield
+            return
+        with self._resolve_timings, self._resolve_timings.phase("resolve"):
+            yield
+
+    def _add(
+        self,
+        component: PromptComponent,
+        context: Optional[UserContext],
+        loaded: Optional[Mapping[str, Optional[PromptComponent]]] = None,
+        pending: Optional[Dict[str, Type[PromptComponent]]] = None,
+    ) -> None:
+        """
+        Adds a component and its transitive dependencies.
+
+        Dynamic contexts are instantiated in place, unless `loaded` is given: they are then taken
+        from `loaded` (keyed by dependency name), and those not loaded yet are collected into
+        `pending` and skipped, for the caller to load them and walk again.
         """
         # Avoid duplicate addition
         if self._has_component(component.name):
-            return self
-
-        # Add the component first to handle circular dependencies (breaking the recursion)
-        self.components.append(component)
+            return
 
-        if isinstance(component, StructuredPrimitive):
-            self._response_model = component.response_model
+        # Add the component first to handle circular dependencies
+        self._append(component)
 
         # 1. Dependency Resolution
-        if hasattr(component, "dependencies"):
-            deps: List[str] = getattr(component, "dependencies", [])
-            for dep_name in deps:
-                # Resolve the dependency (instance or new instance from class)
-                if not self._has_component(dep_name) and not any(
-                    c.name.startswith(f"{dep_name}_") for c in self.components
-                ):
-                    # Note: The check startswith is a heuristic for dynamic components like PatientHistory_123
-                    # But exact name match check is safer if the dynamic component sets a predictable name.
-                    # Ideally we resolve it, check its name, then decide.
-
-                    resolved_context = self._resolve_dependency(dep_name, context=context)
-
-                    if resolved_context:
-                        # Recursive call to handle transitive dependencies
-                        self.add(resolved_context, context=context)
+        # Each frame walks one plan: [name of the component that owns it, plan steps, position]
+        frames: List[List[Any]] = [[component.name, self._plan_for(component).steps, 0]]
+        while frames:
+            frame = frames[-1]
+            owner_name, steps, position = frame
+            if position >= len(steps):
+                frames.pop()
+                continue
+
+            step: PlanStep = steps[position]
+            parent_name = step.parent or owner_name
+            # By default, move past this dependency's sub-tree
+            frame[2] = step.end
+
+            # Note: The family check is a heuristic for dynamic components like PatientHistory_123
+            if self._has_component(step.name) or self._has_family(step.name):
+                continue
+
+            if not context:
+                # Enforce context as per "Fail Safe" constraint
+                raise ValueError(f"UserContext is required to resolve dependency '{step.name}'")
+
+            if step.kind == StepKind.REPEAT:
+                # Only reached when the earlier occurrence was skipped; plan it on its own
+                frames.append([parent_name, DEPENDENCY_PLANNER.plan((step.name,)).steps, 0])
+                continue
+
+            # The plan only orders the dependencies; each one is still fetched through
+            # ContextLibrary, which audits the access
+            item = ContextLibrary.get_context(step.name, context)
+            if isinstance(item, PromptComponent):
+                if not self._has_component(item.name):
+                    self._append(item)
+                    if item is step.item:
+                        # Continue into the static sub-tree, which directly follows in the plan
+                        frame[2] = position + 1
                     else:
-                        logger.warning(
-                            f"Dependency '{dep_name}' required by '{component.name}' "
-                            "not found or could not be instantiated."
-                        )
-
-        return self
+                        frames.append([item.name, self._plan_for(item).steps, 0])
+                continue
+
+            resolved: Optional[PromptComponent] = None
+            if isinstance(item, type) and issubclass(item, PromptComponent):
+                if loaded is None:
+                    resolved = self._instantiate_dependency(step.name, item)
+                elif step.name in loaded:
+                    resolved = loaded[step.name]
+                else:
+                    if pending is not None:
+                        pending[step.name] = item
+                    continue
+            if resolved is None:
+                logger.warning(
+                    f"Dependency '{step.name}' required by '{parent_name}' not found or could not be instantiated."
+                )
+            elif not self._has_component(resolved.name):
+                self._append(resolved)
+                self._dynamic_names.add(resolved.name)
+                frames.append([resolved.name, self._plan_for(resolved).steps, 0])
 
     def create_construct(self, name: str, components: List[PromptComponent], context: UserContext) -> None:
         """
@@ -168,8 +340,17 @@ class Weaver:
         max_tokens = variables.get("max_tokens")
         if not isinstance(max_tokens, int):
             max_tokens = None
-
-        return self.build(user_input=user_input, variables=variables, max_tokens=max_tokens, context=context)
+        optimization = variables.get("optimization", "priority")
+        ordering = variables.get("ordering", "priority")
+
+        return self.build(
+            user_input=user_input,
+            variables=variables,
+            max_tokens=max_tokens,
+            context=context,
+            optimization=optimization,
+            ordering=ordering,
+        )
 
     def visualize_construct(self, construct_id: str, context: UserContext) -> Dict[str, Any]:
         """
@@ -185,10 +366,50 @@ class Weaver:
 
     def _estimate_tokens(self, text: str) -> int:
         """
-        Estimate tokens using tiktoken.
+        Count tokens exactly with the shared tokenizer of this Weaver's encoding.
         """
-        encoding = tiktoken.get_encoding("cl100k_base")
-        return len(encoding.encode(text))
+        return TOKENIZER_REGISTRY.count(text, self.encoding)
+
+    def _estimate_tokens_batch(self, texts: Sequence[str]) -> List[int]:
+        """
+        Count the tokens of several texts at once, encoding them as a batch.
+        """
+        return TOKENIZER_REGISTRY.count_batch(texts, self.encoding)
+
+    def compile(self, ordering: str = "priority") -> CompiledConstruct:
+        """
+        Compile the current components into an immutable, reusable construct.
+
+        Dependencies are already resolved by `add`; compiling sorts the components, compiles their
+        templates and renders every variable-free component once (tokenizing it on first need). The
+        result is independent of later changes to this Weaver and can be built concurrently from
+        multiple threads.
+
+        Args:
+            ordering: Order of the system prompt, one of ORDERING_MODES. "cache" puts static text
+                first and per-request dynamic contexts last, maximizing provider prompt-cache hits.
+        """
+        if ordering not in ORDERING_MODES:
+            raise ValueError(f"Unknown ordering mode '{ordering}'. Expected one of {ORDERING_MODES}")
+        with timing.phase("compile"):
+            dynamic = self._dynamic_components()
+            return CompiledConstruct(
+                self.components,
+                self._sort_components(self.components, ordering, dynamic),
+                self._response_model,
+                self._estimate_tokens,
+                estimator=self.estimator,
+                count_batch=self._estimate_tokens_batch,
+                encoding=self.encoding,
+                dynamic=dynamic,
+            )
+
+    def fingerprint(self, ordering: str = "priority") -> str:
+        """
+        The content hash of the construct this Weaver currently compiles to (see
+        `CompiledConstruct.fingerprint`). Equal fingerprints mean identical builds.
+        """
+        return self.compile(ordering).fingerprint
 
     def build(
         self,
@@ -196,87 +417,137 @@ class Weaver:
         variables: Optional[Dict[str, Any]] = None,
         max_tokens: Optional[int] = None,
         context: Optional[UserContext] = None,
+        optimization: str = "priority",
+        ordering: str = "priority",
     ) -> PromptConfiguration:
         """
-        Build the final prompt configuration.
+        Build the final prompt configuration, from `build_cache` when one is set.
 
         Args:
             user_input: The input data from the user.
             variables: Optional variables to render components.
             max_tokens: Maximum allowed estimated tokens. If exceeded, low priority components are dropped.
             context: Optional UserContext (though encouraged).
+            optimization: Component selection strategy when over budget, one of OPTIMIZATION_MODES.
+            ordering: Order of the system prompt, one of ORDERING_MODES.
         """
-        if variables is None:
-            variables = {}
-
-        # 2. Optimization Logic
-        active_components = list(self.components)
-        dropped_components_list: List[str] = []
+        recorder = self._recorder()
+        if recorder is None:
+            return self._build(user_input, variables, max_tokens, context, optimization, ordering)[1]
+        with recorder:
+            compiled, config = self._build(user_input, variables, max_tokens, context, optimization, ordering)
+        return self._report(config, recorder, compiled)
+
+    def _build(
+        self,
+        user_input: str,
+        variables: Optional[Dict[str, Any]],
+        max_tokens: Optional[int],
+        context: Optional[UserContext],
+        optimization: str,
+        ordering: str,
+    ) -> Tuple[CompiledConstruct, PromptConfiguration]:
+        compiled = self.compile(ordering)
+        if self.build_cache is not None:
+            return compiled, self.build_cache.build(compiled, user_input, variables, max_tokens, context, optimization)
+        return compiled, compiled.build(
+            user_input, variables=variables, max_tokens=max_tokens, context=context, optimization=optimization
+        )
 
-        while True:
-            # Re-sort/Filter active components
-            sorted_comps = self._sort_components(active_components)
+    def _recorder(self) -> Optional[TimingRecorder]:
+        """Returns a recorder for one build, seeded with the resolve time, when instrumenting."""
+        if not self.instrument:
+            return None
+        recorder = TimingRecorder()
+        recorder.merge(self._resolve_timings)
+        return recorder
 
-            # Generate Parts
-            system_parts = [c.render(**variables) for c in sorted_comps if c.type != ComponentType.PRIMITIVE]
-            task_part = next((c.render(**variables) for c in sorted_comps if c.type == ComponentType.PRIMITIVE), "")
-            final_user_msg = f"{task_part}\n\nINPUT DATA:\n{user_input}" if task_part else user_input
-            system_msg = "\n\n".join(system_parts)
+    def _report(
+        self, config: PromptConfiguration, recorder: TimingRecorder, compiled: CompiledConstruct
+    ) -> PromptConfiguration:
+        """Attaches the timing record of a build to its configuration and passes it to the sink."""
+        config.timings = recorder.timings(compiled.fingerprint)
+        if self.timing_sink is not None:
+            try:
+                self.timing_sink(config.timings)
+            except Exception as e:
+                logger.error(f"Timing sink failed: {e}")
+        return config
 
-            # Check Limits
-            total_text = system_msg + final_user_msg
-            estimated_tokens = self._estimate_tokens(total_text)
+    def build_stream(
+        self,
+        writer: TextWriter,
+        user_input: str,
+        variables: Optional[Dict[str, Any]] = None,
+        max_tokens: Optional[int] = None,
+        context: Optional[UserContext] = None,
+        optimization: str = "priority",
+        ordering: str = "priority",
+    ) -> PromptConfiguration:
+        """
+        Build the final prompt configuration and write it to `writer` as JSON, streaming the
+        messages part by part (see `PromptConfiguration.write_json`).
 
-            if max_tokens is None or estimated_tokens <= max_tokens:
-                break
+        Args:
+            writer: The text stream to write to, e.g. an open file or `socket.makefile("w")`.
+            user_input: The input data from the user.
+            variables: Optional variables to render components.
+            max_tokens: Maximum allowed estimated tokens. If exceeded, low priority components are dropped.
+            context: Optional UserContext (though encouraged).
+            optimization: Component selection strategy when over budget, one of OPTIMIZATION_MODES.
+            ordering: Order of the system prompt, one of ORDERING_MODES.
 
-            logger.info(f"Optimization loop: estimated={estimated_tokens}, limit={max_tokens}")
+        Returns:
+            The configuration that was written.
+        """
+        config = self.build(user_input, variables, max_tokens, context, optimization, ordering)
+        config.write_json(writer)
+        return config
 
-            # Need to truncate. Find lowest priority component that is not Critical (10).
-            # PRD: "truncates 'Low Priority' contexts".
-            # We sort by priority ascending to find removal candidates.
-            # We filter out Priority 10 (Critical) components to ensure they are preserved.
-            candidates = sorted([c for c in active_components if c.priority < 10], key=lambda c: c.priority)
+    def build_many(
+        self,
+        inputs: Iterable[str],
+        variables: Optional[Dict[str, Any]] = None,
+        max_tokens: Optional[int] = None,
+        context: Optional[UserContext] = None,
+        optimization: str = "priority",
+        ordering: str = "priority",
+    ) -> Iterator[PromptConfiguration]:
+        """
+        Lazily build one prompt configuration per user input.
 
-            if not candidates:
-                logger.warning(
-                    f"Token limit exceeded ({estimated_tokens} > {max_tokens}), "
-                    "but only Critical (Priority 10) components remain. Cannot truncate further."
-                )
-                break
+        The construct is compiled and its components rendered and tokenized once for the batch;
+        each item only tokenizes its own input, and dropping decisions are made per item.
 
-            # Remove the lowest priority one
-            to_remove = candidates[0]
-            logger.info(
-                f"Token limit exceeded ({estimated_tokens} > {max_tokens}). "
-                f"Dropping component '{to_remove.name}' (Priority: {to_remove.priority})."
+        Args:
+            inputs: The user inputs, one per configuration.
+            variables: Optional variables to render components, shared by all inputs.
+            max_tokens: Maximum allowed estimated tokens per configuration.
+            context: Optional UserContext (though encouraged).
+            optimization: Component selection strategy when over budget, one of OPTIMIZATION_MODES.
+            ordering: Order of the system prompt, one of ORDERING_MODES.
+        """
+        recorder = self._recorder()
+        if recorder is None:
+            return self.compile(ordering).build_many(
+                inputs, variables=variables, max_tokens=max_tokens, context=context, optimization=optimization
             )
-            active_components.remove(to_remove)
-            dropped_components_list.append(to_remove.name)
-
-            if not active_components:
-                break
-
-        # Final Build with active_components
-        sorted_comps = self._sort_components(active_components)
-        system_parts = [c.render(**variables) for c in sorted_comps if c.type != ComponentType.PRIMITIVE]
-        task_part = next((c.render(**variables) for c in sorted_comps if c.type == ComponentType.PRIMITIVE), "")
-        final_user_msg = f"{task_part}\n\nINPUT DATA:\n{user_input}" if task_part else user_input
-
-        # 3. Provenance Capture
-        metadata = {
-            "role": next((c.name for c in active_components if c.type == ComponentType.ROLE), "None"),
-            "mode": next((c.name for c in active_components if c.type == ComponentType.MODE), "None"),
-            "schema": self._response_model.__name__ if self._response_model else "None",
-        }
-
-        if context:
-            metadata["owner_id"] = context.user_id
-
-        return PromptConfiguration(
-            system_message="\n\n".join(system_parts),
-            user_message=final_user_msg,
-            response_model=self._response_model,
-            provenance_metadata=metadata,
-            dropped_components=dropped_components_list,
-        )
+        # The batch is compiled and rendered once, up front; every item reports that shared work
+        with recorder:
+            compiled = self.compile(ordering)
+            batch = compiled.build_many(
+                inputs, variables=variables, max_tokens=max_tokens, context=context, optimization=optimization
+            )
+        return self._timed(batch, recorder, compiled)
+
+    def _timed(
+        self, batch: Iterator[PromptConfiguration], shared: TimingRecorder, compiled: CompiledConstruct
+    ) -> Iterator[PromptConfiguration]:
+        while True:
+            recorder = TimingRecorder()
+            recorder.merge(shared)
+            with recorder:
+                config = next(batch, None)
+            if config is None:
+                return
+            yield self._report(config, recorder, compiled)
@@ -0,0 +1,134 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import importlib
+import json
+import zlib
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+from coreason_construct.schemas.base import PromptComponent
+
+__all__ = [
+    "CLASS_KEY",
+    "WIRE_VERSION",
+    "decode_component",
+    "dumps",
+    "encode_component",
+    "import_path",
+    "loads",
+    "resolve_path",
+]
+
+# Bumped whenever the layout below changes; loads() rejects other versions.
+WIRE_VERSION = 1
+
+# Marks a field holding a class, shipped by import path
+CLASS_KEY = "$class"
+
+
+def import_path(cls: type) -> Optional[str]:
+    """
+    Returns the `module:qualname` path of a class, or None if it cannot be imported by that path
+    (e.g. classes defined inside functions or created dynamically).
+    """
+    path = f"{cls.__module__}:{cls.__qualname__}"
+    if "<locals>" in cls.__qualname__:
+        return None
+    try:
+        resolved = resolve_path(path)
+    except (ImportError, AttributeError):
+        return None
+    return path if resolved is cls else None
+
+
+def resolve_path(path: str) -> Any:
+    """Imports the object at a `module:qualname` path."""
+    module_name, _, qualname = path.partition(":")
+    target: Any = importlib.import_module(module_name)
+    for attribute in qualname.split("."):
+        target = getattr(target, attribute)
+    return target
+
+
+def _component_class(component: PromptComponent) -> Type[PromptComponent]:
+    # The most specific class in the MRO that a worker can import; its fields are the ones shipped.
+    return next(
+        cls for cls in type(component).__mro__ if issubclass(cls, PromptComponent) and import_path(cls) is not None
+    )
+
+
+def encode_component(component: PromptComponent) -> List[Any]:
+    """
+    Encodes a component as `[class path, fields]`.
+
+    Fields are dumped in JSON mode without defaults; class-valued fields (the response model of a
+    StructuredPrimitive) are shipped by import path. Components of classes that cannot be imported
+    are shipped as their nearest importable base class.
+
+    Raises:
+        ValueError: If a class-valued field cannot be imported by path.
+    """
+    cls = _component_class(component)
+    class_fields = {name for name in cls.model_fields if isinstance(getattr(component, name), type)}
+    fields: Dict[str, Any] = component.model_dump(
+        mode="json", include=set(cls.model_fields) - class_fields, exclude_defaults=True
+    )
+    for name in class_fields:
+        value = getattr(component, name)
+        path = import_path(value)
+        if path is None:
+            raise ValueError(
+                f"Cannot serialize component '{component.name}': {name} {value.__qualname__} is not importable"
+            )
+        fields[name] = {CLASS_KEY: path}
+    return [import_path(cls), fields]
+
+
+def _is_class_ref(value: Any) -> bool:
+    return isinstance(value, dict) and value.keys() == {CLASS_KEY}
+
+
+def decode_component(encoded: List[Any]) -> PromptComponent:
+    """
+    Rebuilds a component from `encode_component` output.
+
+    Components are validated directly from their fields, bypassing custom `__init__` methods
+    (e.g. FewShotBank's), since the content they would generate is already included.
+    """
+    path, fields = encoded
+    cls = resolve_path(path)
+    if not (isinstance(cls, type) and issubclass(cls, PromptComponent)):
+        raise ValueError(f"{path} is not a PromptComponent class")
+    values = {k: resolve_path(v[CLASS_KEY]) if _is_class_ref(v) else v for k, v in fields.items()}
+    # Pydantic calls an overridden __init__ from model_validate too; validate onto a bare instance instead.
+    component: PromptComponent = cls.__new__(cls)
+    BaseModel.__init__(component, **values)
+    return component
+
+
+def dumps(payload: Dict[str, Any]) -> bytes:
+    """Serializes a wire payload as compressed JSON."""
+    return zlib.compress(json.dumps({"v": WIRE_VERSION, **payload}, separators=(",", ":")).encode("utf-8"))
+
+
+def loads(data: bytes) -> Dict[str, Any]:
+    """
+    Deserializes a wire payload.
+
+    Raises:
+        ValueError: If the payload was written by another wire version.
+    """
+    payload: Dict[str, Any] = json.loads(zlib.decompress(data))
+    version = payload.pop("v", None)
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported construct wire version {version}, expected {WIRE_VERSION}")
+    return payload
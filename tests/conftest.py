@@ -1,9 +1,65 @@
+from typing import Any, Callable, Iterator, List, Sequence
+
 import pytest
 from coreason_identity.models import UserContext
 
+from coreason_construct.optimization.tokenizers import TOKENIZER_REGISTRY, Tokenizer
+from coreason_construct.schemas.base import PromptComponent
+from coreason_construct.weaver import Weaver
+
+
+class Clock:
+    """A clock for caches with a TTL: returns `now`, which tests advance by hand."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CharTokenizer(Tokenizer):
+    """One token per character, so budgets in tests are exact."""
+
+    def encode(self, text: str) -> List[int]:
+        return [ord(c) for c in text]
+
+    def decode(self, tokens: Sequence[int]) -> str:
+        return "".join(map(chr, tokens))
+
+
+def register_chars() -> None:
+    """Registers CharTokenizer as the "chars" encoding (also a ParallelBuilder initializer)."""
+    TOKENIZER_REGISTRY.register("chars", lambda: CharTokenizer("chars"))
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
+
+
+@pytest.fixture
+def chars() -> Iterator[None]:
+    register_chars()
+    yield
+    TOKENIZER_REGISTRY.unregister("chars")
+
 
 @pytest.fixture
 def mock_context() -> UserContext:
     return UserContext(
         user_id="test-user", email="test@coreason.ai", groups=["tester"], scopes=[], claims={"source": "test"}
     )
+
+
+@pytest.fixture
+def weave(mock_context: UserContext) -> Callable[..., Weaver]:
+    """Returns a factory: `weave(*components, **kwargs)` is a Weaver(**kwargs) with the components added."""
+
+    def factory(*components: PromptComponent, **kwargs: Any) -> Weaver:
+        weaver = Weaver(**kwargs)
+        for component in components:
+            weaver.add(component, context=mock_context)
+        return weaver
+
+    return factory
@@ -0,0 +1,197 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import asyncio
+from typing import Any, Generator, List, Optional
+
+import pytest
+from coreason_identity.models import UserContext
+
+from coreason_construct.async_weaver import AsyncWeaver
+from coreason_construct.build_cache import BuildCache
+from coreason_construct.contexts.registry import CONTEXT_REGISTRY
+from coreason_construct.roles.base import RoleDefinition
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.weaver import Weaver
+
+
+class Loads:
+    """Dynamic contexts loading now, the most loading at once, and the order loads started in."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started: List[str] = []
+        self.cancelled: List[str] = []
+
+
+LOADS = Loads()
+
+
+class SlowContext(PromptComponent):
+    type: ComponentType = ComponentType.CONTEXT
+    dependencies: List[str] = []
+
+    def __init__(self, record_id: str, deps: Optional[List[str]] = None, **data: Any) -> None:
+        super().__init__(
+            name=f"{type(self).__name__}_{record_id}",
+            type=ComponentType.CONTEXT,
+            content=f"{type(self).__name__} record {record_id}.",
+            priority=5,
+            dependencies=deps or [],
+        )
+
+    @classmethod
+    async def aload(cls, **kwargs: Any) -> PromptComponent:
+        LOADS.started.append(cls.__name__)
+        LOADS.in_flight += 1
+        LOADS.max_in_flight = max(LOADS.max_in_flight, LOADS.in_flight)
+        # Let the other loads of the same round start before this one completes
+        for _ in range(5):
+            await asyncio.sleep(0)
+        LOADS.in_flight -= 1
+        return cls(**kwargs)
+
+
+class Labs(SlowContext):
+    pass
+
+
+class Imaging(SlowContext):
+    pass
+
+
+class Notes(SlowContext):
+    def __init__(self, record_id: str, **data: Any) -> None:
+        # Notes depend on another dynamic context, which is only known once they are loaded
+        super().__init__(record_id, deps=["Vitals"])
+
+
+class Vitals(SlowContext):
+    pass
+
+
+class Hanging(SlowContext):
+    @classmethod
+    async def aload(cls, **kwargs: Any) -> PromptComponent:
+        try:
+            await asyncio.Event().wait()
+        finally:
+            LOADS.cancelled.append(cls.__name__)
+        raise AssertionError("unreachable")  # pragma: no cover
+
+
+class Broken(SlowContext):
+    @classmethod
+    async def aload(cls, **kwargs: Any) -> PromptComponent:
+        raise ConnectionError("database unavailable")
+
+
+class NeedsVisit(SlowContext):
+    def __init__(self, visit_id: str, **data: Any) -> None:
+        super().__init__(visit_id)
+
+
+class Allergies(PromptComponent):
+    # Keeps the default aload, which calls the constructor
+    def __init__(self, record_id: str, **data: Any) -> None:
+        super().__init__(
+            name=f"Allergies_{record_id}", type=ComponentType.CONTEXT, content=f"Allergies of {record_id}."
+        )
+
+
+def _role(*dependencies: str) -> RoleDefinition:
+    return RoleDefinition(
+        name="Clinician",
+        title="Clinician",
+        tone="Precise",
+        competencies=["Review"],
+        dependencies=["HIPAA", *dependencies],
+    )
+
+
+@pytest.fixture(autouse=True)
+def registry() -> Generator[None, None, None]:
+    LOADS.reset()
+    for cls in (Labs, Imaging, Notes, Vitals, Hanging, Broken, NeedsVisit, Allergies):
+        CONTEXT_REGISTRY[cls.__name__] = cls
+    yield
+    for cls in (Labs, Imaging, Notes, Vitals, Hanging, Broken, NeedsVisit, Allergies):
+        del CONTEXT_REGISTRY[cls.__name__]
+
+
+@pytest.mark.asyncio
+async def test_dependencies_are_loaded_concurrently(mock_context: UserContext) -> None:
+    role = _role("Labs", "Imaging", "Notes")
+    weaver = AsyncWeaver(context_data={"record_id": "P1"})
+
+    await weaver.aadd(role, context=mock_context)
+
+    # Labs, Imaging and Notes load together, then Vitals (required by Notes): two rounds, not four
+    assert LOADS.max_in_flight == 3
+    assert sorted(LOADS.started[:3]) == ["Imaging", "Labs", "Notes"] and LOADS.started[3:] == ["Vitals"]
+    sync = Weaver(context_data={"record_id": "P1"}).add(role, context=mock_context)
+    assert [c.name for c in weaver.components] == [c.name for c in sync.components]
+    assert "Vitals_P1" in [c.name for c in weaver.components]
+    assert await weaver.abuild("Review.", ordering="cache") == sync.build("Review.", ordering="cache")
+
+
+@pytest.mark.asyncio
+async def test_failed_and_slow_dependencies_are_skipped(mock_context: UserContext) -> None:
+    weaver = AsyncWeaver(context_data={"record_id": "P1"}, dependency_timeout=0.05)
+    invalid = PromptComponent(name="Invalid", type=ComponentType.CONTEXT, content="{{ unclosed")
+
+    # Hanging never loads: the build only completes because its load is cancelled at the timeout
+    role = _role("Hanging", "Broken", "NeedsVisit", "Unknown")
+    await asyncio.wait_for(weaver.acreate_construct("c", [role, invalid], context=mock_context), 5)
+    assert LOADS.cancelled == ["Hanging"]
+
+    assert [c.name for c in weaver.components] == ["Clinician", "HIPAA", "Invalid"]
+    with pytest.raises(ValueError, match="UserContext is required"):
+        await weaver.acreate_construct("c", [], context=None)  # type: ignore[arg-type]
+
+
+@pytest.mark.asyncio
+async def test_default_aload_calls_the_constructor(mock_context: UserContext) -> None:
+    weaver = AsyncWeaver(context_data={"record_id": "P1"})
+    await weaver.aadd(_role("Allergies"), context=mock_context)
+    assert [c.name for c in weaver.components] == ["Clinician", "HIPAA", "Allergies_P1"]
+    assert "Allergies of P1." in (await weaver.abuild("Review.")).system_message
+
+
+@pytest.mark.asyncio
+async def test_aresolve_construct(mock_context: UserContext) -> None:
+    weaver = AsyncWeaver(context_data={"record_id": "P1"})
+    await weaver.aadd(_role(), context=mock_context)
+    await weaver.aadd(_role(), context=mock_context)
+    config = await weaver.aresolve_construct("c", {"user_input": "Review."}, mock_context)
+    assert config.user_message.endswith("Review.")
+    assert config.provenance_metadata["owner_id"] == mock_context.user_id
+
+
+@pytest.mark.asyncio
+async def test_abuild_uses_the_build_cache(mock_context: UserContext) -> None:
+    cache = BuildCache()
+    weaver = AsyncWeaver(context_data={"record_id": "P1"}, build_cache=cache)
+    await weaver.aadd(_role(), context=mock_context)
+    first = await weaver.abuild("Review.", context=mock_context)
+    second = await weaver.abuild("Review.", context=mock_context)
+    assert cache.stats()["hits"] == 1
+    assert second == first == weaver.build("Review.", context=mock_context)
+    assert first.provenance_metadata["owner_id"] == mock_context.user_id
+
+    # Variables without a canonical form bypass the cache
+    await weaver.aadd(PromptComponent(name="Visit", type=ComponentType.CONTEXT, content="Visit {{ visit }}."))
+    config = await weaver.abuild("Review.", {"visit": ("V1",)})
+    assert "Visit ('V1',)." in config.system_message
+    assert cache.stats()["misses"] == 1
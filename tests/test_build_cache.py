@@ -0,0 +1,118 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+from typing import List, Optional
+
+from conftest import Clock
+from coreason_identity.models import UserContext
+
+from coreason_construct.build_cache import BuildCache
+from coreason_construct.roles.library import SafetyScientist
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.weaver import Weaver
+
+STUDY = PromptComponent(name="Study", type=ComponentType.CONTEXT, content="Study {{ study_id }}.", priority=6)
+
+
+def _weaver(mock_context: UserContext, cache: BuildCache, extra: Optional[List[PromptComponent]] = None) -> Weaver:
+    weaver = Weaver(build_cache=cache)
+    for component in [SafetyScientist, STUDY, *(extra or [])]:
+        weaver.add(component, context=mock_context)
+    return weaver
+
+
+def test_hits_are_shared_across_weavers_and_users(mock_context: UserContext) -> None:
+    cache = BuildCache()
+    config = _weaver(mock_context, cache).build("Nausea.", {"study_id": "NCT1"}, context=mock_context)
+    assert cache.stats()["misses"] == 1
+    assert config.provenance_metadata["owner_id"] == mock_context.user_id
+
+    other_user = mock_context.model_copy(update={"user_id": "someone-else"})
+    hit = _weaver(mock_context, cache).build("Nausea.", {"study_id": "NCT1", "unused": object()}, context=other_user)
+    assert cache.stats()["hits"] == 1
+    assert hit.provenance_metadata["owner_id"] == "someone-else"
+    assert config.provenance_metadata["owner_id"] == mock_context.user_id
+    assert hit.system_message == config.system_message
+
+    # Mutating a returned configuration does not alter the cached entry
+    hit.dropped_components.append("Tampered")
+    assert _weaver(mock_context, cache).build("Nausea.", {"study_id": "NCT1"}).dropped_components == []
+    assert "owner_id" not in _weaver(mock_context, cache).build("Nausea.", {"study_id": "NCT1"}).provenance_metadata
+
+
+def test_key_covers_construct_variables_input_and_budget(mock_context: UserContext) -> None:
+    cache = BuildCache()
+    weaver = _weaver(mock_context, cache)
+    weaver.build("Nausea.", {"study_id": "NCT1"})
+    weaver.build("Rash.", {"study_id": "NCT1"})
+    weaver.build("Nausea.", {"study_id": "NCT2"})
+    weaver.build("Nausea.", {"study_id": 1})
+    weaver.build("Nausea.", {"study_id": "NCT1"}, max_tokens=100_000)
+    weaver.build("Nausea.", {"study_id": "NCT1"}, ordering="cache")
+    _weaver(mock_context, cache, [PromptComponent(name="Extra", type=ComponentType.CONTEXT, content="More.")]).build(
+        "Nausea.", {"study_id": "NCT1"}
+    )
+    assert cache.stats()["misses"] == 7
+    assert cache.stats()["hits"] == 0
+
+    weaver.build("Nausea.", {"study_id": ["NCT1", {"arm": "A"}]})
+    weaver.build("Nausea.", {"study_id": ["NCT1", {"arm": "A"}]})
+    assert cache.stats()["hits"] == 1
+
+    # Variables without a canonical form bypass the cache
+    config = weaver.build("Nausea.", {"study_id": ("NCT1",)})
+    assert "('NCT1',)" in config.system_message
+    assert cache.stats()["misses"] == 8
+
+
+def test_resolve_construct_uses_the_cache(mock_context: UserContext) -> None:
+    cache = BuildCache()
+    weaver = _weaver(mock_context, cache)
+    variables = {"user_input": "Nausea.", "study_id": "NCT1"}
+    first = weaver.resolve_construct("c", variables, mock_context)
+    second = weaver.resolve_construct("c", variables, mock_context)
+    assert cache.stats()["hits"] == 1
+    assert second == first
+
+
+def test_lru_ttl_and_memory_cap(mock_context: UserContext, clock: Clock) -> None:
+    cache = BuildCache(maxsize=2, ttl=10.0, clock=clock)
+    compiled = _weaver(mock_context, cache).compile()
+    for user_input in ("a", "b", "a", "c"):
+        cache.build(compiled, user_input, {"study_id": "NCT1"})
+    # "b" was least recently used when "c" was added
+    assert cache.stats()["size"] == 2
+    cache.build(compiled, "b", {"study_id": "NCT1"})
+    assert cache.stats()["misses"] == 4
+
+    clock.now = 10.0
+    cache.build(compiled, "b", {"study_id": "NCT1"})
+    assert cache.stats()["misses"] == 5
+
+    small = BuildCache(max_bytes=3000)
+    small.build(compiled, "a", {"study_id": "NCT1"})
+    small.build(compiled, "b", {"study_id": "NCT1"})
+    assert small.stats()["size"] == 1
+    assert 0 < small.stats()["bytes"] <= 3000
+    small.build(compiled, "x" * 5000, {"study_id": "NCT1"})
+    assert small.stats()["size"] == 1
+
+    # A concurrent miss storing the same key replaces the entry
+    key = small.key(compiled, "a", {"study_id": "NCT1"})
+    assert key is not None
+    config = compiled.build("a", {"study_id": "NCT1"})
+    small._put(key, config)
+    bytes_held = small.stats()["bytes"]
+    small._put(key, config)
+    assert small.stats()["size"] == 1
+    assert small.stats()["bytes"] == bytes_held
+
+    small.clear()
+    assert small.stats() == {"hits": 0, "misses": 0, "size": 0, "maxsize": 1024, "bytes": 0, "max_bytes": 3000}
@@ -0,0 +1,188 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import json
+from typing import Any, AsyncIterator, Dict, Generator, Iterator, List
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
+
+from coreason_construct import server as server_module
+from coreason_construct.compile_pool import CompilePool, PoolSaturatedError
+from coreason_construct.contexts import registry as context_registry
+from coreason_construct.contexts.registry import CONTEXT_REGISTRY
+from coreason_construct.roles.base import RoleDefinition
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.server import BlueprintRequest, ConstructServer, app, get_current_user_context, server
+from coreason_construct.weaver import Weaver
+
+COMPONENTS: List[Dict[str, Any]] = [
+    {"name": "Role", "type": "ROLE", "content": "You review {{ drug }} cases.", "priority": 10},
+    {"name": "Background", "type": "CONTEXT", "content": "Background " * 20, "priority": 1},
+]
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def pool() -> Generator[CompilePool, None, None]:
+    original = server.pool
+    server.pool = CompilePool(max_workers=1)
+    yield server.pool
+    server.pool.close()
+    server.pool = original
+
+
+def _items(count: int) -> List[Dict[str, Any]]:
+    return [
+        {"user_input": f"Case {i}", "variables": {"drug": f"drug-{i}"}, "components": COMPONENTS} for i in range(count)
+    ]
+
+
+def _lines(body: str) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def test_batch_matches_single_compiles(monkeypatch: pytest.MonkeyPatch) -> None:
+    compiles: List[str] = []
+    compile_construct = Weaver.compile
+
+    def counting_compile(self: Weaver, ordering: str = "priority") -> Any:
+        compiles.append(ordering)
+        return compile_construct(self, ordering)
+
+    items = _items(100)
+    items[3]["max_tokens"] = 15
+    singles = [client.post("/v1/compile", json=item).json() for item in items]
+
+    monkeypatch.setattr(Weaver, "compile", counting_compile)
+    response = client.post("/v1/compile:batch", json=items)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert _lines(response.text) == singles
+    assert singles[3]["warnings"] == ["Background"]
+    # One compiled construct serves the whole batch
+    assert len(compiles) <= 1
+
+
+def test_ndjson_stream_with_item_errors() -> None:
+    items = _items(3)
+    items[1] = {**items[1], "variables": {}}
+
+    def body() -> Iterator[bytes]:
+        payload = b"".join(json.dumps(item).encode() + b"\n" for item in items) + b"\n{not json}"
+        # Lines are split across chunks
+        for start in range(0, len(payload), 37):
+            yield payload[start : start + 37]
+
+    response = client.post(
+        "/v1/compile:batch", content=body(), headers={"Content-Type": "application/x-ndjson; charset=utf-8"}
+    )
+    assert response.status_code == 200
+    lines = _lines(response.text)
+    assert len(lines) == 4
+    assert lines[0]["system_prompt"].startswith("You review drug-0 cases.")
+    assert lines[1]["index"] == 1 and lines[1]["status_code"] == 400
+    assert "Missing variable" in lines[1]["detail"]
+    assert lines[2]["system_prompt"].startswith("You review drug-2 cases.")
+    assert lines[3]["index"] == 3 and lines[3]["status_code"] == 422
+
+
+def test_dynamic_dependencies_are_woven_per_item() -> None:
+    role = RoleDefinition(
+        name="Clinician", title="Clinician", tone="Calm", competencies=[], dependencies=["PatientHistory"]
+    )
+    context = get_current_user_context()
+    prompts = [
+        server.handle_shared(
+            BlueprintRequest(user_input="x", variables={"patient_id": patient_id}, components=[role]), context
+        ).system_prompt
+        for patient_id in ("P1", "P2", "P1")
+    ]
+    assert ["Patient History for ID: P1" in prompts[0], "Patient History for ID: P2" in prompts[1]] == [True, True]
+    assert prompts[2] == prompts[0]
+
+
+def test_shared_constructs_are_bounded() -> None:
+    shared = ConstructServer(max_constructs=1)
+    context = get_current_user_context()
+    for content in ("A {{ x.name }}.", "B.", "A {{ x.name }}."):
+        request = BlueprintRequest(
+            user_input="x",
+            variables={"x": {"name": "n"}},
+            components=[PromptComponent(name="R", type=ComponentType.ROLE, content=content)],
+        )
+        assert shared.handle_shared(request, context).system_prompt == content.replace("{{ x.name }}", "n")
+    assert len(shared._constructs) == 1
+
+    # Undefined attributes only fail when rendering
+    request = request.model_copy(update={"variables": {"x": {}}})
+    for handle in (shared.handle_request, shared.handle_shared):
+        with pytest.raises(HTTPException, match="Missing variable in template"):
+            handle(request, context)
+
+
+def test_shared_constructs_follow_the_context_registry(monkeypatch: pytest.MonkeyPatch) -> None:
+    role = RoleDefinition(name="Reviewer", title="Reviewer", tone="Calm", competencies=[], dependencies=["Policy"])
+    request = BlueprintRequest(user_input="x", components=[role])
+    context = get_current_user_context()
+    monkeypatch.setitem(
+        CONTEXT_REGISTRY, "Policy", PromptComponent(name="Policy", type=ComponentType.CONTEXT, content="Old.")
+    )
+    assert "Old." in server.handle_shared(request, context).system_prompt
+
+    CONTEXT_REGISTRY["Policy"] = PromptComponent(name="Policy", type=ComponentType.CONTEXT, content="New.")
+    assert "New." in server.handle_shared(request, context).system_prompt
+
+    # A plain mapping has no version: nothing is shared
+    monkeypatch.setattr(context_registry, "CONTEXT_REGISTRY", dict(CONTEXT_REGISTRY))
+    constructs = len(server._constructs)
+    assert "New." in server.handle_shared(request, context).system_prompt
+    assert len(server._constructs) == constructs
+
+
+def test_saturated_pool(monkeypatch: pytest.MonkeyPatch, pool: CompilePool) -> None:
+    async def saturated(*args: Any) -> Any:
+        raise PoolSaturatedError("Compile pool saturated (1 tasks pending)")
+
+    monkeypatch.setattr(pool, "run", saturated)
+    assert client.post("/v1/compile:batch", json=_items(2)).status_code == 503
+    body = b"".join(json.dumps(item).encode() + b"\n" for item in _items(2))
+    response = client.post("/v1/compile:batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert [(line["index"], line["status_code"]) for line in _lines(response.text)] == [(0, 503), (1, 503)]
+
+
+@pytest.mark.asyncio
+async def test_closing_the_stream_cancels_pending_chunks() -> None:
+    async def items() -> AsyncIterator[Any]:
+        for item in _items(40):
+            yield item
+
+    stream = server_module._stream_batch(items(), get_current_user_context())
+    assert (await stream.__anext__()).count(b"\n") == 1
+    assert (await stream.__anext__()).count(b"\n") == server_module.BATCH_CHUNKSIZE
+    await stream.aclose()
+
+    async def disconnected(message: Any) -> None:
+        raise OSError("connection reset")
+
+    response = server_module._NDJSONResponse(items())
+    with pytest.raises(ClientDisconnect):
+        await response({"type": "http"}, None, disconnected)  # type: ignore[arg-type]
+
+
+def test_invalid_batch_bodies() -> None:
+    assert client.post("/v1/compile:batch", content=b"{oops").status_code == 400
+    response = client.post("/v1/compile:batch", json={"user_input": "x"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Expected a JSON array of blueprint requests"
+    assert client.post("/v1/compile:batch", json=[]).text == ""
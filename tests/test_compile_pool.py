@@ -0,0 +1,181 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Generator
+
+import httpx
+import pytest
+from coreason_identity.models import UserContext
+from fastapi.testclient import TestClient
+
+from coreason_construct import server as server_module
+from coreason_construct.compile_pool import CompilePool, LoopMonitor, PoolSaturatedError
+from coreason_construct.server import BlueprintRequest, CompilationResponse, app, server
+
+PAYLOAD: Dict[str, Any] = {
+    "user_input": "Explain.",
+    "components": [{"name": "Role", "type": "ROLE", "content": "You are {{ tone }}.", "priority": 10}],
+    "variables": {"tone": "terse"},
+}
+
+
+@pytest.fixture
+def pool() -> Generator[CompilePool, None, None]:
+    original = server.pool
+    server.pool = CompilePool(max_workers=1, max_pending=2)
+    server.responses.clear()
+    yield server.pool
+    server.pool.close()
+    server.pool = original
+
+
+async def _wait_for(client: httpx.AsyncClient, key: str, value: int) -> Dict[str, Any]:
+    for _ in range(500):
+        metrics: Dict[str, Any] = (await client.get("/v1/metrics")).json()
+        if metrics["pool"][key] == value:
+            return metrics
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"pool {key} never reached {value}")
+
+
+@pytest.mark.asyncio
+async def test_compiles_run_off_the_event_loop(pool: CompilePool, monkeypatch: pytest.MonkeyPatch) -> None:
+    release = threading.Event()
+    handle_request = server.handle_request
+
+    def slow_handle_request(request: BlueprintRequest, context: UserContext) -> CompilationResponse:
+        assert release.wait(5)
+        return handle_request(request, context)
+
+    monkeypatch.setattr(server, "handle_request", slow_handle_request)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = asyncio.ensure_future(client.post("/v1/compile", json=PAYLOAD))
+        await _wait_for(client, "active", 1)
+        # A different request: identical ones would share the first compile
+        second = asyncio.ensure_future(client.post("/v1/compile", json={**PAYLOAD, "user_input": "Again."}))
+        metrics = await _wait_for(client, "queued", 1)
+        assert metrics["pool"]["workers"] == 1 and metrics["pool"]["kind"] == "thread"
+
+        # The pool is saturated: further requests are rejected instead of queued
+        rejected = await client.post("/v1/compile", json={**PAYLOAD, "user_input": "Rejected."})
+        assert rejected.status_code == 503
+
+        # Small requests are still served while the compiles block the worker
+        started = time.perf_counter()
+        assert (await client.get("/v1/metrics")).status_code == 200
+        assert time.perf_counter() - started < 1.0
+
+        release.set()
+        responses = await asyncio.gather(first, second)
+        assert [response.json()["system_prompt"] for response in responses] == ["You are terse."] * 2
+        metrics = (await client.get("/v1/metrics")).json()
+        assert metrics["pool"]["completed"] == 2 and metrics["pool"]["rejected"] == 1
+        assert metrics["event_loop"]["samples"] >= 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fast_json", [False, True])
+async def test_cached_responses_skip_a_saturated_pool(pool: CompilePool, fast_json: bool) -> None:
+    server.pool = CompilePool(max_workers=1, max_pending=1)
+    server.fast_json = fast_json
+    release = threading.Event()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.post("/v1/compile", json=PAYLOAD)).status_code == 200
+            blocked = asyncio.ensure_future(server.pool.run(release.wait, 5))
+            await _wait_for(client, "active", 1)
+            assert (await client.post("/v1/compile", json=PAYLOAD)).status_code == 200
+            uncached = await client.post("/v1/compile", json={**PAYLOAD, "user_input": "Other."})
+            assert uncached.status_code == 503
+            release.set()
+            assert await blocked
+    finally:
+        server.fast_json = False
+        server.pool.close()
+        server.pool = pool
+
+
+def test_errors_cross_the_pool(pool: CompilePool) -> None:
+    # Entering the client runs the app lifespan, which closes the pool on shutdown
+    with TestClient(app) as client:
+        response = client.post("/v1/compile", json={**PAYLOAD, "variables": {}})
+        assert response.status_code == 400
+        assert "Missing variable" in response.json()["detail"]
+        optimize = {"text": "abc", "limit": 1, "strategy": "prune_middle", "encoding": "x"}
+        response = client.post("/v1/optimize", json=optimize)
+        assert response.status_code == 400
+    assert pool.stats()["completed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_process_pool_runs_picklable_work() -> None:
+    pool = CompilePool(max_workers=1, processes=True)
+    try:
+        assert await asyncio.gather(*(pool.run(pow, 2, n) for n in range(4))) == [1, 2, 4, 8]
+        assert pool.stats() == {
+            "kind": "process",
+            "workers": 1,
+            "active": 0,
+            "queued": 0,
+            "max_pending": None,
+            "completed": 4,
+            "rejected": 0,
+        }
+        # HTTP errors raised in worker processes are returned, since they cannot be pickled
+        context = server_module.get_current_user_context()
+        result = await pool.run(server_module._in_worker, server_module._compile, BlueprintRequest(**PAYLOAD), context)
+        assert isinstance(result, CompilationResponse) and result.system_prompt == "You are terse."
+        request = BlueprintRequest(**{**PAYLOAD, "variables": {}})
+        error = await pool.run(server_module._in_worker, server_module._compile, request, context)
+        assert error == (400, "Missing variable in template: Component 'Role' references undefined variables: ['tone']")
+    finally:
+        pool.close()
+
+
+@pytest.mark.asyncio
+async def test_saturation_and_validation() -> None:
+    with pytest.raises(ValueError, match="max_workers"):
+        CompilePool(max_workers=0)
+    with pytest.raises(ValueError, match="max_pending"):
+        CompilePool(max_pending=0)
+
+    pool = CompilePool(max_workers=1, max_pending=1)
+    release = threading.Event()
+    try:
+        blocked = asyncio.ensure_future(pool.run(release.wait, 5))
+        await asyncio.sleep(0)
+        with pytest.raises(PoolSaturatedError):
+            await pool.run(int, "1")
+        release.set()
+        assert await blocked is True
+        assert await pool.run(int, "1") == 1
+    finally:
+        pool.close()
+
+
+@pytest.mark.asyncio
+async def test_loop_monitor_measures_blocking() -> None:
+    monitor = LoopMonitor(interval=0.01)
+    monitor.ensure_running()
+    try:
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # Blocks the loop
+        await asyncio.sleep(0.05)
+        stats = monitor.stats()
+        assert stats["samples"] > 0
+        assert stats["max_lag_ms"] >= 100
+        assert stats["max_lag_ms"] >= stats["p99_lag_ms"] >= 0
+    finally:
+        monitor.stop()
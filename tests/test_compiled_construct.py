@@ -0,0 +1,157 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Sequence
+
+import pytest
+from coreason_identity.models import UserContext
+
+from coreason_construct import CompiledConstruct
+from coreason_construct.compiled import SYSTEM_SEPARATOR
+from coreason_construct.optimization.ledger import JUNCTION_WINDOW
+from coreason_construct.primitives.extract import ExtractionPrimitive
+from coreason_construct.roles.library import SafetyScientist
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.schemas.clinical import AdverseEvent
+from coreason_construct.weaver import Weaver
+
+
+def _weaver(mock_context: UserContext) -> Weaver:
+    weaver = Weaver()
+    weaver.add(SafetyScientist, context=mock_context)
+    weaver.add(
+        PromptComponent(
+            name="Study", type=ComponentType.CONTEXT, content="Study {{ study_id }} in {{ phase }}.", priority=3
+        )
+    )
+    weaver.add(ExtractionPrimitive(name="Extractor", schema=AdverseEvent))
+    return weaver
+
+
+def test_compiled_build_matches_weaver_build(mock_context: UserContext) -> None:
+    weaver = _weaver(mock_context)
+    compiled = weaver.compile()
+
+    for variables in ({"study_id": "NCT1", "phase": "Phase II"}, {"study_id": "NCT2", "phase": "Phase III"}):
+        for max_tokens in (None, 150, 10):
+            assert compiled.build("Nausea.", variables, max_tokens) == weaver.build("Nausea.", variables, max_tokens)
+
+    config = compiled.build("Nausea.", {"study_id": "NCT1", "phase": "Phase II"}, context=mock_context)
+    assert "Study NCT1 in Phase II." in config.system_message
+    assert config.provenance_metadata["owner_id"] == mock_context.user_id
+    assert config.response_model is AdverseEvent
+    assert compiled.response_model is AdverseEvent
+    assert [c.name for c in compiled.components] == [c.name for c in weaver._sort_components(weaver.components)]
+
+
+def test_compiled_construct_is_immutable_and_detached(mock_context: UserContext) -> None:
+    weaver = _weaver(mock_context)
+    compiled = weaver.compile()
+
+    with pytest.raises(AttributeError, match="immutable"):
+        compiled.response_model = None
+    with pytest.raises(AttributeError, match="immutable"):
+        del compiled.response_model
+
+    weaver.add(PromptComponent(name="Late", type=ComponentType.CONTEXT, content="Added after compile"))
+    config = compiled.build("x", {"study_id": "NCT1", "phase": "I"})
+    assert "Added after compile" not in config.system_message
+    assert "Added after compile" in weaver.build("x", {"study_id": "NCT1", "phase": "I"}).system_message
+
+
+def test_static_components_are_tokenized_once(mock_context: UserContext) -> None:
+    calls: List[str] = []
+
+    class CountingWeaver(Weaver):
+        def _estimate_tokens(self, text: str) -> int:
+            calls.append(text)
+            return super()._estimate_tokens(text)
+
+        def _estimate_tokens_batch(self, texts: Sequence[str]) -> List[int]:
+            calls.extend(texts)
+            return super()._estimate_tokens_batch(texts)
+
+    weaver = CountingWeaver()
+    weaver.add(SafetyScientist, context=mock_context)
+    compiled = weaver.compile()
+    assert calls == []
+
+    # Near the limit, the first exact build tokenizes the static parts once
+    compiled.build("Headache.", max_tokens=150)
+    first_build = len(calls)
+    compiled.build("Headache.", max_tokens=150)
+
+    # Later builds never re-tokenize static parts; only the input and its bounded junctions
+    static_texts = {component.render() for component in compiled.components}
+    assert static_texts <= set(calls[:first_build])
+    second_build = calls[first_build:]
+    assert "Headache." in second_build
+    assert not static_texts.intersection(second_build)
+    assert max(len(text) for text in second_build) <= len(SYSTEM_SEPARATOR) + JUNCTION_WINDOW + len("Headache.")
+
+
+def test_compiled_build_is_thread_safe(mock_context: UserContext) -> None:
+    compiled = _weaver(mock_context).compile()
+    inputs = [(f"Input {i}", {"study_id": f"NCT{i % 7}", "phase": "I"}, 40 + i % 90) for i in range(200)]
+    expected = [compiled.build(*args) for args in inputs]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda args: compiled.build(*args), inputs))
+
+    assert results == expected
+
+
+def test_compiled_construct_validates_optimization_mode() -> None:
+    compiled = CompiledConstruct([], [], None, len)
+    with pytest.raises(ValueError, match="Unknown optimization mode"):
+        compiled.build("x", optimization="fastest")
+    assert compiled.build("x").user_message == "x"
+
+
+def test_build_many_matches_individual_builds(mock_context: UserContext) -> None:
+    weaver = _weaver(mock_context)
+    variables = {"study_id": "NCT1", "phase": "Phase II"}
+    inputs = [f"Case {i}: nausea. " * (1 + i % 30) for i in range(60)]
+
+    for optimization in ("priority", "optimal"):
+        batch = weaver.build_many(inputs, variables, max_tokens=200, context=mock_context, optimization=optimization)
+        assert not isinstance(batch, list)
+        expected = [weaver.build(text, variables, 200, mock_context, optimization) for text in inputs]
+        assert list(batch) == expected
+
+    # Items differ in size, so dropping decisions differ per item
+    assert len({tuple(config.dropped_components) for config in expected}) > 1
+
+
+def test_build_many_validates_mode_eagerly_and_bounds_memo(
+    mock_context: UserContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    compiled = _weaver(mock_context).compile()
+    with pytest.raises(ValueError, match="Unknown optimization mode"):
+        compiled.build_many(["x"], optimization="fastest")
+
+    monkeypatch.setattr("coreason_construct.compiled.WINDOW_MEMO_SIZE", 1)
+    variables = {"study_id": "NCT1", "phase": "I"}
+    inputs = ["short", "another short input"]
+    expected = [compiled.build(text, variables, max_tokens=40) for text in inputs]
+    assert list(compiled.build_many(inputs, variables, max_tokens=40)) == expected
+
+
+def test_build_many_with_variable_primitive() -> None:
+    weaver = Weaver()
+    weaver.add(PromptComponent(name="Rules", type=ComponentType.CONTEXT, content="Follow GxP.", priority=2))
+    weaver.add(PromptComponent(name="Task", type=ComponentType.PRIMITIVE, content="Focus on {{ phase }}.", priority=10))
+    variables = {"phase": "Phase II"}
+
+    configs = list(weaver.build_many(["a", "b" * 200], variables, max_tokens=30))
+    assert configs == [weaver.build(text, variables, 30) for text in ("a", "b" * 200)]
+    assert all(config.user_message.startswith("Focus on Phase II.") for config in configs)
+    assert [config.dropped_components for config in configs] == [[], ["Rules"]]
@@ -0,0 +1,117 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+from typing import Callable
+
+import pytest
+
+from coreason_construct.data.components import DataDictionary, FewShotBank, FewShotExample, NegativeExample
+from coreason_construct.optimization.ledger import TokenLedger
+from coreason_construct.roles.base import RoleDefinition
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.weaver import Weaver
+
+pytestmark = pytest.mark.usefixtures("chars")
+
+ROLE = PromptComponent(name="Role", type=ComponentType.ROLE, content="You are terse.", priority=10)
+
+BANK = FewShotBank(
+    name="Bank", examples=[FewShotExample(input=f"case {i}", output=f"term {i}") for i in range(10)], priority=5
+)
+
+
+def test_shrink_points() -> None:
+    assert [BANK.content[:point].count("Input:") for point in BANK.shrink_points()] == list(range(1, 10))
+
+    negatives = NegativeExample(name="N", examples=["a", "b", "c"])
+    assert [negatives.content[:point] for point in negatives.shrink_points()] == [
+        "NEGATIVE CONSTRAINTS (DO NOT DO THIS):\n- a",
+        "NEGATIVE CONSTRAINTS (DO NOT DO THIS):\n- a\n- b",
+    ]
+
+    terms = DataDictionary(name="D", terms={"AE": "Adverse Event", "SAE": "Serious AE"})
+    assert [terms.content[:point] for point in terms.shrink_points()] == [
+        "DATA DICTIONARY / DEFINITIONS:\nAE: Adverse Event"
+    ]
+
+    context = PromptComponent(name="C", type=ComponentType.CONTEXT, content="One. Two? Three!  ")
+    assert [context.content[:point] for point in context.shrink_points()] == ["One.", "One. Two?"]
+
+    role = RoleDefinition(name="R", title="T", tone="Calm. Kind.", competencies=["X"])
+    assert role.shrink_points() == ()
+
+
+def test_few_shot_bank_keeps_the_examples_that_fit(weave: Callable[..., Weaver]) -> None:
+    weaver = weave(ROLE, BANK, encoding="chars")
+    full = weaver.build("x")
+    limit = len(full.system_message) + len(full.user_message) - 200
+
+    config = weaver.build("x", max_tokens=limit)
+    assert config.dropped_components == []
+    assert config.shrunk_components == ["Bank"]
+    assert len(config.system_message) + len(config.user_message) <= limit
+    kept = config.system_message.count("Input:")
+    assert 1 <= kept < 10
+    # The longest prefix that fits was kept
+    assert (
+        len(config.system_message) + len(config.user_message) + len("\n\nInput: case 9\nIdeal Output: term 9") > limit
+    )
+    assert config.system_message.endswith(f"Ideal Output: term {kept - 1}")
+    assert config.system_segments[-1].text.endswith(f"term {kept - 1}")
+
+    # When not even one example fits, the whole bank is dropped
+    tiny = weaver.build("x", max_tokens=len(ROLE.content) + 10)
+    assert tiny.dropped_components == ["Bank"]
+    assert tiny.shrunk_components == []
+
+
+def test_shrinking_follows_priority_order(weave: Callable[..., Weaver]) -> None:
+    context = PromptComponent(
+        name="Background", type=ComponentType.CONTEXT, content="First fact. Second fact. Third fact.", priority=2
+    )
+    weaver = weave(ROLE, BANK, context, encoding="chars")
+    full = weaver.build("x")
+    limit = len(full.system_message) + len(full.user_message) - len(" Third fact.")
+
+    # The lower priority context is truncated at a sentence boundary; the bank is untouched
+    config = weaver.build("x", max_tokens=limit)
+    assert config.shrunk_components == ["Background"]
+    assert "First fact. Second fact." in config.system_message
+    assert "Third fact." not in config.system_message
+    assert config.system_message.count("Input:") == 10
+
+    # A larger overflow drops the context and then shrinks the bank
+    config = weaver.build("x", max_tokens=limit - 100)
+    assert config.dropped_components == ["Background"]
+    assert config.shrunk_components == ["Bank"]
+
+
+def test_build_many_matches_build(weave: Callable[..., Weaver]) -> None:
+    weaver = weave(ROLE, BANK, NegativeExample(name="N", examples=["a", "b", "c"], priority=3), encoding="chars")
+    full = weaver.build("x")
+    limit = len(full.system_message) + len(full.user_message) + 50
+    inputs = ["x", "y" * 60, "z" * 200, "w" * 500, "x"]
+    batch = list(weaver.build_many(inputs, max_tokens=limit))
+    assert batch == [weaver.build(text, max_tokens=limit) for text in inputs]
+    assert [config.shrunk_components for config in batch] == [[], [], ["Bank"], [], []]
+    assert [config.dropped_components for config in batch] == [[], ["N"], ["N"], ["N", "Bank"], []]
+
+
+def test_ledger_replace() -> None:
+    parts = ["alpha beta", "gamma delta", "epsilon"]
+    shared = {}
+    ledger = TokenLedger(len, parts, " | ", junction_cache=shared)
+    ledger.set_tail("tail", 4)
+    ledger.replace(1, "gamma", 5)
+    assert ledger.total == len("alpha beta | gamma | epsilon") + 4
+    ledger.replace(2, "eps", 3)
+    ledger.drop(1)
+    assert ledger.total == len("alpha beta | eps") + 4
+    assert shared == {(0, 1): 3, (1, 2): 3}
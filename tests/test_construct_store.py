@@ -0,0 +1,195 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import pickle
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Generator, List
+
+import pytest
+from coreason_identity.models import UserContext
+from fastapi.testclient import TestClient
+
+from coreason_construct import compiled as compiled_module
+from coreason_construct import server as server_module
+from coreason_construct.compile_pool import CompilePool
+from coreason_construct.construct_store import ConstructStore
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.server import ConstructServer, app, get_current_user_context, server
+from coreason_construct.weaver import Weaver
+
+COMPONENTS: List[Dict[str, Any]] = [
+    {"name": "Role", "type": "ROLE", "content": "You review {{ drug }} cases.", "priority": 10},
+    {"name": "Background", "type": "CONTEXT", "content": "Background " * 20, "priority": 1},
+]
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> Generator[ConstructStore, None, None]:
+    original = server.store
+    server.store = ConstructStore(str(tmp_path / "constructs.db"), maxsize=1)
+    yield server.store
+    server.store.close()
+    server.store = original
+
+
+def _compile(content: str) -> Any:
+    weaver = Weaver()
+    weaver.add(PromptComponent(name="R", type=ComponentType.ROLE, content=content))
+    return weaver.compile()
+
+
+def test_register_and_compile_by_id(store: ConstructStore) -> None:
+    registered = client.post("/v1/constructs", json={"components": COMPONENTS})
+    assert registered.status_code == 200
+    construct_id = registered.json()["construct_id"]
+    assert len(construct_id) == 32 and len(registered.json()["fingerprint"]) == 64
+    # Registering the same construct again returns the same id
+    assert client.post("/v1/constructs", json={"components": COMPONENTS}).json()["construct_id"] == construct_id
+
+    body = {"user_input": "Case 1", "variables": {"drug": "aspirin"}, "max_tokens": 15}
+    response = client.post(f"/v1/constructs/{construct_id}/compile", json=body)
+    inline = client.post("/v1/compile", json={**body, "components": COMPONENTS})
+    assert response.status_code == 200
+    assert response.json() == inline.json()
+    assert response.json()["warnings"] == ["Background"]
+
+    missing = client.post(f"/v1/constructs/{construct_id}/compile", json={"user_input": "x"})
+    assert missing.status_code == 400 and "Missing variable" in missing.json()["detail"]
+    unknown = client.post("/v1/constructs/nope/compile", json={"user_input": "x"})
+    assert unknown.status_code == 404
+
+    metrics = client.get("/v1/metrics").json()["constructs"]
+    assert metrics == {"hits": 2, "misses": 1, "size": 1, "maxsize": 1, "registered": 1}
+
+
+def _other_user() -> UserContext:
+    return get_current_user_context().model_copy(update={"user_id": "other-user"})
+
+
+def test_constructs_belong_to_their_owner(store: ConstructStore) -> None:
+    construct_id = client.post("/v1/constructs", json={"components": COMPONENTS}).json()["construct_id"]
+    body = {"user_input": "Case", "variables": {"drug": "aspirin"}}
+
+    app.dependency_overrides[get_current_user_context] = _other_user
+    try:
+        assert client.post(f"/v1/constructs/{construct_id}/compile", json=body).status_code == 404
+        assert client.delete(f"/v1/constructs/{construct_id}").status_code == 404
+        # The same components registered by another user get their own id
+        other_id = client.post("/v1/constructs", json={"components": COMPONENTS}).json()["construct_id"]
+        assert other_id != construct_id
+    finally:
+        app.dependency_overrides.clear()
+
+    assert client.post(f"/v1/constructs/{construct_id}/compile", json=body).status_code == 200
+    assert client.delete(f"/v1/constructs/{construct_id}").status_code == 204
+    assert client.post(f"/v1/constructs/{construct_id}/compile", json=body).status_code == 404
+    assert client.delete(f"/v1/constructs/{construct_id}").status_code == 404
+    assert len(store) == 1
+
+
+def test_worker_processes_use_the_store_of_the_server(store: ConstructStore) -> None:
+    original = server.pool
+    server.pool = CompilePool(max_workers=2, processes=True)
+    try:
+        construct_id = client.post("/v1/constructs", json={"components": COMPONENTS}).json()["construct_id"]
+        body = {"user_input": "Case", "variables": {"drug": "aspirin"}}
+        responses = [client.post(f"/v1/constructs/{construct_id}/compile", json=body) for _ in range(6)]
+        assert [response.status_code for response in responses] == [200] * 6
+        assert responses[0].json()["system_prompt"].startswith("You review aspirin cases.")
+        assert client.get("/v1/metrics").json()["constructs"]["registered"] == 1
+    finally:
+        server.pool.close()
+        server.pool = original
+
+
+def test_constructs_survive_restarts(tmp_path: Path) -> None:
+    database = str(tmp_path / "constructs.db")
+    store = ConstructStore(database, maxsize=1)
+    first, second = _compile("First {{ x }}."), _compile("Second.")
+    first_id, second_id = store.register(first, "alice"), store.register(second, "alice")
+    # Evicted from memory, reloaded from the database
+    reloaded = store.get(first_id, "alice")
+    assert reloaded is not None and reloaded is not first
+    assert reloaded.fingerprint == first.fingerprint
+    assert store.stats() == {"hits": 0, "misses": 1, "size": 1, "maxsize": 1, "registered": 2}
+    store.close()
+
+    restarted = ConstructServer(store=ConstructStore(database))
+    try:
+        assert len(restarted.store) == 2
+        compiled = restarted.store.get(second_id, "alice")
+        assert compiled is not None and compiled.build("input").system_message == "Second."
+        assert restarted.store.get(second_id, "bob") is None
+        first = restarted.store.get(first_id, "alice")
+        assert first is not None
+        request = server_module.ConstructCompileRequest(user_input="y", variables={"x": 1})
+        context = server_module.get_current_user_context()
+        assert restarted.handle_registered(first, request, context).system_prompt == "First 1."
+        assert restarted.store.get("unknown", "alice") is None
+    finally:
+        restarted.store.close()
+        restarted.pool.close()
+
+
+def test_store_from_env(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("COREASON_CONSTRUCT_DB", str(tmp_path / "env.db"))
+    monkeypatch.setenv("COREASON_CONSTRUCT_CACHE_SIZE", "4")
+    store = server_module.construct_store_from_env()
+    try:
+        assert store.maxsize == 4
+        assert store.persistent
+        store.register(_compile("Env."), "alice")
+    finally:
+        store.close()
+    assert (tmp_path / "env.db").exists()
+
+
+def test_deletes_by_other_processes_are_seen_once_evicted(tmp_path: Path) -> None:
+    database = str(tmp_path / "shared.db")
+    first, second = ConstructStore(database), ConstructStore(database, maxsize=1)
+    try:
+        construct_id = first.register(_compile("Shared."), "alice")
+        assert second.get(construct_id, "alice") is not None
+        assert not second.delete(construct_id, "bob")
+        assert first.delete(construct_id, "alice")
+        assert first.get(construct_id, "alice") is None
+        # Served from memory without querying the database
+        assert second.get(construct_id, "alice") is not None
+        second.register(_compile("Other."), "alice")
+        assert second.get(construct_id, "alice") is None
+        assert not ConstructStore().persistent
+    finally:
+        first.close()
+        second.close()
+
+
+def test_constructs_pickle_in_wire_format() -> None:
+    compiled = _compile("Pickled {{ x }}.")
+    data = pickle.dumps(compiled)
+    loaded = pickle.loads(data)
+    assert loaded is not compiled and loaded.fingerprint == compiled.fingerprint
+    # Unpickled once per process
+    assert pickle.loads(data) is loaded
+    assert loaded.build("i", {"x": 2}).system_message == "Pickled 2."
+
+
+def test_unpickled_constructs_are_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(compiled_module, "UNPICKLED_CONSTRUCTS", 1)
+    monkeypatch.setattr(compiled_module, "_unpickled", OrderedDict())
+    first, second = pickle.dumps(_compile("First.")), pickle.dumps(_compile("Second."))
+    loaded = pickle.loads(first)
+    assert pickle.loads(first) is loaded
+    # Loading the second construct evicts the first, which is then loaded again
+    assert pickle.loads(second) is pickle.loads(second)
+    assert list(compiled_module._unpickled) == [pickle.loads(second).fingerprint]
+    assert pickle.loads(first) is not loaded
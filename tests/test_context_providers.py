@@ -0,0 +1,192 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional, Sequence
+
+import pytest
+from conftest import Clock
+from coreason_identity.models import UserContext
+
+from coreason_construct.async_weaver import AsyncWeaver
+from coreason_construct.contexts import library
+from coreason_construct.contexts.library import PatientHistory, StudyProtocol
+from coreason_construct.contexts.providers import CONTEXT_PROVIDERS, ContextProvider, SQLiteContextProvider
+from coreason_construct.weaver import Weaver
+
+
+class DictProvider(ContextProvider):
+    def __init__(self, data: Dict[str, str], gate: Optional[threading.Event] = None, **options: Any) -> None:
+        super().__init__(**options)
+        self.data = data
+        self.gate = gate
+        self.calls: List[List[str]] = []
+
+    def load_many(self, ids: Sequence[str]) -> Dict[str, str]:
+        self.calls.append(list(ids))
+        if self.gate is not None:
+            assert self.gate.wait(5)
+        if "boom" in ids:
+            raise ConnectionError("database unavailable")
+        return {record_id: self.data[record_id] for record_id in ids if record_id in self.data}
+
+
+@pytest.fixture
+def database(tmp_path: Path) -> Generator[str, None, None]:
+    path = str(tmp_path / "contexts.db")
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE histories (patient_id TEXT PRIMARY KEY, summary TEXT)")
+        connection.executemany(
+            "INSERT INTO histories VALUES (?, ?)", [(f"P{i}", f"History of patient {i}.") for i in range(5000)]
+        )
+    connection.close()
+    yield path
+
+
+@pytest.fixture
+def providers() -> Generator[Dict[str, ContextProvider], None, None]:
+    yield CONTEXT_PROVIDERS
+    CONTEXT_PROVIDERS.clear()
+
+
+def test_sqlite_prefetch_loads_a_cohort_in_batches(database: str) -> None:
+    provider = SQLiteContextProvider(database, "histories", "patient_id", "summary", batch_size=1000)
+    cohort = [f"P{i}" for i in range(5000)]
+
+    assert provider.prefetch(cohort + ["P0", "missing"]) == 5001
+    assert provider.stats()["loads"] == 6
+    assert provider.get("P4999") == "History of patient 4999."
+    assert provider.get("missing") is None
+    assert provider.prefetch(cohort) == 0
+    assert provider.stats() == {"hits": 2, "misses": 0, "loads": 6, "size": 5001, "maxsize": 10_000}
+
+    with pytest.raises(ValueError, match="Invalid SQL identifier"):
+        SQLiteContextProvider(database, "histories; DROP TABLE histories")
+    provider.clear()
+    assert provider.stats()["size"] == 0
+    provider.close()
+
+
+def test_ttl_and_lru_eviction(clock: Clock) -> None:
+    provider = DictProvider({"a": "A", "b": "B", "c": "C"}, maxsize=2, ttl=10.0, clock=clock)
+    for record_id in ("a", "b", "a", "c", "a", "b"):
+        provider.get(record_id)
+    # "b" was least recently used when "c" was loaded
+    assert provider.calls == [["a"], ["b"], ["c"], ["b"]]
+
+    clock.now = 10.0
+    assert provider.get("a") == "A"
+    assert provider.calls[-1] == ["a"]
+
+
+def test_concurrent_requests_are_coalesced() -> None:
+    gate = threading.Event()
+    provider = DictProvider({"P1": "history"}, gate=gate)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(provider.get, "P1") for _ in range(8)]
+        while provider.stats()["hits"] + provider.stats()["misses"] < 8:
+            time.sleep(0.001)
+        gate.set()
+        assert [future.result() for future in futures] == ["history"] * 8
+    assert provider.calls == [["P1"]]
+    assert provider.stats()["misses"] == 1
+
+
+def test_load_failures_reach_every_waiter() -> None:
+    gate = threading.Event()
+    provider = DictProvider({"P1": "history"}, gate=gate, batch_size=1)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        prefetch = pool.submit(provider.prefetch, ["boom", "P1"])
+        while not provider.calls:
+            time.sleep(0.001)
+        # "P1" is queued behind the failing batch; the waiter is released with the error
+        waiter = pool.submit(provider.get, "P1")
+        while provider.stats()["hits"] < 1:
+            time.sleep(0.001)
+        gate.set()
+        with pytest.raises(ConnectionError):
+            prefetch.result()
+        with pytest.raises(ConnectionError):
+            waiter.result()
+
+    # Failures are not cached
+    assert provider.get("P1") == "history"
+    with pytest.raises(ConnectionError):
+        provider.get("boom")
+
+
+def test_dynamic_contexts_read_their_provider(
+    database: str, providers: Dict[str, ContextProvider], mock_context: UserContext
+) -> None:
+    providers["PatientHistory"] = SQLiteContextProvider(database, "histories", "patient_id", "summary")
+    providers["StudyProtocol"] = DictProvider({"NCT1": "Arm A: placebo."})
+
+    weaver = Weaver(context_data={"patient_id": "P7", "nct_id": "NCT1"})
+    weaver.add(PatientHistory(patient_id="P7"), context=mock_context)
+    weaver.add(StudyProtocol(nct_id="NCT1"), context=mock_context)
+    system_message = weaver.build("x").system_message
+    assert "Patient History for ID: P7.\nHistory of patient 7." in system_message
+    assert "Study Protocol for NCT ID: NCT1.\nArm A: placebo." in system_message
+
+    # Unknown ids fall back to the stub content
+    missing = PatientHistory(patient_id="unknown")
+    assert missing.fetch() == missing.content
+
+    # A provided context must say which record it holds
+    class Unkeyed(library._ProvidedContext):
+        family = "Unkeyed"
+
+    with pytest.raises(TypeError, match="abstract"):
+        Unkeyed(name="Unkeyed", content="stub")  # type: ignore[abstract]
+
+
+def test_a_build_prefetches_each_provider_once(
+    providers: Dict[str, ContextProvider], mock_context: UserContext
+) -> None:
+    histories = providers["PatientHistory"] = DictProvider({f"P{i}": f"History {i}." for i in range(3)})
+    protocols = providers["StudyProtocol"] = DictProvider({"NCT1": "Arm A: placebo."})
+
+    weaver = Weaver()
+    for component in (*(PatientHistory(patient_id=f"P{i}") for i in range(4)), StudyProtocol(nct_id="NCT1")):
+        weaver.add(component, context=mock_context)
+    system_message = weaver.build("x").system_message
+    assert histories.calls == [["P0", "P1", "P2", "P3"]]
+    assert protocols.calls == [["NCT1"]]
+    assert all(f"History {i}." in system_message for i in range(3))
+    # P3 is not in the provider: its stub is kept
+    assert PatientHistory(patient_id="P3").content in system_message
+
+
+@pytest.mark.asyncio
+async def test_provider_failures_skip_their_contexts(
+    providers: Dict[str, ContextProvider], mock_context: UserContext
+) -> None:
+    providers["PatientHistory"] = DictProvider({"P1": "History 1."})
+    providers["StudyProtocol"] = DictProvider({"NCT1": "Arm A: placebo."})
+
+    weaver = AsyncWeaver()
+    for component in (
+        PatientHistory(patient_id="P1", size_hint=5),
+        PatientHistory(patient_id="boom", size_hint=5),
+        StudyProtocol(nct_id="NCT1", size_hint=5),
+    ):
+        weaver.add(component, context=mock_context)
+    # Tight budgets are decided by exact counts, which leave the failed context out
+    exact = [weaver.build("x", max_tokens=40, optimization=mode) for mode in ("priority", "optimal")]
+    assert {config.provenance_metadata["token_estimation"] for config in exact} == {"exact"}
+    for config in (weaver.build("x"), await weaver.abuild("x"), *exact):
+        # P1 was loaded in the same failed batch as "boom"
+        assert "History 1." not in config.system_message and "boom" not in config.system_message
+        assert "Arm A: placebo." in config.system_message
+        assert config.dropped_components == []
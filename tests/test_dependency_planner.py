@@ -0,0 +1,189 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+from typing import Any, Generator, List
+
+import pytest
+from coreason_identity.models import UserContext
+
+from coreason_construct.contexts.library import ContextLibrary, HIPAA_Context, PatientHistory
+from coreason_construct.contexts.planner import DEPENDENCY_PLANNER, DependencyPlanner, StepKind
+from coreason_construct.contexts.registry import CONTEXT_REGISTRY
+from coreason_construct.roles.library import MedicalDirector, RoleLibrary, SafetyScientist
+from coreason_construct.roles.registry import ROLE_REGISTRY
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.utils.registry import VersionedRegistry
+from coreason_construct.weaver import Weaver
+
+
+class Linked(PromptComponent):
+    dependencies: List[str] = []
+
+    def __init__(self, name: str, dependencies: List[str]) -> None:
+        super().__init__(name=name, type=ComponentType.CONTEXT, content=f"Content for {name}")
+        self.dependencies = dependencies
+
+
+@pytest.fixture
+def registry_cleanup() -> Generator[None, None, None]:
+    """Saves and restores the registry state."""
+    original = dict(CONTEXT_REGISTRY)
+    yield
+    CONTEXT_REGISTRY.clear()
+    CONTEXT_REGISTRY.update(original)
+
+
+def test_plan_is_cached_per_registry_version(registry_cleanup: Any, mock_context: UserContext) -> None:
+    plan = DEPENDENCY_PLANNER.plan(SafetyScientist.dependencies)
+
+    assert [(s.name, s.kind) for s in plan.steps] == [("HIPAA", StepKind.STATIC), ("GxP", StepKind.STATIC)]
+    assert plan.order == ("HIPAA", "GxP")
+    assert DEPENDENCY_PLANNER.plan(SafetyScientist.dependencies) is plan
+
+    # Direct mutation and library registration both produce a fresh plan
+    CONTEXT_REGISTRY["Unrelated"] = HIPAA_Context
+    replanned = DEPENDENCY_PLANNER.plan(SafetyScientist.dependencies)
+    assert replanned is not plan
+    ContextLibrary.register_context("Other", HIPAA_Context, context=mock_context)
+    assert DEPENDENCY_PLANNER.plan(SafetyScientist.dependencies) is not replanned
+
+
+def test_plan_unversioned_registry_is_not_cached() -> None:
+    registry = {"HIPAA": HIPAA_Context}
+    first = DependencyPlanner().plan(["HIPAA", "Missing"], registry)
+    assert [(s.name, s.kind) for s in first.steps] == [("HIPAA", StepKind.STATIC), ("Missing", StepKind.MISSING)]
+    assert DependencyPlanner().plan(["HIPAA"], registry) is not DependencyPlanner().plan(["HIPAA"], registry)
+
+
+def test_plan_cache_is_bounded() -> None:
+    planner = DependencyPlanner(maxsize=1)
+    first = planner.plan(["HIPAA"])
+    planner.plan(["GxP"])
+    assert planner.plan(["HIPAA"]) is not first
+
+
+def test_plan_detects_cycles_and_subtrees() -> None:
+    registry = VersionedRegistry(
+        {
+            "X": Linked("X", ["Y", "Z"]),
+            "Y": Linked("Y", ["X"]),
+            "Z": Linked("Z", []),
+            "Dyn": PatientHistory,
+        }
+    )
+    plan = DependencyPlanner().plan(["X", "Dyn", "Z"], registry)
+
+    assert [(s.name, s.parent, s.kind, s.end) for s in plan.steps] == [
+        ("X", None, StepKind.STATIC, 4),
+        ("Y", "X", StepKind.STATIC, 3),
+        ("X", "Y", StepKind.REPEAT, 3),
+        ("Z", "X", StepKind.STATIC, 4),
+        ("Dyn", None, StepKind.DYNAMIC, 5),
+        ("Z", None, StepKind.REPEAT, 6),
+    ]
+    assert plan.cycles == (("Y", "X"),)
+    assert plan.order == ("Y", "Z", "X")
+
+
+def test_init_parameters_cached_and_invalidated(mock_context: UserContext) -> None:
+    planner = DependencyPlanner()
+    params = planner.init_parameters(PatientHistory)
+
+    assert [(p.name, p.required) for p in params] == [
+        ("patient_id", True),
+        ("priority", False),
+        ("size_hint", False),
+        ("data", False),
+    ]
+    assert planner.init_parameters(PatientHistory) is params
+
+    planner.invalidate()
+    assert planner.init_parameters(PatientHistory) is not params
+
+
+def test_register_role_invalidates_planner(mock_context: UserContext) -> None:
+    plan = DEPENDENCY_PLANNER.plan(MedicalDirector.dependencies)
+    RoleLibrary.register_role("PlannerRole", MedicalDirector, context=mock_context)
+    del ROLE_REGISTRY["PlannerRole"]
+    assert DEPENDENCY_PLANNER.plan(MedicalDirector.dependencies) is not plan
+
+
+def test_deep_dependency_chain_is_iterative(registry_cleanup: Any, mock_context: UserContext) -> None:
+    depth = 5_000
+    for i in range(depth):
+        CONTEXT_REGISTRY[f"Node{i}"] = Linked(f"Node{i}", [f"Node{i + 1}"] if i + 1 < depth else [])
+
+    weaver = Weaver()
+    weaver.add(Linked("Root", ["Node0"]), context=mock_context)
+
+    assert len(weaver.components) == depth + 1
+    assert weaver.components[-1].name == f"Node{depth - 1}"
+
+
+def test_repeat_of_skipped_subtree_is_planned_on_its_own(registry_cleanup: Any, mock_context: UserContext) -> None:
+    """
+    X (already present) hides its sub-tree, so a later reference to E must still resolve E,
+    exactly as the recursive resolution did.
+    """
+    CONTEXT_REGISTRY["X"] = Linked("X", ["E"])
+    weaver = Weaver()
+    weaver.add(CONTEXT_REGISTRY["X"], context=mock_context)  # type: ignore[arg-type]
+    assert [c.name for c in weaver.components] == ["X"]
+
+    CONTEXT_REGISTRY["E"] = Linked("E", [])
+    weaver.add(Linked("Root", ["X", "E"]), context=mock_context)
+
+    assert [c.name for c in weaver.components] == ["X", "Root", "E"]
+
+
+def test_dependencies_are_fetched_through_the_context_library(
+    registry_cleanup: Any, mock_context: UserContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    requested: List[str] = []
+    get_context = ContextLibrary.get_context
+    substitute = Linked("Substitute", ["E"])
+    CONTEXT_REGISTRY["E"] = Linked("E", [])
+    CONTEXT_REGISTRY["NotAComponent"] = "just a string"  # type: ignore[assignment]
+
+    # An access check that denies GxP and hands out a substitute for X
+    def checked(name: str, context: UserContext) -> Any:
+        requested.append(name)
+        if name == "GxP":
+            return None
+        return substitute if name == "X" else get_context(name, context)
+
+    monkeypatch.setattr(ContextLibrary, "get_context", staticmethod(checked))
+    CONTEXT_REGISTRY["X"] = Linked("X", ["Unused"])
+    weaver = Weaver(context_data={"patient_id": "P1"})
+    weaver.add(Linked("Root", ["HIPAA", "GxP", "X", "PatientHistory", "NotAComponent"]), context=mock_context)
+
+    assert requested == ["HIPAA", "GxP", "X", "E", "PatientHistory", "NotAComponent"]
+    assert [c.name for c in weaver.components] == ["Root", "HIPAA", "Substitute", "E", "PatientHistory_P1"]
+
+    with pytest.raises(ValueError, match="UserContext is required to resolve dependency 'HIPAA'"):
+        Weaver().add(Linked("Other", ["HIPAA"]))
+
+
+def test_versioned_registry_bumps_on_every_mutation() -> None:
+    registry: VersionedRegistry[str, int] = VersionedRegistry()
+    operations = [
+        lambda: registry.__setitem__("a", 1),
+        lambda: registry.update(b=2),
+        lambda: registry.setdefault("c", 3),
+        lambda: registry.pop("c"),
+        lambda: registry.popitem(),
+        lambda: registry.__ior__({"d": 4}),
+        lambda: registry.__delitem__("d"),
+        lambda: registry.clear(),
+    ]
+    for expected, operation in enumerate(operations, start=1):
+        operation()
+        assert registry.version == expected
+    assert registry == {}
@@ -45,6 +45,7 @@ def test_dynamic_dependency_injection(mock_context: UserContext) -> None:
 
     assert patient_history is not None, "PatientHistory should be injected"
     assert "P12345" in patient_history.content
+    assert weaver.dynamic_names == {"PatientHistory_P12345"}
 
 
 def test_dynamic_dependency_missing_data(mock_context: UserContext) -> None:
@@ -116,9 +117,11 @@ def test_dynamic_dependency_instantiation_failure(capsys: CaptureFixture[Any], m
     # 2. Setup logger capture
     handler_id = logger.add(sys.stderr, level="ERROR")
 
-    # 3. Call _resolve_dependency directly
+    # 3. Add a component depending on it
     weaver = Weaver()
-    result = weaver._resolve_dependency("BrokenComp", context=mock_context)
+    role = RoleDefinition(name="Doctor", title="Doctor", tone="Calm", competencies=[], dependencies=["BrokenComp"])
+    weaver.add(role, context=mock_context)
+    result = next((c for c in weaver.components if c.name != "Doctor"), None)
 
     # 4. Cleanup
     del CONTEXT_REGISTRY["BrokenComp"]
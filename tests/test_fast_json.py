@@ -0,0 +1,109 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import json
+from typing import Any, Dict, Generator
+
+import pytest
+from coreason_identity.models import UserContext
+from fastapi import HTTPException, Request
+from fastapi.testclient import TestClient
+
+from coreason_construct import server as server_module
+from coreason_construct.response_cache import ResponseCache
+from coreason_construct.server import ConstructServer, app, get_current_user_context, server
+
+PAYLOAD: Dict[str, Any] = {
+    "user_input": "Classify.",
+    "components": [
+        {"name": "Role", "type": "ROLE", "content": "You triage {{ drug }} reports. Ünïcode ✓", "priority": 10},
+        {"name": "Examples", "type": "CONTEXT", "content": "Example case. " * 50, "priority": 2},
+    ],
+    "variables": {"drug": "ibuprofen"},
+    "max_tokens": 20,
+}
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def fast_json() -> Generator[None, None, None]:
+    responses = server.responses
+    # No cached responses, so both paths compile
+    server.responses = ResponseCache(maxsize=0)
+    yield
+    server.fast_json = False
+    server.responses = responses
+
+
+def _both(body: Any, **kwargs: Any) -> Any:
+    server.fast_json = False
+    default = client.post("/v1/compile", json=body, **kwargs)
+    server.fast_json = True
+    fast = client.post("/v1/compile", json=body, **kwargs)
+    return default, fast
+
+
+def test_fast_path_matches_default_path(fast_json: None) -> None:
+    default, fast = _both(PAYLOAD)
+    assert fast.status_code == default.status_code == 200
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.json() == default.json()
+    assert fast.json()["warnings"] == ["Examples"]
+
+    # Template errors and invalid bodies
+    default, fast = _both({**PAYLOAD, "variables": {}})
+    assert fast.status_code == default.status_code == 400
+    assert fast.json() == default.json()
+    default, fast = _both({**PAYLOAD, "optimization": "fastest", "components": [{"name": "x"}]})
+    assert fast.status_code == default.status_code == 422
+    assert fast.json() == default.json()
+    fast = client.post("/v1/compile", content=b'{"user_input": ', headers={"Content-Type": "application/json"})
+    assert fast.status_code == 422
+    assert fast.json()["detail"][0]["type"] == "json_invalid"
+
+
+def test_fast_path_resolves_the_identity(fast_json: None) -> None:
+    seen = []
+
+    # An override with dependencies of its own, resolved by FastAPI on both paths
+    def other_user(request: Request) -> UserContext:
+        if "x-user" not in request.headers:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        context = get_current_user_context().model_copy(update={"user_id": request.headers["x-user"]})
+        seen.append(context.user_id)
+        return context
+
+    app.dependency_overrides[get_current_user_context] = other_user
+    try:
+        default, fast = _both(PAYLOAD, headers={"X-User": "override"})
+        unauthenticated = _both(PAYLOAD)
+    finally:
+        app.dependency_overrides.clear()
+    assert fast.json() == default.json()
+    assert seen == ["override", "override"]
+    assert [response.status_code for response in unauthenticated] == [401, 401]
+    assert unauthenticated[0].json() == unauthenticated[1].json()
+
+
+def test_fast_json_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("COREASON_FAST_JSON", "true")
+    enabled = ConstructServer()
+    assert enabled.fast_json and not ConstructServer(fast_json=False).fast_json
+    enabled.pool.close()
+    # Only /v1/compile has a fast handler
+    assert list(server_module._FAST_HANDLERS) == [server_module.compile_blueprint]
+    server.fast_json = True
+    try:
+        response = client.post("/v1/optimize", json={"text": "abc", "limit": 1, "strategy": "none"})
+    finally:
+        server.fast_json = False
+    assert response.status_code == 422
+    assert json.loads(response.content)["detail"][0]["loc"] == ["body", "strategy"]
@@ -0,0 +1,109 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import copy
+import os
+import subprocess
+import sys
+
+from coreason_identity.models import UserContext
+from pydantic import BaseModel
+
+from coreason_construct.compiled import CompiledConstruct
+from coreason_construct.data.library import AE_Examples
+from coreason_construct.primitives.base import StructuredPrimitive
+from coreason_construct.roles.library import SafetyScientist
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.utils.fingerprint import digest
+from coreason_construct.weaver import Weaver
+
+SCRIPT = (
+    "from coreason_construct.data.library import AE_Examples;"
+    "from coreason_construct.roles.library import SafetyScientist;"
+    "print(SafetyScientist.fingerprint, AE_Examples.fingerprint)"
+)
+
+
+def test_component_fingerprint_is_stable_across_processes() -> None:
+    expected = f"{SafetyScientist.fingerprint} {AE_Examples.fingerprint}"
+    for seed in ("1", "2"):
+        env = {**os.environ, "PYTHONHASHSEED": seed}
+        result = subprocess.run([sys.executable, "-c", SCRIPT], env=env, capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == expected
+
+
+def test_component_fingerprint_covers_class_and_fields() -> None:
+    base = PromptComponent(name="A", type=ComponentType.CONTEXT, content="Text", priority=3)
+    assert (
+        base.fingerprint
+        == PromptComponent(name="A", type=ComponentType.CONTEXT, content="Text", priority=3).fingerprint
+    )
+    assert base.fingerprint != base.model_copy(update={"priority": 4}).fingerprint
+    assert len(base.fingerprint) == 64
+
+    class Subclass(PromptComponent):
+        pass
+
+    assert Subclass(name="A", type=ComponentType.CONTEXT, content="Text", priority=3).fingerprint != base.fingerprint
+    assert SafetyScientist.fingerprint != SafetyScientist.model_copy(update={"tone": "Relaxed"}).fingerprint
+
+
+def test_response_model_schema_is_part_of_the_fingerprint() -> None:
+    def primitive(with_grade: bool) -> StructuredPrimitive:
+        if with_grade:
+
+            class Event(BaseModel):
+                term: str
+                grade: int
+
+        else:
+
+            class Event(BaseModel):  # type: ignore[no-redef]
+                term: str
+
+        return StructuredPrimitive(name="P", content="Extract.", response_model=Event)
+
+    assert primitive(True).fingerprint == primitive(True).fingerprint
+    assert primitive(True).fingerprint != primitive(False).fingerprint
+
+
+def test_fingerprint_is_memoized_and_reset_on_assignment() -> None:
+    component = PromptComponent(name="A", type=ComponentType.CONTEXT, content="Text")
+    first = component.fingerprint
+    assert component.__dict__["fingerprint"] == first
+    assert component == PromptComponent(name="A", type=ComponentType.CONTEXT, content="Text")
+
+    component.content = "Other"
+    assert component.fingerprint != first
+    assert copy.deepcopy(component).fingerprint == component.fingerprint
+    assert "fingerprint" not in copy.copy(component).__dict__
+
+
+def test_construct_fingerprint(mock_context: UserContext) -> None:
+    def weaver(encoding: str = "cl100k_base") -> Weaver:
+        result = Weaver(encoding=encoding)
+        result.add(SafetyScientist, context=mock_context)
+        result.add(AE_Examples, context=mock_context)
+        return result
+
+    compiled = weaver().compile()
+    assert compiled.fingerprint == weaver().fingerprint()
+    assert compiled.fingerprint == CompiledConstruct.from_wire(compiled.to_wire()).fingerprint
+    assert compiled.fingerprint != weaver("o200k_base").fingerprint()
+    assert compiled.fingerprint != weaver().fingerprint(ordering="cache")
+
+    extended = weaver()
+    extended.add(PromptComponent(name="Extra", type=ComponentType.CONTEXT, content="More."))
+    assert extended.fingerprint() != compiled.fingerprint
+
+
+def test_digest_is_length_prefixed() -> None:
+    assert digest("ab", "c") != digest("a", "bc")
+    assert digest("x") == digest(b"x")
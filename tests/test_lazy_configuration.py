@@ -0,0 +1,93 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import io
+import json
+import pickle
+from pathlib import Path
+
+from coreason_identity.models import UserContext
+from pydantic import BaseModel
+
+from coreason_construct.primitives.base import StructuredPrimitive
+from coreason_construct.roles.library import SafetyScientist
+from coreason_construct.schemas.base import PromptConfiguration
+from coreason_construct.weaver import Weaver
+
+
+class Event(BaseModel):
+    term: str
+
+
+def _weaver(mock_context: UserContext) -> Weaver:
+    weaver = Weaver()
+    weaver.add(SafetyScientist, context=mock_context)
+    weaver.add(StructuredPrimitive(name="Extract", content="Extract the event.", response_model=Event))
+    return weaver
+
+
+def test_messages_are_joined_on_first_access(mock_context: UserContext) -> None:
+    user_input = 'Patient reported "severe" nausea. ' * 1000
+    config = _weaver(mock_context).build(user_input)
+    assert "system_message" not in config.__dict__
+    assert "user_message" not in config.__dict__
+    assert config.message_parts("system_message") == tuple(s.text for s in config.system_segments)
+    assert config.message_parts("user_message")[-1] is user_input
+
+    copied = config.model_copy()
+    assert config.user_message == f"Extract the event.\n\nINPUT DATA:\n{user_input}"
+    assert config.system_message == "".join(s.text for s in config.system_segments)
+    assert config.message_parts("user_message") == (config.user_message,)
+    assert "user_message" not in copied.__dict__
+    assert copied.user_message == config.user_message
+
+    eager = PromptConfiguration(**{name: getattr(config, name) for name in PromptConfiguration.model_fields})
+    assert eager == _weaver(mock_context).build(user_input)
+    assert list(config.model_dump()) == list(PromptConfiguration.model_fields)
+    assert pickle.loads(pickle.dumps(_weaver(mock_context).build("x"))).user_message.endswith("x")
+
+
+def test_write_json_streams_the_parts(mock_context: UserContext, tmp_path: Path) -> None:
+    weaver = _weaver(mock_context)
+    buffer = io.StringIO()
+    config = weaver.build_stream(buffer, "Naïve \\ input\n", max_tokens=100_000)
+    assert "system_message" not in config.__dict__
+
+    data = json.loads(buffer.getvalue())
+    assert data == {**config.model_dump(exclude={"response_model"}), "response_model": "Event"}
+    assert data["user_message"].endswith("Naïve \\ input\n")
+
+    path = tmp_path / "config.json"
+    with open(path, "w", encoding="utf-8") as f:
+        weaver.compile().build_stream(f, "x")
+    assert json.loads(path.read_text(encoding="utf-8"))["response_model"] == "Event"
+
+    buffer = io.StringIO()
+    PromptConfiguration(system_message="s", user_message="u", response_model=None, provenance_metadata={}).write_json(
+        buffer
+    )
+    assert json.loads(buffer.getvalue())["response_model"] is None
+
+
+def test_replaced_messages_supersede_their_parts(mock_context: UserContext) -> None:
+    config = _weaver(mock_context).build("x")
+    config.system_message = "REPLACED"
+    copied = config.model_copy(update={"user_message": "NEW"})
+    assert config.message_parts("system_message") == ("REPLACED",)
+    assert copied.message_parts("system_message") == ("REPLACED",)
+    assert copied.message_parts("user_message") == ("NEW",)
+    assert config.user_message.endswith("x")
+
+    for configuration in (config, copied):
+        buffer = io.StringIO()
+        configuration.write_json(buffer)
+        data = json.loads(buffer.getvalue())
+        assert data == {**configuration.model_dump(exclude={"response_model"}), "response_model": "Event"}
+    assert (data["system_message"], data["user_message"]) == ("REPLACED", "NEW")
@@ -0,0 +1,176 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import asyncio
+import threading
+from typing import Callable, List, Optional, Sequence
+
+import pytest
+from coreason_identity.models import UserContext
+
+from coreason_construct.async_weaver import AsyncWeaver
+from coreason_construct.contexts.library import LazyContext, PatientHistory
+from coreason_construct.schemas.base import ComponentType, PromptComponent, SegmentKind
+from coreason_construct.weaver import Weaver
+
+ROLE = PromptComponent(name="Role", type=ComponentType.ROLE, content="You are terse.", priority=10)
+OTHER = PromptComponent(name="Other", type=ComponentType.CONTEXT, content="o" * 100, priority=3)
+
+FETCHES: List[str] = []
+
+
+class Record(LazyContext):
+    text: str = ""
+
+    def fetch(self) -> str:
+        FETCHES.append(self.name)
+        return self.text
+
+
+class Batched(LazyContext):
+    batched = True
+    text: str = ""
+
+    @classmethod
+    def fetch_many(cls, contexts: Sequence[LazyContext]) -> List[str]:
+        FETCHES.append(",".join(context.name for context in contexts))
+        return [context.text for context in contexts if isinstance(context, Batched)]
+
+
+@pytest.fixture(autouse=True)
+def fetches(chars: None) -> None:
+    FETCHES.clear()
+
+
+def _record(size: int, size_hint: Optional[int]) -> Record:
+    return Record(name="Record", content="Record stub.", text="r" * size, size_hint=size_hint, priority=5)
+
+
+def _size(weaver: Weaver, user_input: str = "x", **kwargs: int) -> int:
+    config = weaver.build(user_input, **kwargs)  # type: ignore[arg-type]
+    return len(config.system_message) + len(config.user_message)
+
+
+def test_only_surviving_contexts_are_fetched(weave: Callable[..., Weaver]) -> None:
+    weaver = weave(ROLE, _record(300, 300), encoding="chars")
+    base = _size(weave(ROLE, encoding="chars"))
+
+    config = weaver.build("x", max_tokens=base + 100)
+    assert config.dropped_components == ["Record"]
+    assert FETCHES == []
+
+    config = weaver.build("x")
+    assert FETCHES == ["Record"]
+    assert config.system_message.endswith("r" * 300)
+    assert "Record stub." not in config.system_message
+    assert config.system_segments[-1].kind == SegmentKind.DYNAMIC
+
+    # Within a batch, each context is fetched once
+    FETCHES.clear()
+    configs = list(weaver.build_many(["x", "y" * 50, "z" * 1000], max_tokens=base + 400))
+    assert FETCHES == ["Record"]
+    assert [c.dropped_components for c in configs] == [[], [], ["Record"]]
+
+
+def test_replans_when_the_hint_is_off(weave: Callable[..., Weaver]) -> None:
+    base = _size(weave(ROLE, OTHER, encoding="chars"))
+
+    # The hint is too small: the fetched record does not fit next to Other, which is then dropped
+    weaver = weave(ROLE, OTHER, _record(150, 10), encoding="chars")
+    config = weaver.build("x", max_tokens=base + 100)
+    assert config.dropped_components == ["Other"]
+    assert FETCHES == ["Record"]
+    assert _size(weaver, max_tokens=base + 100) <= base + 100
+
+    # The hint is too large: Other is dropped to make room, then kept once the record is fetched
+    FETCHES.clear()
+    weaver = weave(ROLE, OTHER, _record(20, 200), encoding="chars")
+    config = weaver.build("x", max_tokens=base + 100)
+    assert config.dropped_components == []
+    assert FETCHES == ["Record"]
+    assert "r" * 20 in config.system_message and "Record stub." not in config.system_message
+
+    # Without a hint, the stub is the estimate
+    FETCHES.clear()
+    weaver = weave(ROLE, OTHER, _record(20, None), encoding="chars")
+    assert weaver.build("x", max_tokens=base + 100).dropped_components == []
+    assert weaver.build("x", max_tokens=base + 10_000).dropped_components == []
+
+
+def test_patient_history_declares_its_size(weave: Callable[..., Weaver]) -> None:
+    history = PatientHistory(patient_id="P1", size_hint=40)
+    assert history.patient_id == "P1"
+    assert history.fetch() == history.content
+
+    weaver = weave(ROLE, history, encoding="chars")
+    assert weaver.build("x").system_message.endswith(history.content)
+    assert weaver.compile(ordering="cache").kinds[-1] == SegmentKind.DYNAMIC
+
+
+def test_kept_contexts_are_fetched_concurrently(weave: Callable[..., Weaver]) -> None:
+    # Each fetch waits for the other; fetched one after the other, they would time out
+    barrier = threading.Barrier(2, timeout=5)
+
+    class Waiting(Record):
+        def fetch(self) -> str:
+            barrier.wait()
+            return super().fetch()
+
+    first = Waiting(name="First", content="stub", text="first", priority=5)
+    second = Waiting(name="Second", content="stub", text="second", priority=5)
+    config = weave(ROLE, first, second, encoding="chars").build("x")
+    assert sorted(FETCHES) == ["First", "Second"]
+    assert "first" in config.system_message and "second" in config.system_message
+
+
+def test_batched_contexts_are_fetched_in_one_call(weave: Callable[..., Weaver]) -> None:
+    contexts = [Batched(name=f"B{n}", content="stub", text=f"text {n}", priority=5) for n in range(3)]
+    weaver = weave(ROLE, *contexts, _record(10, None), encoding="chars")
+    config = weaver.build("x")
+    assert sorted(FETCHES) == ["B0,B1,B2", "Record"]
+    assert all(f"text {n}" in config.system_message for n in range(3))
+
+
+@pytest.mark.asyncio
+async def test_abuild_awaits_the_fetches(mock_context: UserContext, weave: Callable[..., Weaver]) -> None:
+    started: List[str] = []
+    release = asyncio.Event()
+
+    class Remote(Record):
+        @classmethod
+        async def afetch_many(cls, contexts: Sequence[LazyContext]) -> List[str]:
+            started.extend(context.name for context in contexts)
+            await release.wait()
+            return [context.text for context in contexts if isinstance(context, Remote)]
+
+    async def release_when_both_started() -> None:
+        while len(started) < 2:
+            await asyncio.sleep(0.01)
+        release.set()
+
+    base = _size(weave(ROLE, OTHER, encoding="chars"))
+    components = (
+        OTHER,
+        Remote(name="Kept", content="stub", text="k" * 20, size_hint=30, priority=5),
+        Remote(name="Also", content="stub", text="a" * 10, priority=6),
+        Remote(name="Dropped", content="stub", text="d" * 500, size_hint=500, priority=1),
+    )
+    weaver = AsyncWeaver(encoding="chars")
+    for component in (ROLE, *components):
+        weaver.add(component, context=mock_context)
+    config, _ = await asyncio.wait_for(
+        asyncio.gather(weaver.abuild("x", max_tokens=base + 100), release_when_both_started()), 5
+    )
+    assert sorted(started) == ["Also", "Kept"]
+    assert config.dropped_components == ["Dropped"]
+
+    # The same configuration as a synchronous build, which fetches through fetch_many
+    expected = weave(ROLE, *components, encoding="chars").build("x", max_tokens=base + 100)
+    assert config.system_message == expected.system_message
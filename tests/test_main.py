@@ -1,5 +1,6 @@
 import json
 from argparse import Namespace
+from pathlib import Path
 from unittest.mock import patch
 
 import pytest
@@ -96,3 +97,10 @@ def test_main_cli_visualize(capsys: pytest.CaptureFixture[str]) -> None:
         main()
     captured = capsys.readouterr()
     assert "construct_id" in captured.out
+
+
+def test_resolve_command_output_file(cli_context: UserContext, tmp_path: Path) -> None:
+    output = tmp_path / "config.json"
+    args = Namespace(construct_id="test_construct", variables_file=None, output=str(output))
+    resolve_command(args, cli_context)
+    assert json.loads(output.read_text(encoding="utf-8"))["system_message"] == ""
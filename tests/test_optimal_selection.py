@@ -0,0 +1,104 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import pytest
+from fastapi.testclient import TestClient
+
+from coreason_construct.data.components import FewShotBank, FewShotExample
+from coreason_construct.optimization.selection import select_components
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.server import app
+from coreason_construct.weaver import Weaver
+
+client = TestClient(app)
+
+
+def build_weaver() -> Weaver:
+    """One large priority-5 bank competing with three small priority-4 contexts."""
+    weaver = Weaver()
+    weaver.add(PromptComponent(name="Core", type=ComponentType.ROLE, content="You are a reviewer.", priority=10))
+    weaver.add(
+        FewShotBank(
+            name="BigBank",
+            examples=[FewShotExample(input=f"Case {i} " * 10, output=f"Outcome {i}") for i in range(10)],
+            priority=5,
+        )
+    )
+    for i in range(3):
+        weaver.add(
+            PromptComponent(name=f"Small{i}", type=ComponentType.CONTEXT, content=f"Short rule {i}.", priority=4)
+        )
+    return weaver
+
+
+def test_select_components_dp() -> None:
+    # Best value within 10 tokens is items 1 + 2 (value 9), not item 0 (value 5).
+    assert select_components([10, 5, 5], [5, 4, 5], 10) == {1, 2}
+    assert select_components([10, 5, 5], [5, 4, 5], 20) == {0, 1, 2}
+    assert select_components([10], [5], 9) == set()
+
+
+def test_select_components_negative_capacity() -> None:
+    assert select_components([1, 2], [1, 2], -1) == set()
+
+
+def test_select_components_greedy_fallback() -> None:
+    # A tiny cell budget forces the greedy path; zero-weight items are always kept.
+    keep = select_components([10, 5, 5, 0], [5, 4, 5, 1], 10, max_cells=1)
+    assert keep == {1, 2, 3}
+
+
+def test_priority_mode_drops_small_contexts_first() -> None:
+    config = build_weaver().build(user_input="In", max_tokens=40)
+
+    assert config.dropped_components[:3] == ["Small0", "Small1", "Small2"]
+
+
+def test_optimal_mode_keeps_more_priority_value() -> None:
+    config = build_weaver().build(user_input="In", max_tokens=40, optimization="optimal")
+
+    assert config.dropped_components == ["BigBank"]
+    for i in range(3):
+        assert f"Short rule {i}." in config.system_message
+    assert "You are a reviewer." in config.system_message
+
+
+def test_optimal_mode_within_budget_drops_nothing() -> None:
+    config = build_weaver().build(user_input="In", max_tokens=10_000, optimization="optimal")
+    assert config.dropped_components == []
+
+
+def test_optimal_mode_falls_back_to_priority_loop() -> None:
+    """Overflow left after selection (critical content, user input) is handled by the priority loop."""
+    config = build_weaver().build(user_input="In " * 100, max_tokens=5, optimization="optimal")
+
+    assert set(config.dropped_components) == {"BigBank", "Small0", "Small1", "Small2"}
+    assert "You are a reviewer." in config.system_message
+
+
+def test_unknown_optimization_mode() -> None:
+    with pytest.raises(ValueError, match="Unknown optimization mode"):
+        Weaver().build(user_input="In", optimization="random")
+
+
+def test_compile_endpoint_optimal_mode() -> None:
+    components = [
+        {"name": "Big", "type": "CONTEXT", "content": "Background detail. " * 30, "priority": 5},
+        {"name": "SmallA", "type": "CONTEXT", "content": "Rule A.", "priority": 4},
+        {"name": "SmallB", "type": "CONTEXT", "content": "Rule B.", "priority": 4},
+    ]
+    payload = {"user_input": "In", "components": components, "max_tokens": 20, "optimization": "optimal"}
+
+    response = client.post("/v1/compile", json=payload)
+    assert response.status_code == 200
+    assert response.json()["warnings"] == ["Big"]
+
+    payload["optimization"] = "random"
+    assert client.post("/v1/compile", json=payload).status_code == 422
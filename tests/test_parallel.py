@@ -0,0 +1,174 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import multiprocessing
+import sqlite3
+import zlib
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import pytest
+from conftest import register_chars
+from coreason_identity.models import UserContext
+from pydantic import BaseModel
+
+from coreason_construct import CompiledConstruct, ParallelBuilder, parallel, wire
+from coreason_construct.compiled import format_user_message
+from coreason_construct.contexts.library import PatientHistory
+from coreason_construct.contexts.providers import CONTEXT_PROVIDERS, ContextProvider, SQLiteContextProvider
+from coreason_construct.data.components import FewShotBank
+from coreason_construct.data.library import AE_Examples
+from coreason_construct.primitives.base import StructuredPrimitive
+from coreason_construct.primitives.extract import ExtractionPrimitive
+from coreason_construct.roles.library import SafetyScientist
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.schemas.clinical import AdverseEvent
+from coreason_construct.weaver import Weaver
+
+
+class HistoryProvider(ContextProvider):
+    def __init__(self, texts: Dict[str, str]) -> None:
+        super().__init__()
+        self.texts = texts
+
+    def load_many(self, ids: Sequence[str]) -> Dict[str, str]:
+        return {record_id: self.texts[record_id] for record_id in ids if record_id in self.texts}
+
+
+COMPONENTS = (
+    SafetyScientist,
+    AE_Examples,
+    PatientHistory(patient_id="P1"),
+    PromptComponent(name="Study", type=ComponentType.CONTEXT, content="Study {{ study_id }}.", priority=3),
+    ExtractionPrimitive(name="AE_Extractor", schema=AdverseEvent),
+)
+
+
+def test_wire_round_trip(mock_context: UserContext, weave: Callable[..., Weaver]) -> None:
+    compiled = weave(*COMPONENTS, context_data={"patient_id": "P1"}).compile()
+    loaded = CompiledConstruct.from_wire(compiled.to_wire())
+
+    assert loaded.components == compiled.components
+    assert [type(c) for c in loaded.components] == [type(c) for c in compiled.components]
+    assert any(isinstance(c, FewShotBank) for c in loaded.components)
+    assert loaded.response_model is AdverseEvent
+    assert loaded.encoding == "cl100k_base"
+    assert loaded.estimator.ratios == compiled.estimator.ratios
+    variables = {"study_id": "NCT1"}
+    assert loaded.build("Nausea.", variables, context=mock_context) == compiled.build(
+        "Nausea.", variables, context=mock_context
+    )
+
+
+def test_wire_ships_unimportable_classes_as_their_base() -> None:
+    class LocalRole(PromptComponent):
+        extra: str = "local"
+
+    class LocalModel(BaseModel):
+        pass
+
+    encoded = wire.encode_component(LocalRole(name="R", type=ComponentType.ROLE, content="Hi", extra="x"))
+    assert encoded == [
+        "coreason_construct.schemas.base:PromptComponent",
+        {"name": "R", "type": "ROLE", "content": "Hi"},
+    ]
+    assert wire.decode_component(encoded) == PromptComponent(name="R", type=ComponentType.ROLE, content="Hi")
+
+    primitive = StructuredPrimitive(name="P", content="Do it", response_model=LocalModel)
+    with pytest.raises(ValueError, match="is not importable"):
+        wire.encode_component(primitive)
+    with pytest.raises(ValueError, match="is not importable"):
+        CompiledConstruct([], [], LocalModel, len, encoding="cl100k_base").to_wire()
+    with pytest.raises(ValueError, match="registry encoding"):
+        CompiledConstruct([], [], None, len).to_wire()
+    with pytest.raises(ValueError, match="not a PromptComponent class"):
+        wire.decode_component(["coreason_construct.schemas.clinical:AdverseEvent", {}])
+    with pytest.raises(ValueError, match="Unsupported construct wire version"):
+        wire.loads(zlib.compress(b'{"v": 0}'))
+    assert wire.import_path(type("Dynamic", (), {})) is None
+
+
+def test_parallel_builds_match_serial(mock_context: UserContext, weave: Callable[..., Weaver], chars: None) -> None:
+    compiled = weave(*COMPONENTS, context_data={"patient_id": "P1"}, encoding="chars").compile()
+    variables = {"study_id": "NCT1"}
+    inputs = [f"Case {i}: nausea. " * (1 + i % 25) for i in range(50)]
+
+    with ParallelBuilder(compiled, max_workers=2, chunksize=4, initializer=register_chars) as builder:
+        for max_tokens in (None, 400):
+            expected = list(compiled.build_many(inputs, variables, max_tokens, mock_context))
+            results = list(builder.build_many(iter(inputs), variables, max_tokens, mock_context))
+            assert results == expected
+        assert {tuple(c.dropped_components) for c in results} != {()}
+
+        # Abandoning the stream early cancels the remaining chunks
+        stream = builder.build_many(inputs, variables)
+        assert next(stream) == compiled.build(inputs[0], variables)
+        stream.close()
+
+        with pytest.raises(ValueError, match="Unknown optimization mode"):
+            builder.build_many(inputs, optimization="fastest")
+
+    with pytest.raises(ValueError, match="chunksize must be positive"):
+        ParallelBuilder(compiled, chunksize=0)
+
+
+def test_worker_functions(weave: Callable[..., Weaver], monkeypatch: pytest.MonkeyPatch) -> None:
+    compiled = weave(*COMPONENTS, context_data={"patient_id": "P1"}).compile()
+    monkeypatch.setattr(parallel, "_WORKER_CONSTRUCT", None)
+    with pytest.raises(RuntimeError, match="not initialized"):
+        parallel._build_chunk(["x"], None, None, "priority")
+
+    calls: List[str] = []
+    histories = partial(HistoryProvider, {"P1": "Allergic to penicillin."})
+    try:
+        parallel._init_worker(compiled.to_wire(), calls.append, ("init",), {"PatientHistory": histories})
+        assert calls == ["init"]
+        assert isinstance(CONTEXT_PROVIDERS["PatientHistory"], HistoryProvider)
+
+        variables = {"study_id": "NCT1"}
+        packed = parallel._build_chunk(["a", "b"], variables, None, "priority")
+        expected = compiled.build("a", variables)
+    finally:
+        CONTEXT_PROVIDERS.clear()
+    segments, _, task_part = packed[0][:3]
+    assert segments is not None and "".join(segment.text for segment in segments) == expected.system_message
+    assert "Allergic to penicillin." in expected.system_message
+    # Only the task part of the user message is sent back, not the input
+    assert task_part and expected.user_message == format_user_message(task_part, "a")
+    assert packed[1][0] is None
+
+
+def test_workers_open_their_context_providers(weave: Callable[..., Weaver], chars: None, tmp_path: Path) -> None:
+    database = str(tmp_path / "contexts.db")
+    with sqlite3.connect(database) as connection:
+        connection.execute("CREATE TABLE histories (patient_id TEXT PRIMARY KEY, summary TEXT)")
+        connection.execute("INSERT INTO histories VALUES ('P1', 'Allergic to penicillin.')")
+    connection.close()
+    histories = partial(SQLiteContextProvider, database, "histories", "patient_id", "summary")
+
+    compiled = weave(*COMPONENTS, context_data={"patient_id": "P1"}, encoding="chars").compile()
+    variables = {"study_id": "NCT1"}
+    # Spawned workers inherit nothing from this process: the provider is opened by each of them
+    with ParallelBuilder(
+        compiled,
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=register_chars,
+        context_providers={"PatientHistory": histories},
+    ) as builder:
+        results = list(builder.build_many(["a", "b"], variables))
+    assert all("Allergic to penicillin." in config.system_message for config in results)
+
+    CONTEXT_PROVIDERS["PatientHistory"] = histories()
+    try:
+        assert results == list(compiled.build_many(["a", "b"], variables))
+    finally:
+        CONTEXT_PROVIDERS.clear()
@@ -0,0 +1,101 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import hashlib
+from typing import Callable
+
+import pytest
+from coreason_identity.models import UserContext
+from fastapi.testclient import TestClient
+
+from coreason_construct.compiled import CompiledConstruct
+from coreason_construct.contexts.library import StudyProtocol
+from coreason_construct.roles.base import RoleDefinition
+from coreason_construct.roles.library import SafetyScientist
+from coreason_construct.schemas.base import ComponentType, PromptComponent, SegmentKind
+from coreason_construct.server import app
+from coreason_construct.weaver import Weaver
+
+TREATING_PHYSICIAN = RoleDefinition(
+    name="TreatingPhysician",
+    title="Treating Physician",
+    tone="Careful",
+    competencies=["Diagnosis"],
+    dependencies=["PatientHistory"],
+    priority=9,
+)
+
+STUDY = PromptComponent(name="Study", type=ComponentType.CONTEXT, content="Study {{ study_id }}.", priority=6)
+
+
+def test_cache_ordering_puts_dynamic_contexts_last(weave: Callable[..., Weaver]) -> None:
+    components = [STUDY, TREATING_PHYSICIAN, SafetyScientist]
+    weaver = weave(*components, context_data={"patient_id": "P1"})
+
+    config = weaver.build("Nausea.", {"study_id": "NCT1"}, ordering="cache")
+    assert [s.kind for s in config.system_segments] == [SegmentKind.STATIC, SegmentKind.VARIABLE, SegmentKind.DYNAMIC]
+    assert [s.cache_breakpoint for s in config.system_segments] == [True, True, False]
+    assert config.system_segments[0].components == ["HIPAA", "SafetyScientist", "GxP", "TreatingPhysician"]
+    assert config.system_segments[2].components == ["PatientHistory_P1"]
+    assert "".join(s.text for s in config.system_segments) == config.system_message
+    prefix = config.system_segments[0].text + config.system_segments[1].text
+    assert config.prefix_hash == hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+    # Another patient, another input and another insertion order share the cached prefix
+    other = weave(*components[::-1], context_data={"patient_id": "P2"}).build(
+        "Rash.", {"study_id": "NCT1"}, ordering="cache"
+    )
+    assert other.prefix_hash == config.prefix_hash
+    assert other.system_message.startswith(prefix)
+    assert "PatientHistory_P2" not in config.system_message
+    assert weaver.build("x", {"study_id": "NCT2"}, ordering="cache").prefix_hash != config.prefix_hash
+
+
+def test_priority_ordering_segments(mock_context: UserContext, weave: Callable[..., Weaver]) -> None:
+    weaver = weave(TREATING_PHYSICIAN, STUDY, context_data={"patient_id": "P1"})
+    weaver.add(StudyProtocol(nct_id="NCT1", priority=10), context=mock_context)
+
+    # Priority order: StudyProtocol_NCT1 (10), TreatingPhysician (9), PatientHistory_P1 (7), Study (6)
+    config = weaver.build("Nausea.", {"study_id": "NCT1"})
+    kinds = [s.kind for s in config.system_segments]
+    assert kinds == [SegmentKind.DYNAMIC, SegmentKind.STATIC, SegmentKind.DYNAMIC, SegmentKind.VARIABLE]
+    assert not any(s.cache_breakpoint for s in config.system_segments)
+    assert config.prefix_hash is None
+    assert "".join(s.text for s in config.system_segments) == config.system_message
+
+    assert CompiledConstruct([], [], None, len).build("x").system_segments == []
+
+    with pytest.raises(ValueError, match="Unknown ordering mode"):
+        weaver.build("x", ordering="alphabetical")
+
+
+def test_resolve_construct_and_server_ordering(
+    mock_context: UserContext, weave: Callable[..., Weaver], chars: None
+) -> None:
+    weaver = weave(TREATING_PHYSICIAN, STUDY, context_data={"patient_id": "P1"})
+    config = weaver.resolve_construct("c", {"user_input": "x", "study_id": "NCT1", "ordering": "cache"}, mock_context)
+    assert [s.kind for s in config.system_segments][-1] == SegmentKind.DYNAMIC
+
+    components = [
+        {"name": "Role", "type": "ROLE", "content": "You are terse.", "priority": 10},
+        {"name": "Study", "type": "CONTEXT", "content": "Study {{ study_id }}.", "priority": 10},
+        {"name": "Style", "type": "CONTEXT", "content": "Be brief.", "priority": 1},
+    ]
+    payload = {
+        "user_input": "x",
+        "variables": {"study_id": "NCT1"},
+        "components": components,
+        "ordering": "cache",
+        "encoding": "chars",
+    }
+    data = TestClient(app).post("/v1/compile", json=payload).json()
+    assert data["system_prompt"] == "You are terse.\n\nBe brief.\n\nStudy NCT1."
+    assert [s["kind"] for s in data["system_segments"]] == ["STATIC", "VARIABLE"]
+    assert data["prefix_hash"] == hashlib.sha256(data["system_prompt"].encode("utf-8")).hexdigest()
@@ -0,0 +1,146 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import asyncio
+import threading
+from typing import Any, Dict, Generator, List
+
+import httpx
+import pytest
+from conftest import Clock
+from coreason_identity.models import UserContext
+
+from coreason_construct import server as server_module
+from coreason_construct.response_cache import ResponseCache
+from coreason_construct.server import BlueprintRequest, CompilationResponse, app, server
+
+PAYLOAD: Dict[str, Any] = {
+    "user_input": "Summarize.",
+    "components": [{"name": "Role", "type": "ROLE", "content": "You are {{ tone }}.", "priority": 10}],
+    "variables": {"tone": "brief", "extra": {"b": 1, "a": 2}},
+}
+
+
+@pytest.fixture
+def responses() -> Generator["ResponseCache[CompilationResponse]", None, None]:
+    original = server.responses
+    server.responses = ResponseCache(maxsize=8)
+    yield server.responses
+    server.responses = original
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_compile(
+    responses: "ResponseCache[CompilationResponse]", monkeypatch: pytest.MonkeyPatch
+) -> None:
+    release = threading.Event()
+    compiles: List[str] = []
+    handle_request = server.handle_request
+
+    def slow_handle_request(request: BlueprintRequest, context: UserContext) -> CompilationResponse:
+        compiles.append(request.user_input)
+        assert release.wait(5)
+        return handle_request(request, context)
+
+    monkeypatch.setattr(server, "handle_request", slow_handle_request)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        # The same body, with keys in another order
+        reordered = {**PAYLOAD, "variables": {"extra": {"a": 2, "b": 1}, "tone": "brief"}}
+        posts = [asyncio.ensure_future(client.post("/v1/compile", json=body)) for body in (PAYLOAD, reordered) * 3]
+        while responses.coalesced < 5:
+            await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*posts)
+        assert {result.json()["system_prompt"] for result in results} == {"You are brief."}
+        assert compiles == ["Summarize."]
+
+        # Served from the cache; other inputs and errors are compiled
+        assert (await client.post("/v1/compile", json=PAYLOAD)).status_code == 200
+        assert (await client.post("/v1/compile", json={**PAYLOAD, "user_input": "Other."})).status_code == 200
+        for _ in range(2):
+            assert (await client.post("/v1/compile", json={**PAYLOAD, "variables": {}})).status_code == 400
+        assert compiles == ["Summarize.", "Other.", "Summarize.", "Summarize."]
+
+        stats = (await client.get("/v1/metrics")).json()["responses"]
+        assert stats == {"hits": 1, "coalesced": 5, "misses": 4, "hit_rate": 0.6, "size": 2, "maxsize": 8}
+
+
+@pytest.mark.asyncio
+async def test_expiry_eviction_and_errors(clock: Clock) -> None:
+    cache: ResponseCache[str] = ResponseCache(maxsize=2, ttl=10.0, clock=clock)
+    computed: List[str] = []
+
+    def compute(value: str) -> Any:
+        async def run() -> str:
+            computed.append(value)
+            return value
+
+        return run
+
+    for key in ("a", "b", "a", "c", "b"):
+        assert await cache.get_or_compute(key, compute(key)) == key
+    # "b" was evicted by "c", being least recently used
+    assert computed == ["a", "b", "c", "b"]
+    clock.now = 10.0
+    assert await cache.get_or_compute("c", compute("c")) == "c"
+    assert computed == ["a", "b", "c", "b", "c"]
+
+    async def fail() -> str:
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    failures = await asyncio.gather(*(cache.get_or_compute("x", fail) for _ in range(3)), return_exceptions=True)
+    assert [str(failure) for failure in failures] == ["boom"] * 3
+    assert "x" not in cache._entries
+    assert cache.stats() == {"hits": 1, "coalesced": 2, "misses": 6, "hit_rate": 3 / 9, "size": 2, "maxsize": 2}
+    cache.clear()
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_requests_do_not_cancel_the_compile() -> None:
+    cache: ResponseCache[str] = ResponseCache(maxsize=0, ttl=None)
+    release = asyncio.Event()
+
+    async def compute() -> str:
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(cache.get_or_compute("k", compute))
+    second = asyncio.ensure_future(cache.get_or_compute("k", compute))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second == "done"
+    assert first.cancelled()
+    # Nothing is cached with maxsize 0
+    assert cache.stats()["size"] == 0
+
+    async def fail() -> str:
+        await asyncio.sleep(0)
+        raise ValueError("unawaited")
+
+    abandoned = asyncio.ensure_future(cache.get_or_compute("e", fail))
+    await asyncio.sleep(0)
+    abandoned.cancel()
+    await asyncio.sleep(0.01)
+    assert not cache._flights
+
+
+def test_response_cache_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("COREASON_RESPONSE_CACHE_SIZE", "0")
+    monkeypatch.setenv("COREASON_RESPONSE_CACHE_TTL", "0")
+    cache = server_module.response_cache_from_env()
+    assert (cache.maxsize, cache.ttl) == (0, None)
+    monkeypatch.delenv("COREASON_RESPONSE_CACHE_SIZE")
+    monkeypatch.delenv("COREASON_RESPONSE_CACHE_TTL")
+    cache = server_module.response_cache_from_env()
+    assert (cache.maxsize, cache.ttl) == (server_module.RESPONSE_CACHE_SIZE, server_module.RESPONSE_CACHE_TTL)
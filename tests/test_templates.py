@@ -0,0 +1,161 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+from typing import Any, Tuple
+
+import jinja2
+import pytest
+
+from coreason_construct.contexts.library import HIPAA_Context
+from coreason_construct.modes.hats import SixThinkingHats
+from coreason_construct.roles.library import SafetyScientist
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.utils.templates import TEMPLATE_CACHE, CompiledTemplate, TemplateCache
+from coreason_construct.weaver import Weaver
+
+
+def test_template_cache_hits_and_misses() -> None:
+    cache = TemplateCache()
+    first = cache.get("Hello {{ name }}")
+    second = cache.get("Hello {{ name }}")
+
+    assert first is second
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 1024}
+    assert first.render(name="World") == "Hello World"
+
+
+def test_template_cache_is_bounded_lru() -> None:
+    cache = TemplateCache(maxsize=2)
+    a = cache.get("A")
+    cache.get("B")
+    cache.get("A")  # Refresh A, making B the least recently used
+    cache.get("C")  # Evicts B
+
+    assert cache.stats()["size"] == 2
+    assert cache.get("A") is a
+    misses = cache.misses
+    cache.get("B")
+    assert cache.misses == misses + 1
+
+
+def test_template_cache_strict_undefined() -> None:
+    cache = TemplateCache()
+    with pytest.raises(jinja2.UndefinedError):
+        cache.get("Hello {{ name }}").render()
+
+
+def test_template_cache_clear() -> None:
+    cache = TemplateCache()
+    cache.get("A")
+    cache.get("A")
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "size": 0, "maxsize": 1024}
+
+
+def test_render_compiles_library_context_once() -> None:
+    """Repeated renders of the same content reuse the compiled template."""
+    HIPAA_Context.render()
+    misses = TEMPLATE_CACHE.misses
+    hits = TEMPLATE_CACHE.hits
+
+    for _ in range(5):
+        HIPAA_Context.render()
+        PromptComponent(name="Copy", type=ComponentType.CONTEXT, content=HIPAA_Context.content).render()
+
+    assert TEMPLATE_CACHE.misses == misses
+    assert TEMPLATE_CACHE.hits == hits + 10
+
+
+def test_render_preserves_template_semantics() -> None:
+    """The shared environment keeps the defaults of jinja2.Template (e.g. trailing newline handling)."""
+    content = "Line {{ n }}\n"
+    component = PromptComponent(name="T", type=ComponentType.CONTEXT, content=content)
+    assert component.render(n=1) == jinja2.Template(content).render(n=1)
+
+
+class CountingTemplate:
+    """Wraps a jinja2 Template to count actual renders."""
+
+    def __init__(self, template: jinja2.Template) -> None:
+        self.template = template
+        self.calls = 0
+
+    def render(self, **kwargs: Any) -> str:
+        self.calls += 1
+        rendered: str = self.template.render(**kwargs)
+        return rendered
+
+
+def counting(source: str, memo_size: int = 64) -> Tuple[CompiledTemplate, CountingTemplate]:
+    cache = TemplateCache()
+    compiled = cache.get(source)
+    spy = CountingTemplate(compiled.template)
+    compiled.template = spy  # type: ignore[assignment]
+    compiled._memo_size = memo_size
+    return compiled, spy
+
+
+def test_template_variables_static_analysis() -> None:
+    assert HIPAA_Context.template_variables == frozenset()
+    assert SafetyScientist.template_variables == frozenset()
+    assert SixThinkingHats.White.template_variables == frozenset()
+
+    component = PromptComponent(
+        name="T",
+        type=ComponentType.CONTEXT,
+        content="{% for item in items %}{{ item }} {{ loop.index }}{% endfor %} {{ patient.name }}",
+    )
+    assert component.template_variables == frozenset({"items", "patient"})
+
+
+def test_variable_free_template_rendered_once() -> None:
+    compiled, spy = counting("Static text with {braces}.")
+    for i in range(5):
+        assert compiled.render(unrelated=str(i)) == "Static text with {braces}."
+    assert spy.calls == 1
+
+
+def test_render_memo_keyed_on_referenced_subset() -> None:
+    compiled, spy = counting("Hello {{ name }}")
+    assert compiled.render(name="A", other="1") == "Hello A"
+    assert compiled.render(name="A", other="2") == "Hello A"
+    assert compiled.render(name="B", other="2") == "Hello B"
+    assert spy.calls == 2
+
+    # Equal-but-differently-typed values must not share a memo entry
+    assert compiled.render(name=1) == "Hello 1"
+    assert compiled.render(name=True) == "Hello True"
+
+
+def test_render_memo_skips_unhashable_values() -> None:
+    compiled, spy = counting("{{ items | join(',') }}")
+    assert compiled.render(items=["a", "b"]) == "a,b"
+    assert compiled.render(items=["a", "b", "c"]) == "a,b,c"
+    assert spy.calls == 2
+
+
+def test_render_memo_is_bounded() -> None:
+    compiled, spy = counting("{{ n }}", memo_size=2)
+    for n in (1, 2, 3, 1):
+        compiled.render(n=n)
+    # n=1 was evicted by n=3 and rendered again
+    assert spy.calls == 4
+
+
+def test_weaver_add_rejects_unknown_variables() -> None:
+    weaver = Weaver(known_variables=["user_name"])
+    weaver.add(PromptComponent(name="Ok", type=ComponentType.CONTEXT, content="Hi {{ user_name }}"))
+
+    with pytest.raises(jinja2.UndefinedError, match=r"'Bad' references undefined variables: \['site'\]"):
+        weaver.add(PromptComponent(name="Bad", type=ComponentType.CONTEXT, content="At {{ site }} {{ user_name }}"))
+    assert [c.name for c in weaver.components] == ["Ok"]
+
+    # Without known variables, validation is deferred to build()
+    Weaver().add(PromptComponent(name="Bad", type=ComponentType.CONTEXT, content="At {{ site }}"))
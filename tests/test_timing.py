@@ -0,0 +1,155 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import io
+import json
+import time
+from typing import Callable, List
+
+import pytest
+from coreason_identity.models import UserContext
+from loguru import logger
+
+from coreason_construct.async_weaver import AsyncWeaver
+from coreason_construct.contexts.library import LazyContext
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.utils import timing
+from coreason_construct.utils.timing import BuildTimings, LogSink, TimingRecorder
+from coreason_construct.weaver import Weaver
+
+pytestmark = pytest.mark.usefixtures("chars")
+
+ROLE = PromptComponent(name="Role", type=ComponentType.ROLE, content="You are terse.", priority=10)
+GREETING = PromptComponent(name="Greeting", type=ComponentType.CONTEXT, content="Hello {{ name }}.", priority=5)
+FILLER = PromptComponent(name="Filler", type=ComponentType.CONTEXT, content="f" * 200, priority=1)
+
+
+def test_builds_are_not_timed_by_default(weave: Callable[..., Weaver]) -> None:
+    config = weave(ROLE, GREETING, FILLER, encoding="chars").build("x", variables={"name": "Ada"})
+    assert config.timings is None
+    assert "timings" in json.loads(config.model_dump_json())
+
+
+def test_instrumented_build_records_every_phase(weave: Callable[..., Weaver]) -> None:
+    records: List[BuildTimings] = []
+    weaver = weave(ROLE, GREETING, FILLER, encoding="chars", timing_sink=records.append)
+    assert weaver.instrument
+
+    config = weaver.build("x", variables={"name": "Grace"}, max_tokens=50)
+    assert config.dropped_components == ["Filler"]
+    timings = config.timings
+    assert timings is not None and records == [timings]
+    assert timings.fingerprint == weaver.fingerprint()
+    assert {"resolve", "compile", "render", "estimate", "tokenize", "optimize", "assemble"} <= set(timings.phases)
+    assert timings.phases["resolve"].calls == 3
+    assert timings.phases["optimize"].calls == 1
+    assert list(timings.components) == ["Greeting"]
+    assert timings.counts["renders"] == 1
+    assert timings.counts["encodes"] >= 4
+    assert timings.counts["plans"] == 1
+    assert timings.counts["optimize_iterations"] == 1
+    assert timings.wall >= timings.phases["optimize"].wall > 0
+    assert timings.cpu > 0
+
+    # The estimate decides a build within budget without tokenizing
+    timings = weaver.build("x", variables={"name": "Grace"}).timings
+    assert timings is not None
+    assert "renders" not in timings.counts and timings.counts["render_hits"] >= 1
+    assert "tokenize" not in timings.phases and "optimize" not in timings.phases
+
+    writer = io.StringIO()
+    weaver.build_stream(writer, "x", variables={"name": "Ada"})
+    assert json.loads(writer.getvalue())["timings"]["fingerprint"] == weaver.fingerprint()
+
+
+@pytest.mark.asyncio
+async def test_async_builds_are_timed(mock_context: UserContext) -> None:
+    records: List[BuildTimings] = []
+    weaver = AsyncWeaver(encoding="chars", timing_sink=records.append)
+    assert weaver.instrument
+    for component in (ROLE, GREETING, FILLER, LazyContext(name="Lazy", content="Fetched.", priority=6)):
+        await weaver.aadd(component, context=mock_context)
+
+    config = await weaver.abuild("x", variables={"name": "Grace"}, max_tokens=60)
+    assert config.dropped_components == ["Filler"]
+    timings = config.timings
+    assert timings is not None and records == [timings]
+    assert timings.fingerprint == weaver.fingerprint()
+    assert {"resolve", "compile", "render", "estimate", "tokenize", "optimize", "fetch", "assemble"} <= set(
+        timings.phases
+    )
+    assert timings.counts["fetches"] == 1
+    assert timings.wall >= timings.phases["fetch"].wall > 0
+    assert AsyncWeaver(encoding="chars").instrument is False
+
+
+def test_batch_items_report_the_shared_render(weave: Callable[..., Weaver]) -> None:
+    weaver = weave(ROLE, GREETING, FILLER, encoding="chars", instrument=True)
+    configs = list(weaver.build_many(["x", "y" * 500], variables={"name": "Alan"}, max_tokens=300))
+    assert [config.dropped_components for config in configs] == [[], ["Filler", "Greeting"]]
+    first, second = (config.timings for config in configs)
+    assert first is not None and second is not None
+    assert first.counts["renders"] == second.counts["renders"] == 1
+    assert first.components == second.components
+    assert first.phases["render"] == second.phases["render"]
+    assert "optimize" not in first.phases
+    # Filler and Greeting are dropped, then only the critical Role remains
+    assert second.counts["optimize_iterations"] == 3
+
+
+def test_failing_sink_does_not_fail_the_build(weave: Callable[..., Weaver]) -> None:
+    def sink(timings: BuildTimings) -> None:
+        raise RuntimeError("collector unavailable")
+
+    weaver = weave(ROLE, GREETING, FILLER, encoding="chars", timing_sink=sink)
+    assert weaver.build("x", variables={"name": "Ada"}).timings is not None
+
+
+def test_log_sink_reports_slow_builds() -> None:
+    messages: List[str] = []
+    handler = logger.add(messages.append, level="WARNING", format="{message}")
+    try:
+        recorder = TimingRecorder()
+        with recorder, timing.phase("render"):
+            time.sleep(0.01)
+        LogSink(threshold=1.0)(recorder.timings("abc"))
+        assert messages == []
+        LogSink(threshold=0.005)(recorder.timings("abc"))
+    finally:
+        logger.remove(handler)
+    assert len(messages) == 1
+    assert messages[0].startswith("Slow build of construct abc:") and "render" in messages[0]
+
+
+def test_recorder_times_nested_phases_once() -> None:
+    # Without an active recorder, phases and counts are no-ops
+    with timing.phase("tokenize"):
+        timing.count("encodes")
+    assert timing.active_recorder() is None
+
+    recorder = TimingRecorder()
+    with recorder:
+        assert timing.active_recorder() is recorder
+        with timing.phase("tokenize"):
+            with timing.phase("tokenize"):
+                time.sleep(0.01)
+            timing.count("encodes", 3)
+    assert timing.active_recorder() is None
+
+    timings = recorder.timings()
+    assert timings.phases["tokenize"].calls == 2
+    assert 0.01 <= timings.phases["tokenize"].wall <= timings.wall < 0.5
+    assert timings.counts == {"encodes": 3}
+
+    merged = TimingRecorder()
+    merged.merge(recorder)
+    merged.merge(recorder)
+    assert merged.timings().phases["tokenize"].calls == 4
+    assert merged.timings().counts == {"encodes": 6}
@@ -0,0 +1,101 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import json
+from typing import List
+
+import pytest
+import tiktoken
+from coreason_identity.models import UserContext
+
+from coreason_construct.optimization.estimation import (
+    CL100K_RATIOS,
+    TOKEN_ESTIMATOR,
+    EstimationTier,
+    TokenEstimator,
+)
+from coreason_construct.roles.library import SafetyScientist
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.weaver import Weaver
+
+SAMPLES = {
+    "prose": "The patient reported mild nausea and a headache after the second dose. " * 20,
+    "json": json.dumps({"events": [{"term": "Nausea", "grade": 2, "onset": [2024, 1, 3]}] * 30}),
+    "digits": "1234567890 " * 50,
+    "cyrillic": "Пациент сообщил о тошноте и головной боли. " * 20,
+    "chinese": "患者在服药后报告恶心和头痛。" * 20,
+    "emoji": "😀🎉👍" * 20,
+}
+
+
+@pytest.mark.parametrize("name", sorted(SAMPLES))
+def test_bounds_contain_exact_count(name: str) -> None:
+    text = SAMPLES[name]
+    exact = len(tiktoken.get_encoding("cl100k_base").encode(text))
+    bounds = TOKEN_ESTIMATOR.bounds(text)
+    assert bounds.lower <= exact <= bounds.upper
+
+
+def test_bounds_hard_limits() -> None:
+    assert TOKEN_ESTIMATOR.bounds("") == (0, 0)
+    # Never more tokens than bytes, and never fewer than one token per 128 bytes
+    assert TokenEstimator(CL100K_RATIOS._replace(ascii_min=0.5)).bounds("1 2 3").upper == 5
+    assert TokenEstimator(CL100K_RATIOS._replace(ascii_max=1000.0)).bounds("a" * 300).lower == 3
+
+
+@pytest.mark.parametrize("text", ["1," * 1000, "a\n" * 1000])
+def test_upper_bound_holds_for_adversarial_text(text: str, mock_context: UserContext) -> None:
+    # Byte-level BPE can spend one token per byte on punctuation and newline runs
+    assert TOKEN_ESTIMATOR.bounds(text).upper >= len(text)
+    assert not TOKEN_ESTIMATOR.fits(TOKEN_ESTIMATOR.bounds(text).upper, 1500)
+
+    weaver = Weaver()
+    weaver.add(PromptComponent(name="Dense", type=ComponentType.CONTEXT, content=text), context=mock_context)
+    config = weaver.build("Go.", max_tokens=1500)
+    assert config.provenance_metadata["token_estimation"] == EstimationTier.EXACT.value
+
+
+def test_fits_respects_margin() -> None:
+    assert TokenEstimator(margin=0.1).fits(90, 100)
+    assert not TokenEstimator(margin=0.1).fits(91, 100)
+    assert not TokenEstimator(margin=0.0).fits(1, None)
+    assert not TokenEstimator(margin=1.0).fits(1, 10_000)
+    with pytest.raises(ValueError, match="margin must be between 0 and 1"):
+        TokenEstimator(margin=1.5)
+
+
+def test_build_records_deciding_tier(mock_context: UserContext) -> None:
+    calls: List[str] = []
+
+    class CountingWeaver(Weaver):
+        def _estimate_tokens(self, text: str) -> int:
+            calls.append(text)
+            return super()._estimate_tokens(text)
+
+    weaver = CountingWeaver()
+    weaver.add(SafetyScientist, context=mock_context)
+
+    unbounded = weaver.build("Headache.")
+    assert unbounded.provenance_metadata["token_estimation"] == EstimationTier.UNBOUNDED.value
+
+    far_below = weaver.build("Headache.", max_tokens=100_000)
+    assert far_below.provenance_metadata["token_estimation"] == EstimationTier.ESTIMATE.value
+    assert calls == []
+
+    near = weaver.build("Headache.", max_tokens=150)
+    assert near.provenance_metadata["token_estimation"] == EstimationTier.EXACT.value
+    assert calls
+
+    # The cheap tier produces exactly what exact tokenization would
+    exact = Weaver(estimator=TokenEstimator(margin=1.0))
+    exact.add(SafetyScientist, context=mock_context)
+    config = exact.build("Headache.", max_tokens=100_000)
+    assert config.provenance_metadata["token_estimation"] == EstimationTier.EXACT.value
+    assert config.model_copy(update={"provenance_metadata": far_below.provenance_metadata}) == far_below
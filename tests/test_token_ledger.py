@@ -0,0 +1,109 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+from typing import List
+
+import tiktoken
+from pydantic import BaseModel
+
+from coreason_construct.optimization.ledger import TokenLedger, junction_tokens
+from coreason_construct.primitives.base import StructuredPrimitive
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.weaver import Weaver
+
+ENCODING = tiktoken.get_encoding("cl100k_base")
+
+
+def count(text: str) -> int:
+    return len(ENCODING.encode(text))
+
+
+PARTS = [
+    "You are a Senior Safety Scientist.\nTone: Vigilant.",
+    "You must strictly adhere to HIPAA regulations.",
+    "Critical " * 10,
+    "A" * 40,
+    "Here are some examples:\n\nInput: nausea\nIdeal Output: {'term': 'Nausea'}",
+]
+
+
+class MockModel(BaseModel):
+    pass
+
+
+def test_junction_tokens_matches_exact_join() -> None:
+    for left, sep, right in [("Hello world.", "\n\n", "You are"), ("Critical " * 10, "", "In"), ("x", "\n\n", "")]:
+        assert count(left) + count(right) + junction_tokens(count, left, sep, right) == count(left + sep + right)
+
+
+def test_ledger_total_matches_exact_encoding() -> None:
+    ledger = TokenLedger(count, PARTS)
+    assert ledger.total == count("\n\n".join(PARTS))
+
+    ledger.set_tail("Tail input", count("Tail input"))
+    assert ledger.total == count("\n\n".join(PARTS) + "Tail input")
+
+
+def test_ledger_drop_updates_total_incrementally() -> None:
+    ledger = TokenLedger(count, PARTS)
+    ledger.set_tail("In", count("In"))
+    live: List[str] = list(PARTS)
+
+    # Drop middle, first and last parts in turn; the total must track the exact count.
+    for index in (2, 0, 4, 3):
+        ledger.drop(index)
+        live.remove(PARTS[index])
+        assert ledger.total == count("\n\n".join(live) + "In")
+
+    ledger.drop(1)
+    assert ledger.total == count("In")
+
+
+def test_ledger_empty() -> None:
+    ledger = TokenLedger(count, [])
+    assert ledger.total == 0
+    ledger.set_tail("Only input", count("Only input"))
+    assert ledger.total == count("Only input")
+
+
+def test_build_tokenizes_each_part_once() -> None:
+    """The drop loop must not re-encode the full prompt, however many components are dropped."""
+    calls: List[str] = []
+
+    class CountingWeaver(Weaver):
+        def _estimate_tokens(self, text: str) -> int:
+            calls.append(text)
+            return super()._estimate_tokens(text)
+
+    weaver = CountingWeaver()
+    for i in range(20):
+        weaver.add(PromptComponent(name=f"C{i}", type=ComponentType.CONTEXT, content=f"Context {i} " * 20))
+    user_input = "Patient reported nausea. " * 200
+
+    config = weaver.build(user_input=user_input, max_tokens=50)
+
+    assert len(config.dropped_components) == 20
+    assert sum(1 for text in calls if user_input in text) == 1
+    assert max(len(text) for text in calls if user_input not in text) < len(user_input)
+
+
+def test_build_drops_low_priority_primitive() -> None:
+    """Dropping the active task hands the user message over to the next primitive."""
+    weaver = Weaver()
+    weaver.add(StructuredPrimitive(name="Verbose", content="Do X " * 50, response_model=MockModel, priority=1))
+    weaver.add(StructuredPrimitive(name="Short", content="Do Y", response_model=MockModel, priority=1))
+
+    config = weaver.build(user_input="In", max_tokens=12)
+    assert config.dropped_components == ["Verbose"]
+    assert config.user_message == "Do Y\n\nINPUT DATA:\nIn"
+
+    config = weaver.build(user_input="In", max_tokens=3)
+    assert config.dropped_components == ["Verbose", "Short"]
+    assert config.user_message == "In"
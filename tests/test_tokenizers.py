@@ -0,0 +1,176 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+import sys
+import types
+from typing import Iterator, List, Sequence
+
+import pytest
+from fastapi.testclient import TestClient
+
+from coreason_construct.optimization.estimation import CL100K_RATIOS, TOKEN_ESTIMATOR
+from coreason_construct.optimization.tokenizers import (
+    BYTE_RATIOS,
+    TOKENIZER_REGISTRY,
+    HuggingFaceTokenizer,
+    TiktokenTokenizer,
+    Tokenizer,
+    TokenizerRegistry,
+)
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.server import app
+from coreason_construct.weaver import Weaver
+
+
+class WordTokenizer(Tokenizer):
+    """One token per character code, batches recorded."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.batches: List[List[str]] = []
+
+    def encode(self, text: str) -> List[int]:
+        return [ord(c) for c in text]
+
+    def decode(self, tokens: Sequence[int]) -> str:
+        return "".join(chr(t) for t in tokens)
+
+    def encode_batch(self, texts: Sequence[str]) -> List[List[int]]:
+        self.batches.append(list(texts))
+        return super().encode_batch(texts)
+
+
+@pytest.fixture
+def chars() -> Iterator[WordTokenizer]:
+    tokenizer = WordTokenizer("chars")
+    TOKENIZER_REGISTRY.register("chars", lambda: tokenizer)
+    yield tokenizer
+    TOKENIZER_REGISTRY.unregister("chars")
+
+
+def test_registry_loads_once() -> None:
+    loads: List[str] = []
+
+    def loader() -> Tokenizer:
+        loads.append("local")
+        return WordTokenizer("local")
+
+    registry = TokenizerRegistry(default="local").register("local", loader)
+    assert loads == []
+    assert registry.get() is registry.get("local")
+    assert registry.count("abc") == 3
+    assert registry.count_batch(["a", "", "abcd"]) == [1, 0, 4]
+    assert loads == ["local"]
+    assert "local" in registry and "o200k_base" in registry and "nope" not in registry
+
+    registry.clear()
+    registry.get()
+    assert loads == ["local", "local"]
+
+    with pytest.raises(KeyError, match="Unknown encoding 'nope'"):
+        registry.get("nope")
+
+
+def test_registry_estimators() -> None:
+    registry = TokenizerRegistry().register("local", lambda: WordTokenizer("local"))
+    assert registry.estimator() is TOKEN_ESTIMATOR
+    assert registry.ratios("o200k_base") == CL100K_RATIOS
+    assert registry.ratios("local") == BYTE_RATIOS
+    assert registry.estimator("local") is registry.estimator("local")
+    assert registry.estimator("local", margin=0.5).margin == 0.5
+    # Unknown tokenizers are only bounded by their byte count
+    assert registry.estimator("local").bounds("abcdef").upper == 6
+
+
+def test_weaver_counts_with_selected_encoding(chars: WordTokenizer) -> None:
+    weaver = Weaver(encoding="chars")
+    weaver.add(PromptComponent(name="A", type=ComponentType.CONTEXT, content="a" * 30, priority=1))
+    weaver.add(PromptComponent(name="B", type=ComponentType.CONTEXT, content="b" * 30, priority=5))
+
+    config = weaver.build("in", max_tokens=40)
+    assert config.dropped_components == ["A"]
+    assert config.provenance_metadata["token_estimation"] == "exact"
+    # Component texts are counted in one batch
+    assert ["b" * 30, "a" * 30] == [text for text in chars.batches[0] if len(text) == 30]
+
+    with pytest.raises(ValueError, match="Unknown encoding"):
+        Weaver(encoding="nope")
+
+
+def test_server_selects_encoding_per_request(chars: WordTokenizer) -> None:
+    client = TestClient(app)
+    components = [{"name": "Role", "type": "ROLE", "content": "You are terse.", "priority": 10}]
+    payload = {"user_input": "x", "components": components, "encoding": "chars"}
+
+    response = client.post("/v1/compile", json=payload)
+    assert response.status_code == 200
+    assert response.json()["token_count"] == len("You are terse.")
+
+    response = client.post("/v1/compile", json={**payload, "encoding": "nope"})
+    assert response.status_code == 400
+
+    response = client.post(
+        "/v1/optimize", json={"text": "abcdefgh", "limit": 4, "strategy": "prune_middle", "encoding": "chars"}
+    )
+    assert response.json()["text"] == "abgh"
+
+    response = client.post(
+        "/v1/optimize", json={"text": "abcdefgh", "limit": 4, "strategy": "prune_middle", "encoding": "nope"}
+    )
+    assert response.status_code == 400
+
+
+def test_backend_wrappers(monkeypatch: pytest.MonkeyPatch) -> None:
+    class FakeEncoding:
+        def encode(self, text: str) -> List[int]:
+            return [ord(c) for c in text]
+
+        def decode(self, tokens: List[int]) -> str:
+            return "".join(chr(t) for t in tokens)
+
+        def encode_batch(self, texts: List[str], num_threads: int) -> List[List[int]]:
+            return [self.encode(text) for text in texts]
+
+    tiktoken_tokenizer = TiktokenTokenizer("fake", encoding=FakeEncoding())  # type: ignore[arg-type]
+    assert tiktoken_tokenizer.count_batch(["ab", "c"]) == [2, 1]
+    assert tiktoken_tokenizer.decode(tiktoken_tokenizer.encode("hi")) == "hi"
+
+    class FakeHFEncoding:
+        def __init__(self, text: str) -> None:
+            self.ids = [ord(c) for c in text]
+
+    class FakeHFTokenizer:
+        @classmethod
+        def from_file(cls, path: str) -> "FakeHFTokenizer":
+            return cls()
+
+        def encode(self, text: str, add_special_tokens: bool) -> FakeHFEncoding:
+            assert not add_special_tokens
+            return FakeHFEncoding(text)
+
+        def encode_batch(self, texts: List[str], add_special_tokens: bool) -> List[FakeHFEncoding]:
+            return [self.encode(text, add_special_tokens) for text in texts]
+
+        def decode(self, tokens: List[int]) -> str:
+            return "".join(chr(t) for t in tokens)
+
+    monkeypatch.setitem(sys.modules, "tokenizers", types.SimpleNamespace(Tokenizer=FakeHFTokenizer))
+    registry = TokenizerRegistry().register_huggingface("local", "/models/tokenizer.json")
+    hf = registry.get("local")
+    assert isinstance(hf, HuggingFaceTokenizer)
+    assert hf.count_batch(["abc", ""]) == [3, 0]
+    assert hf.decode(hf.encode("hi")) == "hi"
+
+    monkeypatch.setitem(sys.modules, "tokenizers", None)
+    with pytest.raises(ImportError, match="requires the 'tokenizers' package"):
+        HuggingFaceTokenizer("local", "/models/tokenizer.json")
+
+    with pytest.raises(TypeError, match="abstract"):
+        Tokenizer("abstract")  # type: ignore[abstract]
@@ -0,0 +1,67 @@
+# Copyright (c) 2025 CoReason, Inc.
+#
+# This software is proprietary and dual-licensed.
+# Licensed under the Prosperity Public License 3.0 (the "License").
+# A copy of the license is available at https://prosperitylicense.com/versions/3.0.0
+# For details, see the LICENSE file.
+# Commercial use beyond a 30-day trial requires a separate license.
+#
+# Source Code: https://github.com/CoReason-AI/coreason_construct
+
+from coreason_identity.models import UserContext
+
+from coreason_construct.contexts.library import HIPAA_Context, PatientHistory
+from coreason_construct.roles.base import RoleDefinition
+from coreason_construct.schemas.base import ComponentType, PromptComponent
+from coreason_construct.weaver import Weaver
+
+
+def test_family_prefixes() -> None:
+    assert list(Weaver._family_prefixes("PatientHistory_P1")) == ["PatientHistory"]
+    assert list(Weaver._family_prefixes("Study_Protocol_NCT1")) == ["Study", "Study_Protocol"]
+    assert list(Weaver._family_prefixes("HIPAA")) == []
+
+
+def test_existing_dynamic_component_satisfies_dependency(mock_context: UserContext) -> None:
+    """A PatientHistory_* component already present satisfies a 'PatientHistory' dependency."""
+    weaver = Weaver(context_data={"patient_id": "OTHER"})
+    weaver.add(PatientHistory(patient_id="P1"), context=mock_context)
+
+    doctor = RoleDefinition(
+        name="Doctor", title="Doctor", tone="Calm", competencies=["Medicine"], dependencies=["PatientHistory"]
+    )
+    weaver.add(doctor, context=mock_context)
+
+    assert [c.name for c in weaver.components] == ["PatientHistory_P1", "Doctor"]
+    assert weaver._has_family("PatientHistory")
+    assert not weaver._has_family("Patient")
+
+
+def test_index_resyncs_after_external_mutation() -> None:
+    weaver = Weaver()
+    weaver.add(HIPAA_Context)
+    weaver.components.clear()
+
+    assert not weaver._has_component("HIPAA")
+    weaver.add(HIPAA_Context)
+    assert [c.name for c in weaver.components] == ["HIPAA"]
+
+    weaver.components.append(PatientHistory(patient_id="P9"))
+    assert weaver._has_family("PatientHistory")
+
+
+def test_add_ten_thousand_components(mock_context: UserContext) -> None:
+    weaver = Weaver()
+    for i in range(10_000):
+        weaver.add(
+            PromptComponent(name=f"PatientHistory_{i}", type=ComponentType.CONTEXT, content=f"History {i}"),
+            context=mock_context,
+        )
+    # Duplicates are rejected and family dependencies are satisfied without any registry lookups
+    weaver.add(PromptComponent(name="PatientHistory_0", type=ComponentType.CONTEXT, content="Duplicate"))
+    weaver.add(
+        RoleDefinition(name="Doc", title="Doc", tone="Calm", competencies=[], dependencies=["PatientHistory"]),
+        context=mock_context,
+    )
+
+    assert len(weaver.components) == 10_001